@@ -0,0 +1,152 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Benchmark of the package writers: the zipfile writer used by the
+workdir mode (all members stored, or all deflated) against the
+ZipWriter of the stream mode, with the 'auto' compression policy and an
+increasing number of deflate workers.
+
+The synthetic package holds descriptors, an incompressible (random)
+qcow2 image and a compressible raw image.
+
+usage: python benchmarks/compression.py [--image-size SIZE] [--jobs N ...]
+                                        [--repeat N] [--dir DIR]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import zipfile
+from contextlib import closing
+from son.package.zipwriter import ZipWriter
+
+QCOW2 = 'application/sonata.qcow2_files'
+RAW = 'application/sonata.raw_files'
+DESCRIPTOR = 'application/sonata.function_descriptor'
+
+# Content types stored by the 'auto' compression policy
+STORED_CONTENT_TYPES = (QCOW2,)
+
+
+def create_members(tmp_dir, image_size):
+    """
+    Create the members of the synthetic package.
+    :return: list of (archive name, filename, content type)
+    """
+    members = []
+    for i in range(20):
+        path = os.path.join(tmp_dir, 'vnfd-{}.yml'.format(i))
+        with open(path, 'w') as f:
+            for j in range(200):
+                f.write("- id: vdu{0}\n  vm_image: image{0}.img\n"
+                        "  resource_requirements:\n    cpu: 2\n".format(j))
+        members.append(('function_descriptors/vnfd-{}.yml'.format(i), path,
+                        DESCRIPTOR))
+
+    path = os.path.join(tmp_dir, 'image.qcow2')
+    with open(path, 'wb') as f:
+        for _ in range(image_size >> 20):
+            f.write(os.urandom(1 << 20))
+    members.append(('qcow2_files/vnf/image.qcow2', path, QCOW2))
+
+    path = os.path.join(tmp_dir, 'image.img')
+    with open(path, 'wb') as f:
+        block = bytes(range(256)) * 1024 + bytes(3 << 18)
+        for _ in range(image_size >> 20):
+            f.write(block[:1 << 20])
+    members.append(('raw_files/vnf/image.img', path, RAW))
+    return members
+
+
+def write_zipfile(members, dst, compression):
+    with closing(zipfile.ZipFile(dst, 'w', compression)) as pck:
+        for arcname, path, _ in members:
+            pck.write(path, arcname)
+
+
+def write_zipwriter(members, dst, jobs):
+    with open(dst, 'wb') as f, ZipWriter(f, workers=jobs) as pck:
+        for arcname, path, content_type in members:
+            pck.write(arcname, path,
+                      zipfile.ZIP_STORED
+                      if content_type in STORED_CONTENT_TYPES
+                      else zipfile.ZIP_DEFLATED)
+
+
+def parse_size(value):
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    if value[-1].upper() in units:
+        return int(value[:-1]) * units[value[-1].upper()]
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the package writers of son.package")
+    parser.add_argument("--image-size", type=parse_size, default='256M',
+                        help="size of each synthetic image (default: 256M)")
+    parser.add_argument("--jobs", type=int, nargs='+',
+                        default=[1, 2, 4, os.cpu_count()],
+                        help="numbers of deflate workers to benchmark")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of runs per measure, the best is kept")
+    parser.add_argument("--dir", default=None,
+                        help="directory where test files are created")
+    args = parser.parse_args()
+
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp_dir:
+        members = create_members(tmp_dir, args.image_size)
+        dst = os.path.join(tmp_dir, 'package.son')
+
+        writers = [
+            ('zipfile stored', lambda: write_zipfile(members, dst,
+                                                     zipfile.ZIP_STORED)),
+            ('zipfile deflated', lambda: write_zipfile(members, dst,
+                                                       zipfile.ZIP_DEFLATED))
+        ]
+        for jobs in sorted(set(args.jobs)):
+            writers.append(('auto, {} jobs'.format(jobs),
+                            lambda jobs=jobs: write_zipwriter(members, dst,
+                                                              jobs)))
+
+        print("{:>18} {:>10} {:>12}".format('writer', 'seconds', 'size (MB)'))
+        for name, writer in writers:
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                writer()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            print("{:>18} {:>10.3f} {:>12.1f}"
+                  .format(name, best, os.path.getsize(dst) / (1 << 20)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Micro-benchmark of the hashing engine in son.package.md5.
+
+Files of increasing size, from 1 KB up to 10 GB, are hashed with the
+legacy 128 bytes chunk reader and with each path of the hashing engine.
+Files bigger than 64 MB are created sparse, so that they do not take
+disk space.
+
+usage: python benchmarks/hashing.py [--max-size SIZE] [--legacy-max SIZE]
+                                    [--repeat N] [--dir DIR]
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from son.package.md5 import __generate_hashes__
+
+SIZES = [1 << 10, 1 << 20, 100 * (1 << 20), 1 << 30, 10 * (1 << 30)]
+
+SPARSE_THRESHOLD = 64 * (1 << 20)
+
+
+def legacy_hash(f, cs=128):
+    hash = hashlib.md5()
+    with open(f, "rb") as file:
+        for chunk in iter(lambda: file.read(cs), b''):
+            hash.update(chunk)
+    return hash.hexdigest()
+
+
+ENGINES = [
+    ('legacy', lambda f: legacy_hash(f)),
+    ('readinto', lambda f: __generate_hashes__(f, use_mmap=False)),
+    ('mmap', lambda f: __generate_hashes__(f, use_mmap=True)),
+    ('md5+sha256', lambda f: __generate_hashes__(f, ('md5', 'sha256'))),
+]
+
+
+def create_file(path, size):
+    with open(path, 'wb') as f:
+        if size > SPARSE_THRESHOLD:
+            f.truncate(size)
+        else:
+            f.write(os.urandom(size))
+
+
+def human(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return "{}{}".format(size, unit)
+        size //= 1024
+    return "{}TB".format(size)
+
+
+def parse_size(value):
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    if value[-1].upper() in units:
+        return int(value[:-1]) * units[value[-1].upper()]
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the hashing engine of son.package.md5")
+    parser.add_argument("--max-size", type=parse_size, default='10G',
+                        help="biggest file size to benchmark (default: 10G)")
+    parser.add_argument("--legacy-max", type=parse_size, default='100M',
+                        help="biggest file size to benchmark with the legacy "
+                             "128 bytes reader (default: 100M)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of runs per measure, the best is kept")
+    parser.add_argument("--dir", default=None,
+                        help="directory where test files are created")
+    args = parser.parse_args()
+
+    print("{:>8} {:>12} {:>10} {:>10}".format('size', 'engine', 'seconds',
+                                              'MB/s'))
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp_dir:
+        for size in SIZES:
+            if size > args.max_size:
+                break
+            path = os.path.join(tmp_dir, human(size))
+            create_file(path, size)
+
+            for name, engine in ENGINES:
+                if name == 'legacy' and size > args.legacy_max:
+                    continue
+                best = None
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    engine(path)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                print("{:>8} {:>12} {:>10.4f} {:>10.1f}"
+                      .format(human(size), name, best,
+                              size / (1 << 20) / best if best else 0))
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
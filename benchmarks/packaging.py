@@ -0,0 +1,346 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Benchmark of son-package builds over synthetic SONATA projects.
+
+A workspace and a project are generated with the requested number of
+VNFs, VDUs per VNF, virtual links and image size (images are sparse
+files). The project is packaged end to end, in the workdir and stream
+modes, while the main stages are timed: generation of the package
+content section (pcs), hashing of the artifacts, writing of the package
+file (zip) and validation of the package (validate_package). Hashing is
+measured on its own, over all the artifacts of the project.
+
+Each run starts with cold caches (digests, parsed descriptors and blob
+store), unless '--warm' is given. Results are printed and, with
+'--output', appended as a JSON record to a file, so that they can be
+compared across commits.
+
+usage: python benchmarks/packaging.py [--vnfs N] [--vdus N] [--links N]
+                                      [--image-size SIZE] [--jobs N]
+                                      [--modes MODE ...] [--repeat N]
+                                      [--warm] [--output FILE] [--dir DIR]
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import yaml
+from son.package import md5
+from son.package.package import Packager
+from son.validate.util import clear_descriptor_cache
+from son.validate.validate import Validator
+from son.workspace.project import Project
+from son.workspace.workspace import Workspace
+
+MODES = ('workdir', 'stream')
+
+STAGES = ('total', 'pcs', 'hashing', 'zip', 'validate_package')
+
+VENDOR = 'eu.sonata-nfv.benchmark'
+
+# Permissive schemas, so that the benchmark does not depend on the network
+SCHEMAS = {'pd-schema.yml': ['package_content'],
+           'nsd-schema.yml': ['network_functions'],
+           'vnfd-schema.yml': ['virtual_deployment_units']}
+
+
+def create_workspace(ws_root):
+    """
+    Create a workspace, using local schemas.
+    :return: workspace object
+    """
+    schemas_dir = os.path.join(os.path.dirname(ws_root), 'schemas')
+    os.makedirs(schemas_dir)
+    for name, required in SCHEMAS.items():
+        with open(os.path.join(schemas_dir, name), 'w') as f:
+            yaml.dump({'type': 'object',
+                       'required': ['vendor', 'name', 'version'] + required},
+                      f)
+
+    ws = Workspace(ws_root, log_level='ERROR')
+    ws.schemas[Workspace.CONFIG_STR_SCHEMAS_LOCAL_MASTER] = schemas_dir
+    ws.schemas[Workspace.CONFIG_STR_SCHEMAS_REMOTE_MASTER] = \
+        'http://127.0.0.1:9/'
+    ws.create_dirs()
+    ws.create_files()
+    return Workspace.__create_from_descriptor__(ws_root)
+
+
+def create_project(prj_root, vnfs, vdus, links, image_size):
+    """
+    Create a synthetic project.
+    :param prj_root: project directory
+    :param vnfs: number of VNFs
+    :param vdus: number of VDUs of each VNF, each with its own image
+    :param links: number of virtual links of the service
+    :param image_size: size of each image (sparse file)
+    :return: list of the image filenames
+    """
+    nsd_dir = os.path.join(prj_root, 'sources', 'nsd')
+    os.makedirs(nsd_dir)
+    dump(os.path.join(prj_root, 'project.yml'),
+         {'name': 'benchmark', 'vendor': VENDOR,
+          'version': Project.PROJECT_VERSION,
+          'description': 'Synthetic project', 'descriptor_extension': 'yml',
+          'maintainer': 'benchmark', 'catalogues': ['personal'],
+          'publish_to': ['personal']})
+
+    images = []
+    for i in range(vnfs):
+        vnf_dir = os.path.join(prj_root, 'sources', 'vnf', 'vnf{}'.format(i))
+        os.makedirs(vnf_dir)
+        units = []
+        for j in range(vdus):
+            image = os.path.join(vnf_dir, 'vdu{}.img'.format(j))
+            with open(image, 'wb') as f:
+                f.write(os.urandom(4096))
+                f.truncate(image_size)
+            images.append(image)
+            units.append({'id': 'vdu{}'.format(j),
+                          'vm_image': 'vdu{}.img'.format(j),
+                          'vm_image_format': 'raw',
+                          'resource_requirements': {
+                              'cpu': {'vcpus': 1},
+                              'memory': {'size': 2, 'size_unit': 'GB'}},
+                          'connection_points': [
+                              {'id': 'vdu{}:eth{}'.format(j, k),
+                               'type': 'interface'} for k in range(3)]})
+
+        dump(os.path.join(vnf_dir, 'vnfd{}.yml'.format(i)),
+             {'descriptor_version': 'vnfd-schema-01', 'vendor': VENDOR,
+              'name': 'vnf{}'.format(i), 'version': '0.1',
+              'virtual_deployment_units': units,
+              'connection_points': [{'id': cp, 'type': 'interface'}
+                                    for cp in ('mgmt', 'input', 'output')],
+              'virtual_links': [
+                  {'id': cp, 'connectivity_type': 'E-LAN',
+                   'connection_points_reference':
+                       ['vdu{}:eth{}'.format(j, k) for j in range(vdus)] +
+                       [cp]}
+                  for k, cp in enumerate(('mgmt', 'input', 'output'))]})
+
+    dump(os.path.join(nsd_dir, 'nsd.yml'),
+         {'descriptor_version': '1.0', 'vendor': VENDOR, 'name': 'service',
+          'version': '0.1',
+          'network_functions': [
+              {'vnf_id': 'vnf{}'.format(i), 'vnf_vendor': VENDOR,
+               'vnf_name': 'vnf{}'.format(i), 'vnf_version': '0.1'}
+              for i in range(vnfs)],
+          'connection_points': [{'id': 'ns:' + cp, 'type': 'interface'}
+                                for cp in ('mgmt', 'input', 'output')],
+          'virtual_links': [
+              {'id': 'link{}'.format(k), 'connectivity_type': 'E-Line',
+               'connection_points_reference': [
+                   'vnf{}:output'.format(k % vnfs),
+                   'vnf{}:input'.format((k + 1) % vnfs)]}
+              for k in range(links)]})
+    return images
+
+
+def dump(filename, descriptor):
+    with open(filename, 'w') as f:
+        yaml.dump(descriptor, f, default_flow_style=False)
+
+
+class StageTimer(object):
+    """
+    Accumulates the time spent in methods of a class, while installed.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self._patched = []
+
+    def install(self, cls, method, stage):
+        original = getattr(cls, method)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.times[stage] = self.times.get(stage, 0) + \
+                    time.perf_counter() - start
+
+        setattr(cls, method, timed)
+        self._patched.append((cls, method, original))
+
+    def uninstall(self):
+        for cls, method, original in reversed(self._patched):
+            setattr(cls, method, original)
+        self._patched = []
+
+
+def reset_caches(workspace):
+    """
+    Discard the digests, parsed descriptors and blobs of previous runs.
+    """
+    md5._digest_memo.clear()
+    md5.use_digest_cache(None)
+    clear_descriptor_cache()
+    shutil.rmtree(workspace.cache_dir, ignore_errors=True)
+
+
+def run(workspace, project, images, dst, mode, jobs):
+    """
+    Package the project once and hash its images.
+    :return: dictionary of the time of each stage, in seconds
+    """
+    timer = StageTimer()
+    timer.install(Packager, 'package_pcs', 'pcs')
+    timer.install(Packager, 'generate_package', 'generate_package')
+    timer.install(Validator, 'validate_package', 'validate_package')
+    try:
+        start = time.perf_counter()
+        pck = Packager(workspace, project=project, dst_path=dst,
+                       stream=(mode == 'stream'), jobs=jobs)
+        if not pck.generate_package('package'):
+            raise RuntimeError("Failed to generate the package")
+        timer.times['total'] = time.perf_counter() - start
+    finally:
+        timer.uninstall()
+
+    times = timer.times
+    times['zip'] = times.pop('generate_package') - times['validate_package']
+
+    # Hashing on its own, as it is interleaved with other stages
+    md5._digest_memo.clear()
+    md5.use_digest_cache(None)
+    start = time.perf_counter()
+    for image in images:
+        md5.generate_hash(image)
+    times['hashing'] = time.perf_counter() - start
+    return times
+
+
+def commit_id():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return
+
+
+def parse_size(value):
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    if value[-1].upper() in units:
+        return int(value[:-1]) * units[value[-1].upper()]
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark son-package builds of synthetic projects")
+    parser.add_argument("--vnfs", type=int, default=10,
+                        help="number of VNFs (default: 10)")
+    parser.add_argument("--vdus", type=int, default=2,
+                        help="number of VDUs of each VNF (default: 2)")
+    parser.add_argument("--links", type=int, default=20,
+                        help="number of virtual links of the service "
+                             "(default: 20)")
+    parser.add_argument("--image-size", type=parse_size, default='64M',
+                        help="size of each VDU image (default: 64M)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of VNFs packaged concurrently")
+    parser.add_argument("--modes", nargs='+', choices=MODES,
+                        default=list(MODES), help="packaging modes")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of runs per mode, the best is kept")
+    parser.add_argument("--warm", action="store_true",
+                        help="keep the caches of previous runs")
+    parser.add_argument("--output", default=None,
+                        help="JSON file where the results are appended")
+    parser.add_argument("--dir", default=None,
+                        help="directory where test files are created")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    cwd = os.getcwd()
+    results = {}
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp_dir:
+        workspace = create_workspace(os.path.join(tmp_dir, 'ws'))
+        images = create_project(os.path.join(tmp_dir, 'prj'), args.vnfs,
+                                args.vdus, args.links, args.image_size)
+        project = Project.__create_from_descriptor__(
+            workspace, os.path.join(tmp_dir, 'prj'))
+        dst = os.path.join(tmp_dir, 'out')
+
+        # Temporary workdirs are created in the current directory
+        os.chdir(tmp_dir)
+        try:
+            for mode in args.modes:
+                best = {}
+                for i in range(args.repeat):
+                    if not args.warm or not i:
+                        reset_caches(workspace)
+                    times = run(workspace, project, images, dst, mode,
+                                args.jobs)
+                    for stage, elapsed in times.items():
+                        best[stage] = min(best.get(stage, elapsed), elapsed)
+                results[mode] = best
+        finally:
+            os.chdir(cwd)
+
+    print("{:>8} ".format('mode') +
+          " ".join("{:>16}".format(stage) for stage in STAGES))
+    for mode, times in results.items():
+        print("{:>8} ".format(mode) +
+              " ".join("{:>16.3f}".format(times[stage]) for stage in STAGES))
+
+    if args.output:
+        record = {'commit': commit_id(),
+                  'date': datetime.datetime.utcnow().isoformat(),
+                  'python': platform.python_version(),
+                  'platform': platform.platform(),
+                  'parameters': {'vnfs': args.vnfs, 'vdus': args.vdus,
+                                 'links': args.links,
+                                 'image_size': args.image_size,
+                                 'jobs': args.jobs, 'repeat': args.repeat,
+                                 'warm': args.warm},
+                  'results': results}
+        records = []
+        if os.path.isfile(args.output):
+            with open(args.output, 'r') as f:
+                records = json.load(f)
+        records.append(record)
+        with open(args.output, 'w') as f:
+            json.dump(records, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
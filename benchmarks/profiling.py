@@ -0,0 +1,146 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Benchmark of the overhead of the '--profile-out' profilers.
+
+A synthetic project (see packaging.py) is packaged end to end without
+profiling, and under each profiler of son.util.profiler. The
+overhead is the relative increase of the best build time, plus the time
+spent writing the profile at exit.
+
+Budget: the sampling profiler should stay below 10% of overhead on
+builds of a second or more, so that it can be left enabled on CI runs.
+cProfile instruments every call of the main thread and may cost up to
+2x on descriptor-heavy projects; it is meant for the investigation of a
+specific run. With the default parameters, cProfile measured 15-50% and
+sampling 0-15%, the sampling overhead being mostly noise on short runs.
+
+usage: python benchmarks/profiling.py [--vnfs N] [--vdus N] [--links N]
+                                      [--image-size SIZE] [--jobs N]
+                                      [--repeat N] [--dir DIR]
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import tempfile
+import time
+from son.util.profiler import create_profiler, PROFILE_MODES
+from son.workspace.project import Project
+
+# The packaging benchmark is loaded under another name, as it would
+# shadow the 'packaging' distribution
+_spec = importlib.util.spec_from_file_location(
+    'packaging_benchmark',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'packaging.py'))
+packaging_benchmark = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(packaging_benchmark)
+
+
+def run(workspace, project, images, dst, jobs, mode, profile_file):
+    """
+    Package the project once, with cold caches, optionally profiled.
+    :return: tuple of the build time and of the time writing the profile
+    """
+    packaging_benchmark.reset_caches(workspace)
+    profiler = create_profiler(mode) if mode else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.start()
+    try:
+        packaging_benchmark.run(workspace, project, images, dst, 'workdir',
+                                jobs)
+    finally:
+        if profiler:
+            profiler.stop()
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if profiler:
+        profiler.write(profile_file)
+    return elapsed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the overhead of the son-package profilers")
+    parser.add_argument("--vnfs", type=int, default=20,
+                        help="number of VNFs (default: 20)")
+    parser.add_argument("--vdus", type=int, default=2,
+                        help="number of VDUs of each VNF (default: 2)")
+    parser.add_argument("--links", type=int, default=40,
+                        help="number of virtual links of the service "
+                             "(default: 40)")
+    parser.add_argument("--image-size", type=packaging_benchmark.parse_size,
+                        default='1M',
+                        help="size of each VDU image (default: 1M)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of VNFs packaged concurrently")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of runs per profiler, the best is kept")
+    parser.add_argument("--dir", default=None,
+                        help="directory where test files are created")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    cwd = os.getcwd()
+    results = {}
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp_dir:
+        workspace = packaging_benchmark.create_workspace(
+            os.path.join(tmp_dir, 'ws'))
+        images = packaging_benchmark.create_project(
+            os.path.join(tmp_dir, 'prj'), args.vnfs, args.vdus, args.links,
+            args.image_size)
+        project = Project.__create_from_descriptor__(
+            workspace, os.path.join(tmp_dir, 'prj'))
+        dst = os.path.join(tmp_dir, 'out')
+        profile_file = os.path.join(tmp_dir, 'run.prof')
+
+        # Temporary workdirs are created in the current directory
+        os.chdir(tmp_dir)
+        try:
+            for mode in (None,) + PROFILE_MODES:
+                results[mode] = min(
+                    run(workspace, project, images, dst, args.jobs, mode,
+                        profile_file) for i in range(args.repeat))
+        finally:
+            os.chdir(cwd)
+
+    base = results[None][0]
+    print("{:>10} {:>12} {:>12} {:>10}".format('profiler', 'build (s)',
+                                               'write (s)', 'overhead'))
+    for mode, (elapsed, write) in results.items():
+        print("{:>10} {:>12.3f} {:>12.3f} {:>9.1f}%"
+              .format(mode or 'none', elapsed, write,
+                      (elapsed - base) / base * 100))
+
+
+if __name__ == '__main__':
+    main()
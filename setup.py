@@ -52,7 +52,8 @@ setup(
         namespace_packages=['son', ],
         include_package_data=True,
         package_data= {
-            'son': ['schema/tests/son-schema/*', 'workspace/samples/*',
+            'son': ['schema/bundle/*', 'schema/tests/son-schema/*',
+                    'workspace/samples/*',
                     'monitor/docker_compose_files/*', 'monitor/grafana/*',
                     'monitor/prometheus/*', 'monitor/*.exp']
         },
@@ -71,6 +71,8 @@ from son.access.config.config import GK_ADDRESS, GK_PORT
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
 from son.access.pull import Pull
 from son.access.push import Push
+from son.util.trace import traced, add_trace_argument, trace_to
+from son.util.profiler import add_profile_argument, profile_to
 
 log = logging.getLogger(__name__)
 
@@ -191,6 +193,7 @@ class AccessClient:
         # TODO: Create userdata file? Check KEYCLOAK register form
         return response
 
+    @traced()
     def client_login(self, username=None, password=None):
         """
         Make a POST request with username and password
@@ -255,6 +258,7 @@ class AccessClient:
         """
         pass
 
+    @traced()
     def push_package(self, path):
         """
         Call push feature to upload a package to the SP Catalogue
@@ -274,6 +278,7 @@ class AccessClient:
         """
         print(self.default_push.instantiate_service(service_id))
 
+    @traced()
     def pull_resource(self, resource_type, identifier=None, uuid=False,
                       platform_id=None):
         """
@@ -417,6 +422,8 @@ class AccessArgParse(object):
             required=False,
             action="store_true"
         )
+        add_trace_argument(parser)
+        add_profile_argument(parser)
 
         parser.add_argument(
             "command",
@@ -430,11 +437,15 @@ class AccessArgParse(object):
             if (v == "-w" or v == "--workspace" or
                v == '-p' or v == "--platform"):
                 command_idx += 2
+            elif v in ('--trace', '--profile-out', '--profile-mode'):
+                command_idx += 2
             elif v == '--debug':
                 command_idx += 1
 
         self.subarg_idx = command_idx+1
         args = parser.parse_args(sys.argv[1: self.subarg_idx])
+        trace_to(args.trace)
+        profile_to(args.profile_out, args.profile_mode)
 
         # handle workspace
         if args.workspace:
@@ -513,10 +524,19 @@ class AccessArgParse(object):
             prog="son-access [..] push",
             description="Submit a son-package to the SP"
         )
+        parser.add_argument(
+            "package",
+            nargs='?',
+            help="Package path to submit, same as '--upload'. '-' submits "
+                 "the package read from the standard input, e.g. piped from "
+                 "'son-package --output -'",
+            metavar="PACKAGE_PATH"
+        )
         parser.add_argument(
             "--upload",
             type=str,
-            help="Specify package path to submit",
+            help="Specify package path to submit. '-' reads the package "
+                 "from the standard input",
             required=False,
             metavar="PACKAGE_PATH"
         )
@@ -528,6 +548,8 @@ class AccessArgParse(object):
             metavar="SERVICE_ID"
         )
         args = parser.parse_args(sys.argv[self.subarg_idx:])
+        if not args.upload:
+            args.upload = args.package
 
         if not (args.upload or args.deploy):
             log.error("At least one of the following arguments must be "
@@ -123,11 +123,12 @@ class Pull(object):
 
         return response.status_code == requests.codes.ok
 
-    def __get_cat_object__(self, cat_uri, obj_query):
+    def __get_cat_object__(self, cat_uri, obj_query, timeout=None):
         """
         Generic GET function to request a SONATA SP resource.
         :param cat_uri: catalogue to be queried
         :param obj_id: identifier of the resource
+        :param timeout: seconds to wait for the SP. No limit if None
         :return: response of the SP
         """
         # print("cat_uri", cat_uri, type(cat_uri))
@@ -136,7 +137,8 @@ class Pull(object):
         # print("url", url)
         # print("headers", self._headers)
         response = requests.get(url,    # auth=self._auth,
-                                headers=self._headers)
+                                headers=self._headers,
+                                timeout=timeout)
         # print("response_code", response.status_code)
         # print("response_text", response.text)
         if not response.status_code == requests.codes.ok:
@@ -231,15 +233,16 @@ class Pull(object):
 
         return vnfd
 
-    def get_vnf_by_id(self, vnf_id):
+    def get_vnf_by_id(self, vnf_id, timeout=None):
         # TODO: Enable name.trio identifier
         """
         Obtains a specific VNF
         :param vnf_id: ID of VNF in the form 'vendor.name.version'
+        :param timeout: seconds to wait for the SP. No limit if None
         :return: yaml object containing VNF
         """
         cat_obj = self.__get_cat_object__(
-            self.CAT_URI_VNF, vnf_id)
+            self.CAT_URI_VNF, vnf_id, timeout=timeout)
         if not cat_obj:
             return
 
@@ -29,11 +29,15 @@ import requests
 import logging
 # import yaml
 import sys
+import uuid
 from son.access.config.config import GK_ADDRESS, GK_PORT
 # from json import loads
 
 log = logging.getLogger(__name__)
 
+# Size of the chunks of a package uploaded from the standard input
+UPLOAD_CHUNK_SIZE = 1 << 20
+
 
 class mcolors:
      OKGREEN = '\033[92m'
@@ -187,13 +191,18 @@ class Push(object):
 
         :param package_file_name: filename including full
                                   path of the package
-                                  to be uploaded
+                                  to be uploaded. '-' uploads the
+                                  package read from the standard input
 
         :returns: text response message of the server or
                   error message
         """
         import os
 
+        if package_file_name == '-':
+            return self.upload_package_stream(
+                iter(lambda: sys.stdin.buffer.read(UPLOAD_CHUNK_SIZE), b''))
+
         if not os.path.isfile(package_file_name):
             return package_file_name, "is not a file."
 
@@ -209,13 +218,7 @@ class Push(object):
             with open(package_file_name, 'rb') as pkg_file:
                 payload = {'package': pkg_file}
                 r = requests.post(url, files=payload)
-                if r.status_code == 201:
-                    msg = "Upload succeeded"
-                elif r.status_code == 409:
-                    msg = "Package already exists"
-                else:
-                    msg = "Upload error"
-                return "%s (%d): %r" % (msg, r.status_code, r.text)
+                return upload_response_message(r)
 
         except Exception as e:
             return "Service package upload failed. " + str(e)
@@ -244,6 +247,36 @@ class Push(object):
             return "Service package upload failed. " + str(e)
         """
 
+    def upload_package_stream(self, chunks, filename='package.son'):
+        """
+        Upload package to platform, while it is being read or
+        generated. The package is sent in a chunked multipart request,
+        so that its size does not need to be known and no package file
+        is needed.
+
+        :param chunks: iterable of the bytes of the package
+        :param filename: filename of the package in the request
+
+        :returns: text response message of the server or
+                  error message
+        """
+        url = self._base_url + self.GK_API_VERSION + self.CAT_URI_PD
+
+        if not validators.url(url):
+            return url, "is not a valid url."
+
+        boundary = uuid.uuid4().hex
+        headers = {'Content-Type': 'multipart/form-data; boundary={}'
+                                   .format(boundary)}
+        try:
+            r = requests.post(url, headers=headers,
+                              data=multipart_stream(boundary, 'package',
+                                                    filename, chunks))
+            return upload_response_message(r)
+
+        except Exception as e:
+            return "Service package upload failed. " + str(e)
+
     # TODO: Enable instantiation
     def instantiate_service(self, service_uuid=""):
         """
@@ -276,6 +309,39 @@ class Push(object):
             return "Service could not be instantiated. " + str(e)
 
 
+def upload_response_message(response):
+    """
+    Message describing the response to a package upload.
+    """
+    if response.status_code == 201:
+        msg = "Upload succeeded"
+    elif response.status_code == 409:
+        msg = "Package already exists"
+    else:
+        msg = "Upload error"
+    return "%s (%d): %r" % (msg, response.status_code, response.text)
+
+
+def multipart_stream(boundary, field, filename, chunks):
+    """
+    Generate the body of a multipart/form-data request holding a single
+    file, without reading the file in advance.
+    :param boundary: boundary of the parts
+    :param field: form field of the file
+    :param filename: filename of the file
+    :param chunks: iterable of the bytes of the file
+    :return: generator of the bytes of the body
+    """
+    yield ('--{}\r\n'
+           'Content-Disposition: form-data; name="{}"; filename="{}"\r\n'
+           'Content-Type: application/octet-stream\r\n\r\n'
+           .format(boundary, field, filename)).encode('utf-8')
+    for chunk in chunks:
+        if chunk:
+            yield chunk
+    yield '\r\n--{}--\r\n'.format(boundary).encode('utf-8')
+
+
 def main():
     from argparse import ArgumentParser, RawDescriptionHelpFormatter
     print(mcolors.OKGREEN + "Running PUSH\n", mcolors.ENDC)
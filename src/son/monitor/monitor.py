@@ -47,6 +47,8 @@ import argparse
 
 from son.monitor.son_emu import Emu
 from son.monitor.son_sp import sp
+from son.util.trace import add_trace_argument, trace_to
+from son.util.profiler import add_profile_argument, profile_to
 
 import pprint
 pp = pprint.PrettyPrinter(indent=4)
@@ -312,6 +314,8 @@ parser.add_argument(
 parser.add_argument(
     "--file", "-f", dest="file",
     help="service descriptor file describing monitoring rules or pcap dump file")
+add_trace_argument(parser)
+add_profile_argument(parser)
 
 
 monitor = sonmonitor()
@@ -342,6 +346,8 @@ def main():
         parser.print_help()
         return
 
+    trace_to(args.pop('trace'))
+    profile_to(args.pop('profile_out'), args.pop('profile_mode'))
     _execute_command(args)
 
 
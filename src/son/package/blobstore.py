@@ -0,0 +1,249 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import errno
+import logging
+import os
+import shutil
+import tempfile
+from son.package.md5 import generate_hash, copy_hash
+
+log = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl request to clone a file (copy-on-write), on Linux file systems
+# with reflink support (e.g. btrfs, xfs)
+FICLONE = 0x40049409
+
+
+class BlobStore(object):
+    """
+    Content-addressed store of artifact files, located in the workspace
+    cache. Files are stored once, keyed by the md5 digest of their
+    content (the digest recorded in the package descriptors), and
+    hardlinked (or cloned) wherever they are needed, so that the same
+    image is shared by all VNFs, projects and package versions.
+    Blobs are evicted in least recently used order when the store
+    exceeds its maximum size.
+    """
+
+    DIR_NAME = 'blobs'
+
+    # Default maximum size of the store, in bytes
+    DEFAULT_MAX_SIZE = 20 * 1024 ** 3
+
+    def __init__(self, root, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param root: directory of the store
+        :param max_size: maximum size of the store in bytes, enforced by gc()
+        """
+        self._root = root
+        self._max_size = max_size
+
+    @staticmethod
+    def from_workspace(workspace):
+        """
+        Provides the blob store of a workspace.
+        :param workspace: SONATA workspace object
+        :return: blob store. None if the workspace has no cache location.
+        """
+        if not workspace.cache_dir:
+            return
+        return BlobStore(os.path.join(workspace.cache_dir,
+                                      BlobStore.DIR_NAME))
+
+    @property
+    def root(self):
+        return self._root
+
+    def path(self, digest):
+        """
+        Location of a blob in the store.
+        :param digest: md5 digest of the blob content
+        :return: blob filename
+        """
+        return os.path.join(self._root, digest[:2], digest[2:])
+
+    def get(self, digest, size=None):
+        """
+        Provides a stored blob, marking it as recently used.
+        :param digest: md5 digest of the blob content
+        :param size: expected size of the blob content. A blob of another
+                     size is corrupt (e.g. truncated) and is removed
+        :return: blob filename. None if it is not stored.
+        """
+        blob = self.path(digest)
+        try:
+            os.utime(blob)
+            if size is not None and os.path.getsize(blob) != size:
+                log.warning("Removing corrupt blob {} from '{}'"
+                            .format(digest, self._root))
+                os.remove(blob)
+                return
+        except FileNotFoundError:
+            return
+        return blob
+
+    def add(self, filename):
+        """
+        Store a file, unless its content is already stored.
+        :param filename: file to store
+        :return: md5 digest of the stored content
+        """
+        digest = generate_hash(filename)
+        if self.get(digest, os.path.getsize(filename)):
+            return digest
+
+        os.makedirs(os.path.dirname(self.path(digest)), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path(digest)),
+                                   suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as dst:
+                if clone_file(filename, dst):
+                    stored = generate_hash(tmp)
+                else:
+                    stored = copy_hash(filename, dst)
+
+            # Blobs are readable by everyone, as regular copies would be
+            os.chmod(tmp, 0o644)
+
+            # The file may have changed since it was first digested
+            if stored != digest:
+                digest = stored
+                os.makedirs(os.path.dirname(self.path(digest)),
+                            exist_ok=True)
+            os.replace(tmp, self.path(digest))
+
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        log.debug("Stored '{}' as blob {}".format(filename, digest))
+        return digest
+
+    def link(self, digest, dst):
+        """
+        Make a stored blob available at a location, as a hardlink to the
+        blob. If it can not be linked (e.g. in another file system) it is
+        cloned or, as last resort, copied. An existing destination is
+        replaced, and never written to, as it may be a link to a blob.
+        :param digest: md5 digest of the blob content
+        :param dst: destination filename
+        """
+        blob = self.get(digest)
+        if not blob:
+            raise FileNotFoundError(errno.ENOENT, "Blob not stored", digest)
+
+        if os.path.lexists(dst):
+            try:
+                if os.path.samefile(blob, dst):
+                    return
+            except OSError:
+                pass
+            os.remove(dst)
+
+        try:
+            os.link(blob, dst)
+            return
+        except OSError as e:
+            log.debug("Unable to link blob {} to '{}': {}"
+                      .format(digest, dst, e))
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dst)),
+                                   suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as dst_file:
+                if not clone_file(blob, dst_file):
+                    with open(blob, 'rb') as blob_file:
+                        shutil.copyfileobj(blob_file, dst_file)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, dst)
+
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def gc(self, max_size=None):
+        """
+        Remove the least recently used blobs until the store does not
+        exceed its maximum size.
+        :param max_size: maximum size in bytes. If not specified, the
+                         maximum size of the store is used
+        :return: number of bytes freed
+        """
+        if max_size is None:
+            max_size = self._max_size
+
+        blobs = []
+        for base, dirs, files in os.walk(self._root):
+            for f in files:
+                # Blobs being stored by a concurrent add()
+                if f.endswith('.tmp'):
+                    continue
+                try:
+                    st = os.stat(os.path.join(base, f))
+                except FileNotFoundError:
+                    continue
+                blobs.append((st.st_mtime_ns, st.st_size,
+                              os.path.join(base, f)))
+
+        size = sum(blob[1] for blob in blobs)
+        freed = 0
+        for mtime_ns, blob_size, blob in sorted(blobs):
+            if size - freed <= max_size:
+                break
+            try:
+                os.remove(blob)
+            except FileNotFoundError:
+                continue
+            freed += blob_size
+
+        if freed:
+            log.debug("Removed {} bytes of least recently used blobs from "
+                      "'{}'".format(freed, self._root))
+        return freed
+
+
+def clone_file(src, dst):
+    """
+    Clone the content of a file (reflink), without copying its data,
+    where supported by the file system.
+    :param src: source filename
+    :param dst: open destination file object
+    :return: True if the file was cloned
+    """
+    if not fcntl:
+        return False
+    try:
+        with open(src, 'rb') as src_file:
+            fcntl.ioctl(dst.fileno(), FICLONE, src_file.fileno())
+        return True
+    except OSError:
+        return False
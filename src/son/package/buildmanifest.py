@@ -0,0 +1,166 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import json
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+
+class BuildManifest(object):
+    """
+    Records the inputs and outputs of each stage of a package build
+    (e.g. the packaging of the NSD or of a VNF), so that a later build
+    of the same project can reuse the outputs of the stages whose inputs
+    did not change. Inputs are fingerprinted by the size and modification
+    time of their files, as is the package built, whose members may be
+    copied into later packages while it is unchanged.
+    """
+
+    def __init__(self, filename):
+        """
+        Load a build manifest. If the file does not exist, an empty
+        manifest is created.
+        :param filename: filename of the build manifest
+        """
+        self._filename = filename
+        self._previous = {}
+        self._stages = {}
+        self._package_fp = None
+        self.package = None
+
+        if os.path.isfile(filename):
+            try:
+                with open(filename, 'r') as _file:
+                    manifest = json.load(_file)
+                self._previous = manifest['stages']
+                self.package = manifest['package']
+                self._package_fp = manifest.get('package_fingerprint')
+            except (ValueError, KeyError) as e:
+                log.warning("Ignoring invalid build manifest '{}': {}"
+                            .format(filename, e))
+
+    @staticmethod
+    def for_project(workspace, project):
+        """
+        Provides the build manifest of a project, located in the workspace
+        cache.
+        :param workspace: SONATA workspace object
+        :param project: SONATA project object
+        :return: build manifest. None if the workspace has no cache.
+        """
+        if not workspace.cache_dir:
+            return
+        prj_id = hashlib.md5(os.path.abspath(project.project_root)
+                             .encode()).hexdigest()
+        return BuildManifest(os.path.join(workspace.cache_dir, 'builds',
+                                          prj_id + '.json'))
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def package_unchanged(self):
+        """
+        Check if the package of the previous build still exists and was not
+        modified since it was built.
+        :return: True if the package is unchanged
+        """
+        return self.package is not None and self._package_fp is not None \
+            and fingerprint(self.package) == self._package_fp
+
+    def lookup(self, stage):
+        """
+        Obtain the outputs of a stage recorded in the previous build,
+        if all its inputs are unchanged.
+        :param stage: stage identifier
+        :return: dictionary of outputs. None if the stage must be redone.
+        """
+        if stage not in self._previous:
+            return
+
+        for path, fp in self._previous[stage]['inputs'].items():
+            if fingerprint(path) != fp:
+                log.debug("Build stage '{}' changed: '{}'".format(stage, path))
+                return
+
+        log.debug("Build stage '{}' is unchanged".format(stage))
+        return self._previous[stage]['outputs']
+
+    def record(self, stage, inputs, outputs):
+        """
+        Record a stage of the current build.
+        The outputs are serialized when the manifest is saved and may be
+        updated until then.
+        :param stage: stage identifier
+        :param inputs: list of input files and directories
+        :param outputs: dictionary of outputs
+        """
+        self._stages[stage] = {
+            'inputs': {path: fingerprint(path) for path in inputs},
+            'outputs': outputs
+        }
+
+    def save(self):
+        """
+        Write the stages recorded in the current build to the manifest.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self._filename)),
+                    exist_ok=True)
+        with open(self._filename, 'w') as _file:
+            json.dump({'package': self.package,
+                       'package_fingerprint':
+                           fingerprint(self.package) if self.package
+                           else None,
+                       'stages': self._stages},
+                      _file, sort_keys=True)
+
+
+def fingerprint(path):
+    """
+    Fingerprint of a file or directory, based on size and modification
+    time of its files.
+    :param path: file or directory path
+    :return: list of [relative path, size, mtime_ns], one per file.
+             None if the path does not exist.
+    """
+    if os.path.isfile(path):
+        st = os.stat(path)
+        return [['', st.st_size, st.st_mtime_ns]]
+
+    if not os.path.isdir(path):
+        return
+
+    fp = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for f in sorted(files):
+            st = os.stat(os.path.join(root, f))
+            fp.append([os.path.relpath(os.path.join(root, f), path),
+                       st.st_size, st.st_mtime_ns])
+    return fp
@@ -24,17 +24,12 @@
 # acknowledge the contributions of their colleagues of the SONATA
 # partner consortium (www.sonata-nfv.eu).
 
-import logging
-import time
+from son.util.trace import traced
 
 
 def performance(method):
-    def measure(*args, **kwargs):
-        log = logging.getLogger(method.__module__)
-        start = time.time()
-        result = method(*args, **kwargs)
-        log.info('{0} executed in {1:.3f} sec'
-                 .format(method.__name__, time.time() - start))
-        return result
-
-    return measure
+    """
+    Deprecated. Measures the method within a timing span, see
+    son.util.trace.traced.
+    """
+    return traced()(method)
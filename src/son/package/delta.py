@@ -0,0 +1,190 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import logging
+import os
+import zipfile
+import yaml
+from contextlib import closing
+from son.package.md5 import generate_hash, MIN_CHUNK_SIZE
+
+log = logging.getLogger(__name__)
+
+# Package descriptor member of a package
+MANIFEST = "META-INF/MANIFEST.MF"
+
+# Package descriptor section describing the members of a delta package
+# that are not included, as they are found in its base package
+DELTA_SECTION = 'package_delta'
+
+
+def create_delta(package, base, dst):
+    """
+    Create a delta package of a package against a previous version of
+    it (the base package). The delta package only includes the members
+    of the package not found, by md5, in the base package. Its package
+    descriptor references the remaining members in the base package.
+    :param package: filename of the full package
+    :param base: filename of the base package
+    :param dst: filename of the delta package to create
+    :return: list of the package members included in the delta package.
+             None if the delta package could not be created.
+    """
+    with closing(zipfile.ZipFile(base, 'r')) as base_pck:
+        base_pd = read_package_descriptor(base_pck)
+    if not base_pd:
+        log.error("Invalid base package '{}'".format(base))
+        return
+
+    base_members = {pce['md5']: pce['name']
+                    for pce in base_pd.get('package_content', [])
+                    if pce.get('md5')}
+
+    with closing(zipfile.ZipFile(package, 'r')) as pck:
+        pd = read_package_descriptor(pck)
+        if not pd:
+            log.error("Invalid package '{}'".format(package))
+            return
+
+        included = []
+        base_content = []
+        for pce in pd.get('package_content', []):
+            if pce.get('md5') in base_members:
+                base_content.append({'name': pce['name'],
+                                     'md5': pce['md5'],
+                                     'base_name': base_members[pce['md5']]})
+            else:
+                included.append(pce['name'])
+
+        pd[DELTA_SECTION] = {
+            'base_package': {'vendor': base_pd.get('vendor'),
+                             'name': base_pd.get('name'),
+                             'version': base_pd.get('version'),
+                             'md5': generate_hash(base)},
+            'base_content': base_content}
+
+        with closing(zipfile.ZipFile(dst, 'w')) as delta_pck:
+            for name in included:
+                __copy_member__(pck, name[1:], delta_pck)
+            delta_pck.writestr(MANIFEST, dump_package_descriptor(pd),
+                               pck.getinfo(MANIFEST).compress_type)
+
+    log.info("Delta package '{}' created. {} of {} members are referenced "
+             "in the base package '{}'"
+             .format(dst, len(base_content),
+                     len(base_content) + len(included), base))
+    return included
+
+
+def apply_delta(delta, base, dst):
+    """
+    Reconstruct the full package from a delta package and its base
+    package. Members taken from the base package keep their compression
+    in it.
+    :param delta: filename of the delta package
+    :param base: filename of the base package
+    :param dst: filename of the full package to create
+    :return: True if the package was reconstructed. None otherwise.
+    """
+    with closing(zipfile.ZipFile(delta, 'r')) as delta_pck:
+        pd = read_package_descriptor(delta_pck)
+        if not pd or DELTA_SECTION not in pd:
+            log.error("'{}' is not a delta package".format(delta))
+            return
+
+        section = pd.pop(DELTA_SECTION)
+        if section['base_package']['md5'] != generate_hash(base):
+            log.error("'{}' is not the base package of the delta package "
+                      "'{}'. Expected package: {}"
+                      .format(base, delta, section['base_package']))
+            return
+
+        base_names = {pce['name']: pce['base_name']
+                      for pce in section['base_content']}
+
+        with closing(zipfile.ZipFile(base, 'r')) as base_pck, \
+                closing(zipfile.ZipFile(dst, 'w')) as pck:
+            for pce in pd.get('package_content', []):
+                if pce['name'] in base_names:
+                    md5 = __copy_member__(base_pck,
+                                          base_names[pce['name']][1:],
+                                          pck, arcname=pce['name'][1:])
+                    if md5 != pce['md5']:
+                        log.error("Member '{}' of the base package '{}' "
+                                  "does not match its md5"
+                                  .format(base_names[pce['name']], base))
+                        break
+                else:
+                    __copy_member__(delta_pck, pce['name'][1:], pck)
+            else:
+                pck.writestr(MANIFEST, dump_package_descriptor(pd),
+                             delta_pck.getinfo(MANIFEST).compress_type)
+                log.info("Package '{}' reconstructed from the delta package "
+                         "'{}'".format(dst, delta))
+                return True
+
+    os.remove(dst)
+
+
+def read_package_descriptor(pck):
+    """
+    Read the package descriptor of an open package.
+    :param pck: open package ZipFile
+    :return: package descriptor. None if the package has none.
+    """
+    try:
+        return yaml.load(pck.read(MANIFEST))
+    except (KeyError, yaml.YAMLError):
+        return
+
+
+def dump_package_descriptor(pd):
+    return yaml.dump(pd, default_flow_style=False).encode()
+
+
+def __copy_member__(src, name, dst, arcname=None):
+    """
+    Copy a member between open packages, keeping its compression.
+    :return: md5 hash of the member content
+    """
+    info = src.getinfo(name)
+    dst_info = zipfile.ZipInfo(arcname if arcname else name, info.date_time)
+    dst_info.compress_type = info.compress_type
+    dst_info.external_attr = info.external_attr
+
+    md5 = hashlib.md5()
+    with src.open(info) as src_file, \
+            dst.open(dst_info, 'w',
+                     force_zip64=info.file_size >= zipfile.ZIP64_LIMIT) \
+            as dst_file:
+        while True:
+            chunk = src_file.read(MIN_CHUNK_SIZE)
+            if not chunk:
+                break
+            md5.update(chunk)
+            dst_file.write(chunk)
+    return md5.hexdigest()
@@ -0,0 +1,65 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import json
+from son.workspace.sqlitecache import SQLiteCache
+
+
+class DigestCache(SQLiteCache):
+    """
+    Persistent cache of file digests, stored in a SQLite database.
+    Digests are keyed by the device and inode of the file and are only
+    valid while the size and modification time (ns) of the file remain
+    the same.
+    """
+
+    DB_FILENAME = 'digests.db'
+    TABLE = 'digests'
+    COLUMNS = "dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, " \
+              "digests TEXT, PRIMARY KEY (dev, ino)"
+    DESCRIPTION = 'digest cache'
+
+    def get(self, key):
+        """
+        Retrieve the stored digests of a file.
+        :param key: tuple (device, inode, size, mtime_ns) of the file
+        :return: dictionary of digests by algorithm, None if not cached
+        """
+        dev, ino, size, mtime_ns = key
+        row = self._fetch("SELECT size, mtime_ns, digests FROM digests "
+                          "WHERE dev=? AND ino=?", (dev, ino))
+
+        if not row or row[0] != size or row[1] != mtime_ns:
+            return
+        return json.loads(row[2])
+
+    def put(self, key, digests):
+        """
+        Store the digests of a file, replacing previous ones.
+        :param key: tuple (device, inode, size, mtime_ns) of the file
+        :param digests: dictionary of digests by algorithm
+        """
+        self._store(key + (json.dumps(digests, sort_keys=True),))
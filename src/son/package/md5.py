@@ -24,27 +24,276 @@
 # acknowledge the contributions of their colleagues of the SONATA
 # partner consortium (www.sonata-nfv.eu).
 
+import errno
 import hashlib
+import mmap
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+# Algorithms computed when none are specified
+DEFAULT_ALGORITHMS = ('md5',)
 
-def generate_hash(f, cs=128):
+# Bounds of the adaptive chunk size used to read files
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Files of this size, or bigger, are hashed through a memory map
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+# Files modified less than this number of seconds before being hashed
+# are not stored in the persistent cache, as they may still be changing
+RACY_INTERVAL = 2
+
+# Digests of previously hashed files, keyed by
+# (device, inode, size, mtime_ns). Unchanged files are not read again.
+_digest_memo = {}
+
+# Persistent digest cache, consulted before reading a file
+_digest_cache = None
+
+
+def use_digest_cache(cache):
+    """
+    Set the persistent digest cache (e.g. the workspace DigestCache)
+    to be consulted before hashing files.
+    :param cache: digest cache object, providing get(key) and
+                  put(key, digests). None to disable it.
+    """
+    global _digest_cache
+    _digest_cache = cache
+
+
+def generate_hash(f, cs=None):
+    """
+    Generate the md5 hash of a file or directory.
+    :param f: file or directory path
+    :param cs: chunk size. If not specified, it is adapted to the file size
+    :return: md5 hash as an hexadecimal string
+    """
     return __generate_hash__(f, cs) \
         if os.path.isfile(f) \
         else __generate_hash_path__(f, cs)
 
 
-def __generate_hash__(f, cs=128):
+def cached_hash(f):
+    """
+    Provides the md5 hash of a file from the digest memo or the persistent
+    digest cache, without reading the file.
+    :param f: file path
+    :return: md5 hash. None if the file must be hashed
+    """
+    key = __stat_key__(os.stat(f))
+    digests = _digest_memo.get(key)
+    if digests is None and _digest_cache:
+        digests = _digest_cache.get(key)
+    return digests.get('md5') if digests else None
+
+
+def generate_hashes(f, algorithms=('md5', 'sha256'), cs=None):
+    """
+    Generate several hashes of a file in a single pass over its content.
+    :param f: filename
+    :param algorithms: names of the hashlib algorithms to compute
+    :param cs: chunk size. If not specified, it is adapted to the file size
+    :return: dictionary of hexadecimal hashes, by algorithm name
+    """
+    return __cached_hashes__(f, algorithms, cs)
+
+
+def generate_member_hash(pck, name, cs=None):
+    """
+    Generate the md5 hash of a member of a zip archive, decompressing its
+    content as it is read, without extracting it.
+    :param pck: open ZipFile
+    :param name: archive name of the member
+    :param cs: chunk size. If not specified, it is adapted to the member size
+    :return: md5 hash as an hexadecimal string
+    """
+    info = pck.getinfo(name)
+    if not cs:
+        cs = chunk_size(info.file_size)
     hash = hashlib.md5()
-    with open(f, "rb") as file:
-        for chunk in iter(lambda: file.read(cs), b''):
+    with pck.open(info) as member:
+        for chunk in iter(lambda: member.read(cs), b''):
             hash.update(chunk)
     return hash.hexdigest()
 
 
-def __generate_hash_path__(p, cs=128):
+def chunk_size(size):
+    """
+    Provides an adequate chunk size to read a file of the specified size.
+    Small files are read in a single chunk while bigger files are read in
+    chunks of up to MAX_CHUNK_SIZE.
+    :param size: file size in bytes
+    :return: chunk size in bytes
+    """
+    cs = MIN_CHUNK_SIZE
+    while cs < size and cs < MAX_CHUNK_SIZE:
+        cs *= 2
+    return cs
+
+
+def generate_tree_hash(p, cs=None, workers=None):
+    """
+    Generate the md5 hash of a directory, as the root of a Merkle tree
+    over its sorted relative paths. The hash of a directory is the md5 of
+    the list of its entries, each with its type, hash and name. Files are
+    hashed concurrently in a thread pool and unchanged files are not read
+    again when a directory is digested multiple times.
+    :param p: directory path
+    :param cs: chunk size. If not specified, it is adapted to the file size
+    :param workers: maximum number of threads hashing files
+    :return: md5 hash as an hexadecimal string
+    :raise FileNotFoundError: if the directory does not exist
+    """
+    if not os.path.isdir(p):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), p)
+
+    # gather the tree structure
+    tree = {}
+    files = []
+    for root, dirs, filenames in os.walk(p):
+        rel_root = os.path.relpath(root, p)
+        tree[rel_root] = (sorted(dirs), sorted(filenames))
+        files += [os.path.join(rel_root, f) for f in filenames]
+
+    # digest all files concurrently
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = dict(zip(files, pool.map(
+            lambda f: __generate_hash__(os.path.join(p, f), cs), files)))
+
+    return __tree_hash__(tree, digests, os.curdir)
+
+
+def __tree_hash__(tree, digests, rel_root):
+    hash = hashlib.md5()
+    dirs, filenames = tree[rel_root]
+    entries = [('blob', f, digests[os.path.join(rel_root, f)])
+               for f in filenames]
+    for d in dirs:
+        # symbolic links to directories are not walked
+        rel_dir = os.path.normpath(os.path.join(rel_root, d))
+        if rel_dir in tree:
+            entries.append(('tree', d,
+                            __tree_hash__(tree, digests, rel_dir)))
+
+    for kind, name, digest in sorted(entries, key=lambda e: e[1]):
+        hash.update("{} {} {}\n".format(kind, digest, name)
+                    .encode('utf-8', 'surrogateescape'))
+    return hash.hexdigest()
+
+
+def __generate_hash__(f, cs=None):
+    return __cached_hashes__(f, DEFAULT_ALGORITHMS, cs)['md5']
+
+
+def __stat_key__(st):
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def __cached_hashes__(f, algorithms, cs=None):
+    """
+    Provides the hashes of a file, from the memo or the persistent digest
+    cache when the file is unchanged. Otherwise, the file is hashed.
+    """
+    key = __stat_key__(os.stat(f))
+    digests = _digest_memo.get(key)
+    if digests is None and _digest_cache:
+        digests = _digest_cache.get(key)
+        if digests:
+            _digest_memo[key] = digests
+
+    if digests and all(algorithm in digests for algorithm in algorithms):
+        return {algorithm: digests[algorithm] for algorithm in algorithms}
+
+    new_digests = __generate_hashes__(f, algorithms, cs)
+    __store_hashes__(key, dict(digests or {}, **new_digests))
+    return new_digests
+
+
+def __store_hashes__(key, digests):
+    _digest_memo[key] = digests
+    # skip files that were recently modified, they may still be changing
+    if _digest_cache and \
+            key[3] < (time.time() - RACY_INTERVAL) * 1000000000:
+        _digest_cache.put(key, digests)
+
+
+def __generate_hashes__(f, algorithms=DEFAULT_ALGORITHMS, cs=None,
+                        use_mmap=None):
+    hashes = [hashlib.new(algorithm) for algorithm in algorithms]
+    with open(f, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if not cs:
+            cs = chunk_size(size)
+        if use_mmap is None:
+            use_mmap = size >= MMAP_THRESHOLD
+
+        if use_mmap and size > 0:
+            __update_mmap__(hashes, file, size, cs)
+        else:
+            __update_readinto__(hashes, file, cs)
+
+    return {algorithm: hash.hexdigest()
+            for algorithm, hash in zip(algorithms, hashes)}
+
+
+def __update_mmap__(hashes, file, size, cs):
+    """
+    Feed the hashes from a memory map of the file. Slices are passed to
+    hashlib, which releases the GIL while digesting them.
+    """
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            for offset in range(0, size, cs):
+                chunk = view[offset:offset + cs]
+                for hash in hashes:
+                    hash.update(chunk)
+                chunk.release()
+        finally:
+            view.release()
+
+
+def __update_readinto__(hashes, file, cs):
+    """
+    Feed the hashes by reading the file into a single, reused buffer.
+    """
+    buf = bytearray(cs)
+    view = memoryview(buf)
+    for n in iter(lambda: file.readinto(buf), 0):
+        for hash in hashes:
+            hash.update(view[:n])
+
+
+def __generate_hash_path__(p, cs=None):
+    return generate_tree_hash(p, cs)
+
+
+def copy_hash(f, dst, cs=None):
+    """
+    Copy a file to an open file object, computing its md5 hash while
+    the content is transferred.
+    :param f: source filename
+    :param dst: destination file object
+    :param cs: chunk size. If not specified, it is adapted to the file size
+    :return: md5 hash of the copied content
+    """
     hash = hashlib.md5()
-    for root, dir, files in os.walk(p):
-        for f in files:
-            hash.update(__generate_hash__(f, cs))
+    with open(f, "rb") as file:
+        st = os.fstat(file.fileno())
+        if not cs:
+            cs = chunk_size(st.st_size)
+        buf = bytearray(cs)
+        view = memoryview(buf)
+        for n in iter(lambda: file.readinto(buf), 0):
+            hash.update(view[:n])
+            dst.write(view[:n])
+
+    # keep the digest, if the file was not modified while being copied
+    if __stat_key__(os.stat(f)) == __stat_key__(st):
+        key = __stat_key__(st)
+        __store_hashes__(key, dict(_digest_memo.get(key) or {},
+                                   md5=hash.hexdigest()))
     return hash.hexdigest()
@@ -24,6 +24,11 @@
 # acknowledge the contributions of their colleagues of the SONATA
 # partner consortium (www.sonata-nfv.eu).
 
+import codecs
+import collections
+import copy
+import hashlib
+import io
 import logging
 import os
 import pathlib
@@ -31,15 +36,28 @@ import shutil
 import sys
 import zipfile
 import coloredlogs
-import requests
 import validators
 import yaml
 import time
+import threading
 import atexit
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, \
+    TimeoutError, as_completed
 from contextlib import closing
+from requests.exceptions import RequestException
 from son.validate.validate import Validator
-from son.package.decorators import performance
-from son.package.md5 import generate_hash
+from son.validate.util import load_descriptor, cache_descriptor
+from son.util import trace
+from son.util.trace import traced, add_trace_argument, trace_to
+from son.util.profiler import add_profile_argument, profile_to
+from son.package.md5 import generate_hash, cached_hash, MIN_CHUNK_SIZE
+from son.package.blobstore import BlobStore
+from son.package.buildmanifest import BuildManifest
+from son.package.delta import create_delta, apply_delta
+from son.package.urlcheck import URLChecker
+from son.package.pipe import PackagePipe
+from son.package.zipwriter import ZipWriter, LOCAL_HEADER, \
+    CENTRAL_HEADER, END_RECORD, ZIP64_LIMIT
 from son.workspace.project import Project
 from son.workspace.workspace import Workspace
 from son.schema.validator import SchemaValidator
@@ -47,14 +65,47 @@ from son.access.access import AccessClient
 
 log = logging.getLogger(__name__)
 
+PACKAGE_DESCRIPTOR_CONTENT_TYPE = "application/sonata.package_descriptor"
+
+# Content types of artifacts that are already compressed, hence stored
+# in the package by the 'auto' compression policy
+COMPRESSED_CONTENT_TYPES = ("application/sonata.qcow2_files",
+                            "application/sonata.docker_files")
+
+# Seconds to wait for a Service Platform catalogue, unless a 'timeout' is
+# configured for the platform in the workspace
+SP_REQUEST_TIMEOUT = 10
+
+# Maximum number of concurrent requests to Service Platform catalogues
+MAX_SP_REQUESTS = 16
+
+# Rough throughputs of the build steps, in bytes per second, used to
+# estimate the duration of a build in planning mode
+PLAN_HASH_RATE = 500 << 20
+PLAN_COPY_RATE = 1 << 30
+PLAN_WRITE_RATE = 1 << 30
+PLAN_DEFLATE_RATE = 50 << 20
+
+# Package member copied as is from the previously built package, as its
+# source file is unchanged: source filename and zipfile.ZipInfo of the
+# member in the previous package
+SplicedFile = collections.namedtuple('SplicedFile', ['filename', 'info'])
+
 
 class Packager(object):
 
     def __init__(self, workspace, project=None, services=None, functions=None,
-                 dst_path=None, generate_pd=True, version="1.0"):
-
-        # Assign parameters
-        coloredlogs.install(level=workspace.log_level)
+                 dst_path=None, generate_pd=True, version="1.0", stream=False,
+                 incremental=False, jobs=1, preserve_descriptors=False,
+                 normalize_eol=False, compression='store', delta_base=None,
+                 access=None, validator=None, schema_validator=None,
+                 url_checker=None, plan=False, configure_logs=True):
+
+        # Assign parameters. Shared objects (son-access client, validators
+        # and URL checker) may be provided, e.g. by a BatchPackager, which
+        # configures the logs once for all its packages.
+        if configure_logs:
+            coloredlogs.install(level=workspace.log_level)
         self._version = version
         self._package_descriptor = None
         self._workspace = workspace
@@ -63,25 +114,79 @@ class Packager(object):
         self._functions = functions
 
         # Create a son-access client
-        self._access = AccessClient(self._workspace,
-                                    log_level=self._workspace.log_level)
+        self._access = access if access else \
+            AccessClient(self._workspace, log_level=self._workspace.log_level)
 
-        # Create a validator
-        self._validator = Validator(workspace=workspace)
-        self._validator.configure(syntax=True, integrity=False, topology=False)
+        # Create a validator. It also installs the workspace digest cache.
+        self._validator = validator if validator else \
+            create_validator(workspace)
 
         # Create a schema validator
-        self._schema_validator = SchemaValidator(workspace)
+        self._schema_validator = schema_validator if schema_validator else \
+            SchemaValidator(workspace)
+
+        # Create a checker of remote artifacts
+        self._url_checker = url_checker if url_checker else \
+            URLChecker.from_workspace(workspace)
 
         # Keep track of VNF packaging referenced in NS
         self._ns_vnf_registry = {}
 
+        # Number of VNFs packaged concurrently. The lock serializes the
+        # access of the workers to shared objects, e.g. the validator.
+        self._jobs = max(1, jobs)
+        self._lock = threading.Lock()
+
         # location to write the package
         self._dst_path = dst_path if dst_path else '.'
 
         # temporary working directory
         self._workdir = '.package-' + str(time.time())
 
+        # Images are copied into the workdir through the workspace blob
+        # store, which keeps a single copy of each content and links it
+        self._blob_store = BlobStore.from_workspace(workspace)
+
+        # In stream mode the package artifacts are written directly from
+        # their sources into the package file, without a temporary workdir.
+        self._stream = stream
+
+        # Files to be streamed into the package, as tuples of
+        # (archive name, source filename or content bytes, content entry).
+        # Only used in stream mode.
+        self._package_members = []
+
+        # Descriptors are parsed and re-emitted when packaged, unless their
+        # bytes are preserved, optionally normalizing their line endings
+        self._preserve_descriptors = preserve_descriptors
+        self._normalize_eol = normalize_eol
+
+        # Compression policy of the package members: 'store', 'deflate',
+        # 'auto' (deflate, but store already compressed images) or a
+        # dictionary of 'store' or 'deflate' by content type ('*' default)
+        self._compression = compression
+
+        # Previous version of the package. If provided, a delta package
+        # against it is generated along with the full package.
+        self._delta_base = delta_base
+
+        # In incremental mode, the outputs of the NSD and VNF packaging
+        # stages are recorded in a build manifest and reused by later
+        # builds while their inputs remain unchanged. Unchanged descriptors
+        # and images are spliced from the previously built package.
+        self._build_manifest = None
+        self._base_package = None
+        if incremental:
+            self.__init_build_manifest__()
+
+        # In planning mode, the package is resolved as it would be built,
+        # but no artifact is copied, hashed or written. The members are
+        # collected as in stream mode, whatever the mode of the build.
+        self._plan = plan
+        self._planned_stream = self._stream
+        if plan:
+            self._stream = True
+
         # Specifies THE service template of this package
         self._entry_service_template = None
 
@@ -104,18 +209,47 @@ class Packager(object):
             self.init_package_skeleton()
             self.build_package()
 
+    def remove_workdir(self):
+        """
+        Remove the temporary workdir of the package, if it exists.
+        Otherwise, it is removed on exit.
+        """
+        if os.path.isdir(self._workdir):
+            shutil.rmtree(self._workdir, True)
+
+    def __init_build_manifest__(self):
+        if not self._project:
+            log.warning("Incremental builds are only supported for "
+                        "projects. Building from scratch.")
+            return
+
+        self._build_manifest = BuildManifest.for_project(self._workspace,
+                                                         self._project)
+        if not self._build_manifest:
+            log.warning("Incremental builds require a workspace cache "
+                        "directory. Building from scratch.")
+            return
+
+        # Incremental builds are always streamed
+        self._stream = True
+
     def init_package_skeleton(self):
         """
         Validate and initialize the destination folder
         for the creation of the package artifacts.
         """
-        if os.path.isdir(self._workdir):
-            log.error("Internal error. Temporary workdir already exists.")
+        if self._plan:
             return
 
-        # workdir
-        os.mkdir(self._workdir)
-        atexit.register(shutil.rmtree, os.path.abspath(self._workdir))
+        if not self._stream:
+            if os.path.isdir(self._workdir):
+                log.error("Internal error. Temporary workdir already exists.")
+                return
+
+            # workdir
+            os.mkdir(self._workdir)
+            atexit.register(shutil.rmtree, os.path.abspath(self._workdir),
+                            True)
 
         # destination path
         if not os.path.isdir(self._dst_path):
@@ -125,6 +259,7 @@ class Packager(object):
     def package_descriptor(self):
         return self._package_descriptor
 
+    @traced()
     def build_package(self):
         """
         Create and set the full package descriptor as a dictionary.
@@ -132,6 +267,9 @@ class Packager(object):
         """
         log.info('Create Package Content Section')
         package_content = self.package_pcs()
+        if self._base_package:
+            self._base_package.close()
+            self._base_package = None
 
         log.info('Create Package Resolver Section')
         package_resolver = self.package_prs()
@@ -166,14 +304,17 @@ class Packager(object):
         self._package_descriptor.update(package_dependencies)
         self._package_descriptor.update(artifact_dependencies)
 
+        # In stream mode, the manifest is written along with the package
+        if self._stream:
+            return
+
         # Create the manifest folder and file
         meta_inf = os.path.join(self._workdir, "META-INF")
         os.makedirs(meta_inf, exist_ok=True)
-        with open(os.path.join(meta_inf, "MANIFEST.MF"), "w") as manifest:
-            manifest.write(yaml.dump(self.package_descriptor,
-                                     default_flow_style=False))
+        with open(os.path.join(meta_inf, "MANIFEST.MF"), "wb") as manifest:
+            manifest.write(dump_descriptor(self.package_descriptor))
 
-    @performance
+    @traced()
     def package_gds(self, prj_descriptor=None):
         """
         Compile information for the General Description Section.
@@ -213,7 +354,7 @@ class Packager(object):
 
         return gds
 
-    @performance
+    @traced()
     def package_pcs(self):
         """
         Compile information for the Package Content Section.
@@ -253,7 +394,7 @@ class Packager(object):
 
         return dict(package_content=pcs)
 
-    @performance
+    @traced()
     def package_prs(self):
         """
         Compile information for the Package Resolver Section.
@@ -268,7 +409,7 @@ class Packager(object):
 
         return dict(package_resolvers=self._package_resolvers)
 
-    @performance
+    @traced()
     def package_pds(self):
         """
         Compile information for the Package Dependencies
@@ -279,7 +420,7 @@ class Packager(object):
                   "This section will not be included.")
         return dict()
 
-    @performance
+    @traced()
     def package_ads(self):
         """
         Compile information for the Artifact Dependencies
@@ -293,8 +434,32 @@ class Packager(object):
                       "This section will not be included.")
             return dict()
 
+        # Remote servers are not contacted when planning
+        if not self._plan:
+            self.check_artifact_dependencies()
         return dict(artifact_dependencies=self._artifact_dependencies)
 
+    @traced()
+    def check_artifact_dependencies(self):
+        """
+        Verify the existence of the artifact dependencies, concurrently,
+        and record their md5 hash where the remote server provides it.
+        """
+        results = self._url_checker.check(
+            [ad['url'] for ad in self._artifact_dependencies])
+
+        for ad in self._artifact_dependencies:
+            result = results[ad['url']]
+            if not result['exists']:
+                log.warning("Failed to verify the existence of artifact "
+                            "'{}'".format(ad['url']))
+
+            if result['md5']:
+                ad['md5'] = result['md5']
+            else:
+                ad.pop('md5', None)
+
+    @traced()
     def generate_project_nsd(self):
         """
         Compile information for the service descriptor section.
@@ -319,8 +484,18 @@ class Packager(object):
             return
         else:
             nsd_filename = nsd_list[0]
-            with open(os.path.join(base_path, nsd_filename), 'r') as _file:
-                nsd = yaml.load(_file)
+
+        # Reuse the outputs of the previous build if the NSD is unchanged
+        stage = self._stage_id('nsd', base_path)
+        outputs = self._reuse_stage(stage)
+        if outputs:
+            for vnf_id in outputs['vnfs']:
+                self.register_ns_vnf(vnf_id)
+            self._entry_service_template = outputs['entry']
+            self._merge_stage(stage, [base_path], outputs)
+            return outputs['entries']
+
+        nsd = load_descriptor(os.path.join(base_path, nsd_filename))
 
         # Validate NSD
         log.debug("Validating Service Descriptor NSD='{}'"
@@ -342,26 +517,30 @@ class Packager(object):
                                                      vnf['vnf_name'],
                                                      vnf['vnf_version']))
 
-        # Create SD location
-        nsd = os.path.join(base_path, nsd_filename)
-        sd_path = os.path.join(self._workdir, "service_descriptors")
-        os.makedirs(sd_path, exist_ok=True)
-
         # Copy service descriptor file
-        sd = os.path.join(sd_path, nsd_filename)
-        self.copy_descriptor_file(nsd, sd)
+        nsd = os.path.join(base_path, nsd_filename)
+        members = []
+        nsd_md5 = self.package_descriptor_file(
+            nsd, os.path.join("service_descriptors", nsd_filename),
+            members=members)
 
         # Generate NSD package content entry
         pce = []
         pce_sd = dict()
         pce_sd["content-type"] = "application/sonata.service_descriptor"
         pce_sd["name"] = "/service_descriptors/{}".format(nsd_filename)
-        pce_sd["md5"] = generate_hash(nsd)
+        pce_sd["md5"] = nsd_md5
         pce.append(pce_sd)
 
         # Specify the NSD as THE entry service template of package descriptor
         self._entry_service_template = pce_sd['name']
 
+        self._merge_stage(stage, [base_path],
+                          {'entries': pce,
+                           'members': members,
+                           'artifacts': [],
+                           'vnfs': list(self._ns_vnf_registry),
+                           'entry': self._entry_service_template})
         return pce
 
     def generate_custom_nsds(self):
@@ -376,20 +555,16 @@ class Packager(object):
                           .format(nsd_filename))
                 return
 
-        # Create SD location
-        sd_path = os.path.join(self._workdir, "service_descriptors")
-        os.makedirs(sd_path, exist_ok=True)
-
         # Copy service descriptors and generate their entry points
         pce = []
         for nsd_filename in self._services:
             nsd_basename = os.path.basename(nsd_filename)
-            sd = os.path.join(sd_path, nsd_basename)
-            self.copy_descriptor_file(nsd_filename, sd)
             pce_sd = dict()
             pce_sd["content-type"] = "application/sonata.service_descriptor"
             pce_sd["name"] = "/service_descriptors/{}".format(nsd_basename)
-            pce_sd["md5"] = generate_hash(sd)
+            pce_sd["md5"] = self.package_descriptor_file(
+                nsd_filename,
+                os.path.join("service_descriptors", nsd_basename))
             pce.append(pce_sd)
 
         return pce
@@ -446,20 +621,16 @@ class Packager(object):
                           .format(vnfd_filename))
                 return
 
-        # Create FD location
-        sd_path = os.path.join(self._workdir, "function_descriptors")
-        os.makedirs(sd_path, exist_ok=True)
-
         # Copy function descriptors and generate their entry points
         pce = []
         for vnfd_filename in self._functions:
             vnfd_basename = os.path.basename(vnfd_filename)
-            sd = os.path.join(sd_path, vnfd_basename)
-            self.copy_descriptor_file(vnfd_filename, sd)
             pce_sd = dict()
             pce_sd["content-type"] = "application/sonata.function_descriptor"
             pce_sd["name"] = "/service_descriptors/{}".format(vnfd_basename)
-            pce_sd["md5"] = generate_hash(sd)
+            pce_sd["md5"] = self.package_descriptor_file(
+                vnfd_filename,
+                os.path.join("function_descriptors", vnfd_basename))
             pce.append(pce_sd)
 
         return pce
@@ -477,49 +648,48 @@ class Packager(object):
         log.debug("Loading the following VNF descriptors: {}"
                   .format(vnf_id_list))
 
-        # Iterate through the VNFs required by the NS
-        for vnf_id in vnf_id_list:
-
-            log.debug("Probing workspace catalogue for VNF id='{}'..."
-                      .format(vnf_id))
-
-            # >> First, check if this VNF is in the workspace catalogue
-            catalogue_path = os.path.join(
-                self._workspace.ws_root,
-                self._workspace.dirs[Workspace.CONFIG_STR_CATALOGUE_VNF_DIR],
-                vnf_id)
+        # >> First, check which VNFs are in the workspace catalogue
+        catalogue_dir = os.path.join(
+            self._workspace.ws_root,
+            self._workspace.dirs[Workspace.CONFIG_STR_CATALOGUE_VNF_DIR])
 
+        missing_ids = []
+        for vnf_id in vnf_id_list:
+            catalogue_path = os.path.join(catalogue_dir, vnf_id)
             if os.path.isdir(catalogue_path):
-                # Exists! Save catalogue path of this vnf for later packaging
                 log.debug("Found VNF id='{}' in workspace catalogue '{}'"
                           .format(vnf_id, catalogue_path))
                 continue
 
             log.debug("VNF id='{}' is not present in workspace catalogue. "
                       "Contacting SP Catalogue...".format(vnf_id))
+            missing_ids.append(vnf_id)
 
-            # If not in WS catalogue, get the VNF from the SP Catalogues
-            vnfd = None
-            self.retrieve_external_vnf(vnf_id)
-            if not vnfd:
-                log.warning("VNF id='{}' is not present in SP Catalogue"
-                            .format(vnf_id))
-                return False
+        if not missing_ids:
+            return True
 
-            # Create dir to hold the retrieved VNF in workspace catalogue
+        # If not in WS catalogue, get the VNFs from the SP Catalogues
+        vnfds = self.retrieve_external_vnfs(missing_ids)
+
+        # Store the retrieved VNFs in the workspace catalogue
+        for vnf_id, vnfd in vnfds.items():
             log.debug("VNF id='{}' retrieved from the SP Catalogue. "
                       "Loading to workspace cache.".format(vnf_id))
 
-            os.mkdir(catalogue_path)
-            vnfd_f = open(os.path.join(catalogue_path,
-                                       vnfd['name'] +
-                                       "." +
-                                       self._workspace.descriptor_extension),
-                          'w')
+            catalogue_path = os.path.join(catalogue_dir, vnf_id)
+            os.makedirs(catalogue_path, exist_ok=True)
+            with open(os.path.join(catalogue_path,
+                                   vnfd['name'] + "." +
+                                   self._workspace.descriptor_extension),
+                      'w') as vnfd_f:
+                yaml.dump(vnfd, vnfd_f, default_flow_style=False)
 
-            yaml.dump(vnfd, vnfd_f, default_flow_style=False)
+        for vnf_id in missing_ids:
+            if vnf_id not in vnfds:
+                log.warning("VNF id='{}' is not present in SP Catalogue"
+                            .format(vnf_id))
 
-        return True
+        return len(vnfds) == len(set(missing_ids))
 
     def generate_project_source_vnfds(self, base_path):
         """
@@ -532,32 +702,37 @@ class Packager(object):
             lambda file: os.path.isdir(os.path.join(base_path, file)),
             os.listdir(base_path))
 
-        pcs = []
-        for vnf in vnf_folders:
-            pc_entries = self.generate_vnfd_entry(
-                os.path.join(base_path, vnf), vnf)
-
-            if not pc_entries or len(pc_entries) == 0:
-                continue
-            for pce in iter(pc_entries):
-                pcs.append(pce)
-
-        return pcs
+        return self.generate_vnfd_entries(base_path, vnf_folders)
 
     def generate_external_vnfds(self, base_path, vnf_ids):
         vnf_folders = filter(
             lambda file: os.path.isdir(os.path.join(base_path, file)) and
             file in vnf_ids, os.listdir(base_path))
 
+        return self.generate_vnfd_entries(base_path, vnf_folders)
+
+    def generate_vnfd_entries(self, base_path, vnf_folders):
+        """
+        Compile information for a list of VNF folders.
+        The VNFs are processed concurrently by a pool of workers, while
+        their results are merged in the (sorted) order of the folders.
+        :param base_path: base dir location of VNF folders
+        :param vnf_folders: list of VNF folder names
+        :return: The package content entries of all VNFs.
+        """
         pcs = []
-        for vnf in vnf_folders:
-            pc_entries = self.generate_vnfd_entry(os.path.join(
-                base_path, vnf), vnf)
+        with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+            jobs = [executor.submit(self.__vnfd_entry_job__,
+                                    os.path.join(base_path, vnf), vnf)
+                    for vnf in sorted(vnf_folders)]
 
-            if not pc_entries or len(pc_entries) == 0:
-                continue
-            for pce in iter(pc_entries):
-                pcs.append(pce)
+            for job in jobs:
+                pc_entries = self.__merge_vnfd_entry__(job.result())
+
+                if not pc_entries or len(pc_entries) == 0:
+                    continue
+                for pce in iter(pc_entries):
+                    pcs.append(pce)
 
         return pcs
 
@@ -572,6 +747,47 @@ class Packager(object):
         :param vnf: The VNF reference path
         :return: The package content entries.
         """
+        return self.__merge_vnfd_entry__(
+            self.__vnfd_entry_job__(base_path, vnf))
+
+    def __merge_vnfd_entry__(self, job):
+        """
+        Merge the outputs of a VNF packaging job into the package.
+        :param job: result of the job
+        :return: The package content entries of the VNF.
+        """
+        if not job:
+            return
+
+        stage, inputs, outputs = job
+        self.check_in_ns_vnf(outputs['vnf_id'])
+        self._merge_stage(stage, inputs, outputs)
+        return outputs['entries']
+
+    @traced('Packager.vnfd_entry')
+    def __vnfd_entry_job__(self, base_path, vnf):
+        """
+        Package a specific VNF. It may run concurrently with the jobs of
+        other VNFs, hence its outputs are returned to be merged afterwards
+        instead of being added to the package.
+        :param base_path: The path where the VNF file is located
+        :param vnf: The VNF reference path
+        :return: tuple of (stage identifier, stage inputs, stage outputs).
+                 None if the VNF is not packaged.
+        """
+        trace.current().set('vnf', vnf)
+
+        # Reuse the outputs of the previous build if the VNF is unchanged
+        stage = self._stage_id('vnf', base_path)
+        outputs = self._reuse_stage(stage)
+        if outputs:
+            if outputs['vnf_id'] not in self._ns_vnf_registry:
+                log.warning("VNF id='{}' path='{}' is not referenced in the "
+                            "service descriptor. It will be excluded from "
+                            "the package".format(outputs['vnf_id'],
+                                                 base_path))
+                return
+            return stage, [base_path], outputs
 
         # Locate VNFD
         vnfd_list = [file for file in os.listdir(base_path)
@@ -594,22 +810,23 @@ class Packager(object):
             return
 
         else:
-            with open(os.path.join(base_path, vnfd_list[0]), 'r') as _file:
-                vnfd = yaml.load(_file)
+            vnfd = load_descriptor(os.path.join(base_path, vnfd_list[0]))
 
         vnfd_path = os.path.join(os.path.basename(base_path), vnfd_list[0])
 
         # Validate VNFD
         log.debug("Validating VNF descriptor file='{}'".format(vnfd_path))
-        if not self._validator.validate_function(os.path.join(base_path,
-                                                              vnfd_list[0])):
+        with self._lock:
+            valid = self._validator.validate_function(
+                os.path.join(base_path, vnfd_list[0]))
+        if not valid:
             log.exception("Failed to validate VNF descriptor '{}'"
                           .format(vnfd_path))
             return
 
         # Check if this VNF exists in the ns_vnf registry.
         # If does not, cancel its packaging
-        if not self.check_in_ns_vnf(get_vnf_id(vnfd)):
+        if get_vnf_id(vnfd) not in self._ns_vnf_registry:
             log.warning("VNF id='{}' file='{}' is not referenced in the "
                         "service descriptor. It will be excluded from "
                         "the package"
@@ -617,19 +834,17 @@ class Packager(object):
             return
 
         pce = []
-        # Create fd location
-        fd_path = os.path.join(self._workdir, "function_descriptors")
-        os.makedirs(fd_path, exist_ok=True)
+        members = []
+        artifacts = []
 
-        # Copy the descriptor file
-        fd = os.path.join(fd_path, vnfd_list[0])
-        self.copy_descriptor_file(os.path.join(base_path, vnfd_list[0]), fd)
-
-        # Generate VNFD Entry
+        # Copy the descriptor file and generate VNFD Entry
         pce_fd = dict()
         pce_fd["content-type"] = "application/sonata.function_descriptor"
         pce_fd["name"] = "/function_descriptors/{}".format(vnfd_list[0])
-        pce_fd["md5"] = generate_hash(fd)
+        pce_fd["md5"] = self.package_descriptor_file(
+            os.path.join(base_path, vnfd_list[0]),
+            os.path.join("function_descriptors", vnfd_list[0]),
+            members=members)
         pce.append(pce_fd)
 
         if 'virtual_deployment_units' in vnfd:
@@ -643,21 +858,14 @@ class Packager(object):
                 vdu_image_path = vdu['vm_image']
 
                 if validators.url(vdu_image_path):  # Check if is URL/URI.
-                    try:
-                        # Check if the image URL exists with a short Timeout
-                        requests.head(vdu_image_path, timeout=1)
-
-                    except (requests.Timeout, requests.ConnectionError):
-                        log.warning("Failed to verify the "
-                                    "existence of vm_image '{}'"
-                                    .format(vdu['vm_image']))
-
-                    # Add image URL to artifact dependencies
-                    self._add_artifact_dependency(
-                        name=vnfd['name'] + '-' + vdu['id'] + '-vm_image',
-                        url=vdu['vm_image'],
-                        md5='02236f2ae558018ed14b5222ef1bd9f1')
-                    # TODO: remote url must provide md5? This is dummy!
+                    # Add image URL to artifact dependencies. Its existence
+                    # and md5 are checked along with the other artifacts.
+                    artifacts.append({
+                        'name': vnfd['name'] + '-' + vdu['id'] + '-vm_image',
+                        'url': vdu['vm_image'],
+                        'md5': None,
+                        'credentials': {'username': 'username',
+                                        'password': 'password'}})
 
                     continue
 
@@ -674,7 +882,7 @@ class Packager(object):
                     if os.path.isfile(bd):
                         pce.append(self.__pce_img_gen__(
                             base_path, vnf, vdu, vdu['vm_image'],
-                            dir_p='', dir_o=''))
+                            dir_p='', dir_o='', members=members))
 
                     elif os.path.isdir(bd):
                         for root, dirs, files in os.walk(bd):
@@ -685,13 +893,212 @@ class Packager(object):
                                     dir_o = dir_o[1:]
                                 pce.append(self.__pce_img_gen__(
                                     root, vnf, vdu, f,
-                                    dir_p=dir_p, dir_o=dir_o))
+                                    dir_p=dir_p, dir_o=dir_o,
+                                    members=members))
 
                 elif vdu['vm_image_format'] == 'docker':
                     log.debug("Referenced vm_image is docker '{}'"
                               .format(vdu['vm_image']))
 
-        return pce
+        return stage, [base_path], {'entries': pce,
+                                    'members': members,
+                                    'artifacts': artifacts,
+                                    'vnf_id': get_vnf_id(vnfd)}
+
+    def _stage_id(self, kind, path):
+        """
+        Identifier of a build stage. Stages of builds with different
+        descriptor copy modes are not interchangeable.
+        :param kind: kind of stage, i.e. 'nsd' or 'vnf'
+        :param path: input directory of the stage
+        :return: stage identifier
+        """
+        mode = 'parse'
+        if self._preserve_descriptors:
+            mode = 'preserve-eol' if self._normalize_eol else 'preserve'
+        return '{}:{}:{}'.format(kind, mode, os.path.abspath(path))
+
+    def _reuse_stage(self, stage):
+        """
+        Obtain the outputs of a stage of the previous build, if its inputs
+        are unchanged and its descriptors can be spliced from the previous
+        package.
+        :param stage: stage identifier
+        :return: stage outputs. None if the stage must be redone.
+        """
+        if not self._build_manifest:
+            return
+
+        memo = self._build_manifest.lookup(stage)
+        if not memo:
+            return
+
+        outputs = copy.deepcopy(memo)
+        pce = outputs['entries']
+        members = []
+        for arcname, source, index, md5 in memo['members']:
+            entry = pce[index] if index is not None else None
+            if source is None:
+                source = self._splice_member(arcname, md5)
+                if source is None:
+                    return
+            elif entry is not None:
+                source = self._splice_file(arcname, source, entry)
+            members.append((arcname, source, entry))
+
+        log.debug("Reusing build stage '{}'".format(stage))
+        outputs['members'] = members
+        return outputs
+
+    def _merge_stage(self, stage, inputs, outputs):
+        """
+        Merge the outputs of a packaging stage into the package and record
+        them in the build manifest.
+        :param stage: stage identifier
+        :param inputs: list of input files and directories of the stage
+        :param outputs: dictionary of stage outputs, holding the package
+                        content 'entries', the package 'members' and the
+                        'artifacts' dependencies added by the stage
+        """
+        self._package_members += outputs['members']
+        for ad in outputs['artifacts']:
+            self._add_artifact_dependency(
+                ad['name'], ad['url'], ad['md5'],
+                username=ad['credentials']['username'],
+                password=ad['credentials']['password'])
+
+        if not self._build_manifest:
+            return
+
+        # Members are recorded as [arcname, source, entry index, md5]
+        members = []
+        inputs = list(inputs)
+        for arcname, source, entry in outputs['members']:
+            index = None
+            for i, e in enumerate(outputs['entries']):
+                if e is entry:
+                    index = i
+            if isinstance(source, bytes):
+                # Content is spliced from this package by later builds
+                members.append([arcname, None, index,
+                                hashlib.md5(source).hexdigest()])
+            else:
+                if isinstance(source, SplicedFile):
+                    source = source.filename
+                members.append([arcname, source, index, None])
+                inputs.append(source)
+
+        record = dict(outputs)
+        record['members'] = members
+        self._build_manifest.record(stage, inputs, record)
+
+    def _splice_member(self, arcname, md5):
+        """
+        Read the content of a member of the previously built package.
+        :param arcname: name of the member
+        :param md5: expected md5 hash of the member content
+        :return: member content as bytes. None if it cannot be obtained.
+        """
+        try:
+            content = self._previous_package().read(arcname)
+
+        except (OSError, KeyError, TypeError, zipfile.BadZipFile) as e:
+            log.debug("Unable to reuse member '{}' of previous package: {}"
+                      .format(arcname, e))
+            return
+
+        if hashlib.md5(content).hexdigest() != md5:
+            log.debug("Member '{}' of previous package was modified"
+                      .format(arcname))
+            return
+
+        return content
+
+    def _splice_file(self, arcname, filename, pce):
+        """
+        Locate a member of the previously built package, to be copied as is
+        into the package instead of its source file. The source file is
+        known to be unchanged, by its size and modification time, and its
+        md5 hash is recorded in the build manifest. The previous package
+        must not have been modified since it was built and the member must
+        be compressed as required by the compression policy.
+        :param arcname: name of the member
+        :param filename: source filename of the member
+        :param pce: package content entry of the member
+        :return: SplicedFile. The source filename if it cannot be spliced.
+        """
+        if not pce.get('md5') or not self._build_manifest.package_unchanged():
+            return filename
+
+        try:
+            info = self._previous_package().getinfo(arcname)
+        except (OSError, KeyError, TypeError, zipfile.BadZipFile) as e:
+            log.debug("Unable to reuse member '{}' of previous package: {}"
+                      .format(arcname, e))
+            return filename
+
+        if info.file_size != os.path.getsize(filename) or \
+                info.compress_type != self.compress_type(
+                    pce['content-type']):
+            return filename
+
+        return SplicedFile(filename, info)
+
+    def _previous_package(self):
+        """
+        Open the previously built package, once for all the spliced members.
+        :return: zipfile.ZipFile of the previous package
+        """
+        with self._lock:
+            if not self._base_package:
+                self._base_package = zipfile.ZipFile(
+                    self._build_manifest.package)
+        return self._base_package
+
+    def package_descriptor_file(self, src_descriptor, arcname, members=None):
+        """
+        Add a descriptor file to the package, at the specified location.
+        The descriptor is copied to the workdir or, in stream mode, kept in
+        memory to be written along with the package.
+        :param src_descriptor: descriptor filename
+        :param arcname: location of the descriptor inside the package
+        :param members: list to add the package member to, in stream mode.
+                        Defaults to the package members
+        :return: the md5 hash of the packaged descriptor
+        """
+        if members is None:
+            members = self._package_members
+
+        # Descriptors are re-emitted unless their bytes are preserved
+        rewrite = not self._preserve_descriptors or \
+            descriptor_needs_rewrite(src_descriptor)
+
+        if self._stream:
+            if rewrite:
+                content = dump_descriptor_file(src_descriptor)
+            elif self._normalize_eol:
+                with io.BytesIO() as dst:
+                    copy_normalize_eol(src_descriptor, dst)
+                    content = dst.getvalue()
+            else:
+                # Streamed verbatim from the source file
+                members.append((arcname, src_descriptor, None))
+                return generate_hash(src_descriptor)
+
+            members.append((arcname, content, None))
+            return hashlib.md5(content).hexdigest()
+
+        dst_descriptor = os.path.join(self._workdir, arcname)
+        os.makedirs(os.path.dirname(dst_descriptor), exist_ok=True)
+        if rewrite:
+            self.copy_descriptor_file(src_descriptor, dst_descriptor)
+        elif self._normalize_eol:
+            with open(dst_descriptor, 'wb') as dst:
+                return copy_normalize_eol(src_descriptor, dst)
+        else:
+            shutil.copyfile(src_descriptor, dst_descriptor)
+            return generate_hash(src_descriptor)
+        return generate_hash(dst_descriptor)
 
     @staticmethod
     def copy_descriptor_file(src_descriptor, dst_descriptor):
@@ -703,13 +1110,11 @@ class Packager(object):
         :param dst_descriptor:
         :return:
         """
-        with open(src_descriptor, "r") as vnfd_file:
-            vnf_content = yaml.load(vnfd_file)
+        with open(dst_descriptor, "wb") as vnfd_file:
+            vnfd_file.write(dump_descriptor_file(src_descriptor))
 
-        with open(dst_descriptor, "w") as vnfd_file:
-            vnfd_file.write(yaml.dump(vnf_content, default_flow_style=False))
-
-    def __pce_img_gen__(self, bd, vnf, vdu, f, dir_p='', dir_o=''):
+    def __pce_img_gen__(self, bd, vnf, vdu, f, dir_p='', dir_o='',
+                        members=None):
         pce = dict()
         img_format = 'raw' \
             if not vdu['vm_image_format'] \
@@ -717,7 +1122,16 @@ class Packager(object):
 
         pce["content-type"] = "application/sonata.{}_files".format(img_format)
         pce["name"] = "/{}_files/{}{}/{}".format(img_format, vnf, dir_p, f)
-        pce["md5"] = self.__pce_img_gen_fc__(img_format, vnf, f, bd, dir_o)
+
+        if self._stream:
+            # md5 is computed while the file is written to the package
+            pce["md5"] = None
+            if members is None:
+                members = self._package_members
+            members.append((pce["name"][1:], os.path.join(bd, f), pce))
+        else:
+            pce["md5"] = self.__pce_img_gen_fc__(img_format, vnf, f, bd,
+                                                 dir_o)
 
         return pce
 
@@ -726,14 +1140,24 @@ class Packager(object):
         fd_path = os.path.join(self._workdir, fd_path)
         os.makedirs(fd_path, exist_ok=True)
         fd = os.path.join(fd_path, f)
+
+        if self._blob_store:
+            md5 = self._blob_store.add(os.path.join(root, f))
+            self._blob_store.link(md5, fd)
+            return md5
+
         shutil.copyfile(os.path.join(root, f), fd)
-        return generate_hash(fd)
 
+        # Hash the source file, its digest may be already cached
+        return generate_hash(os.path.join(root, f))
+
+    @traced()
     def generate_package(self, name):
         """
         Generate the final package version.
         :param name: The name of the final version of the package,
         the project name will be used if no name provided
+        :return: the package filename. None if it failed validation.
         """
 
         # Validate all needed information
@@ -743,21 +1167,43 @@ class Packager(object):
             exit(1)
 
         if not name:
-            name = self._package_descriptor['vendor'] + "." + \
-                self._package_descriptor['name'] + "." + \
-                self._package_descriptor['version']
+            name = self.__default_name__()
 
         # Generate package file
         zip_name = os.path.join(self._dst_path, name + '.son')
-        with closing(zipfile.ZipFile(zip_name, 'w')) as pck:
-            for base, dirs, files in os.walk(self._workdir):
-                for file_name in files:
-                    full_path = os.path.join(base, file_name)
-                    relative_path = \
-                        full_path[len(self._workdir) + len(os.sep):]
-
-                    if not full_path == zip_name:
-                        pck.write(full_path, relative_path)
+        with trace.span('Packager.write_package', stream=self._stream,
+                        jobs=self._jobs) as s:
+            if self._stream:
+                # Members may be copied from a previous package of the same
+                # name, which is only replaced once the package is written
+                part_name = zip_name + '.part'
+                try:
+                    with open(part_name, 'wb') as _file, \
+                            ZipWriter(_file, workers=self._jobs) as pck:
+                        self.write_package_stream(pck)
+                    os.replace(part_name, zip_name)
+                except BaseException:
+                    # Leave no partial package behind
+                    if os.path.exists(part_name):
+                        os.remove(part_name)
+                    raise
+
+            else:
+                content_types = self.__content_types__()
+                with closing(zipfile.ZipFile(zip_name, 'w')) as pck:
+                    for base, dirs, files in os.walk(self._workdir):
+                        for file_name in files:
+                            full_path = os.path.join(base, file_name)
+                            relative_path = \
+                                full_path[len(self._workdir) + len(os.sep):]
+                            content_type = content_types.get(
+                                relative_path.replace(os.sep, '/'))
+
+                            if not full_path == zip_name:
+                                pck.write(full_path, relative_path,
+                                          compress_type=self.compress_type(
+                                              content_type))
+            s.set('size', os.path.getsize(zip_name))
 
         # Validate PD
         log.debug("Validating Package")
@@ -767,10 +1213,258 @@ class Packager(object):
             self._package_descriptor = None
             return
 
+        if self._build_manifest:
+            self._build_manifest.package = os.path.abspath(zip_name)
+            self._build_manifest.save()
+
+        if self._blob_store and not self._stream:
+            self._blob_store.gc()
+
         package_md5 = generate_hash(zip_name)
         log.info("Package generated successfully.\nFile: {}\nMD5: {}\n"
                  .format(os.path.abspath(zip_name), package_md5))
 
+        if self._delta_base:
+            delta_name = os.path.join(self._dst_path, name + '.delta.son')
+            if create_delta(zip_name, self._delta_base, delta_name) is None:
+                log.error("Failed to generate delta package")
+
+        return zip_name
+
+    @traced()
+    def write_package_to(self, fileobj):
+        """
+        Write the package into a file object, which does not need to be
+        seekable, e.g. the standard output or an upload in progress.
+        Requires the stream mode. As no package file is kept to be
+        validated, the package descriptor is validated against its
+        schema before the package is written.
+        :param fileobj: writable binary file object
+        :return: True if the package was written. None if it failed
+                 validation.
+        """
+        if not self._package_descriptor:
+            log.critical("Missing package descriptor. "
+                         "Failed to generate package.")
+            exit(1)
+
+        if not self._stream:
+            log.error("A package can only be written to a file object in "
+                      "stream mode")
+            return
+
+        log.debug("Validating Package Descriptor")
+        if not self._schema_validator.validate(
+                self._package_descriptor,
+                SchemaValidator.SCHEMA_PACKAGE_DESCRIPTOR):
+            log.debug("Failed to validate Package Descriptor. "
+                      "Aborting package creation.")
+            return
+
+        with trace.span('Packager.write_package', stream=True,
+                        jobs=self._jobs):
+            with ZipWriter(fileobj, workers=self._jobs) as pck:
+                self.write_package_stream(pck)
+
+        log.info("Package generated successfully.")
+        return True
+
+    @traced()
+    def upload_package(self, push, name=None):
+        """
+        Upload the package to a Service Platform while it is generated,
+        so that packaging and upload overlap and no package file is
+        written. Requires the stream mode.
+        :param push: son.access.push.Push client of the Service Platform
+        :param name: name of the package in the upload, the package
+                     descriptor vendor, name and version if not provided
+        :return: text response message of the server or error message.
+                 None if the package failed validation.
+        """
+        if not self._stream:
+            log.error("A package can only be uploaded while it is generated "
+                      "in stream mode")
+            return
+
+        if not self._package_descriptor or not \
+                self._schema_validator.validate(
+                    self._package_descriptor,
+                    SchemaValidator.SCHEMA_PACKAGE_DESCRIPTOR):
+            log.error("Failed to validate Package Descriptor. "
+                      "Aborting package upload.")
+            return
+
+        pipe = PackagePipe()
+
+        def produce():
+            try:
+                written = self.write_package_to(pipe)
+            except BaseException as e:
+                pipe.abort(e)
+                return
+            if written:
+                pipe.close()
+            else:
+                pipe.abort(RuntimeError("Failed to generate the package"))
+
+        producer = threading.Thread(target=produce, name='package-writer')
+        producer.start()
+        try:
+            return push.upload_package_stream(
+                pipe, filename=(name if name else self.__default_name__()) +
+                '.son')
+        finally:
+            pipe.cancel()
+            producer.join()
+
+    @traced()
+    def plan(self):
+        """
+        Report what the build of the package would do, from the package
+        resolved in planning mode: the size of each member, whether its
+        digest is cached or must be computed, the artifact dependencies,
+        and estimates of the build duration and of the package size.
+        :return: plan as a dictionary. None if the package could not be
+                 resolved.
+        """
+        if not self._package_descriptor:
+            return
+
+        # The digests of streamed artifacts are only known once written
+        pd = copy.deepcopy(self._package_descriptor)
+        for pce in pd.get('package_content', []):
+            if not pce.get('md5'):
+                pce['md5'] = 'f' * 32
+
+        content_types = self.__content_types__()
+        members = list(self._package_members)
+        members.append(("META-INF/MANIFEST.MF", dump_descriptor(pd), None))
+
+        entries = []
+        for arcname, source, pce in members:
+            entry = {'name': arcname,
+                     'content-type': content_types.get(arcname),
+                     'compression': 'deflate' if self.compress_type(
+                         content_types.get(arcname)) == zipfile.ZIP_DEFLATED
+                     else 'store'}
+            if isinstance(source, bytes):
+                # Descriptors re-emitted in memory, already hashed
+                entry.update(source=None, size=len(source), digest='inline')
+            elif isinstance(source, SplicedFile):
+                # Copied from the previous package, already hashed
+                entry.update(source=None, size=source.info.file_size,
+                             digest='spliced')
+            else:
+                entry.update(source=source, size=os.path.getsize(source),
+                             digest='cached' if cached_hash(source)
+                             else 'hash')
+            entries.append(entry)
+
+        return {'stream': self._planned_stream,
+                'jobs': self._jobs,
+                'entries': entries,
+                'artifact_dependencies':
+                    [ad['url'] for ad in self._artifact_dependencies],
+                'size': sum(e['size'] for e in entries),
+                'hash_size': sum(e['size'] for e in entries
+                                 if e['digest'] == 'hash'),
+                'estimated_size': estimate_package_size(
+                    entries, self._planned_stream),
+                'estimated_time': self.__estimate_time__(entries)}
+
+    def __estimate_time__(self, entries):
+        """
+        Estimated duration of the build of the planned package members.
+        In stream mode, members are read once, while being hashed and
+        written. Otherwise, uncached artifacts are hashed and copied into
+        the workdir, unless already in the blob store, then zipped by a
+        single thread.
+        """
+        size = sum(e['size'] for e in entries)
+        deflated = sum(e['size'] for e in entries
+                       if e['compression'] == 'deflate')
+        if self._planned_stream:
+            return size / PLAN_HASH_RATE + size / PLAN_WRITE_RATE + \
+                deflated / (PLAN_DEFLATE_RATE * self._jobs)
+
+        files = [e for e in entries if e['source']]
+        hashed = sum(e['size'] for e in files if e['digest'] == 'hash')
+        copied = hashed if self._blob_store else \
+            sum(e['size'] for e in files)
+        return hashed / PLAN_HASH_RATE + copied / PLAN_COPY_RATE + \
+            size / PLAN_WRITE_RATE + deflated / PLAN_DEFLATE_RATE
+
+    def __default_name__(self):
+        """
+        Default package name, from the vendor, name and version of the
+        package descriptor.
+        """
+        return self._package_descriptor['vendor'] + "." + \
+            self._package_descriptor['name'] + "." + \
+            self._package_descriptor['version']
+
+    def write_package_stream(self, pck):
+        """
+        Write the package members straight from their sources into the
+        package file. The md5 hash of each file is computed while it is
+        written, unless it is copied from the previous build, and, finally,
+        the package descriptor is added as the last member of the package.
+        :param pck: the open package ZipWriter
+        """
+        content_types = self.__content_types__()
+        previous = None
+        try:
+            for arcname, source, pce in self._package_members:
+                if isinstance(source, SplicedFile):
+                    # Its md5 hash is already known from the previous build
+                    if not previous:
+                        previous = open(self._build_manifest.package, 'rb')
+                    pck.copy(arcname, previous, source.info)
+                    continue
+
+                compress_type = self.compress_type(content_types.get(arcname))
+                md5 = pck.write(arcname, source, compress_type)
+
+                if pce is not None:
+                    pce['md5'] = md5
+        finally:
+            if previous:
+                previous.close()
+
+        pck.write("META-INF/MANIFEST.MF",
+                  dump_descriptor(self.package_descriptor),
+                  self.compress_type(PACKAGE_DESCRIPTOR_CONTENT_TYPE))
+
+    def __content_types__(self):
+        """
+        Content types of the package members, by archive name.
+        """
+        content_types = {pce['name'][1:]: pce['content-type']
+                         for pce in self._package_descriptor.get(
+                             'package_content', [])}
+        content_types["META-INF/MANIFEST.MF"] = \
+            PACKAGE_DESCRIPTOR_CONTENT_TYPE
+        return content_types
+
+    def compress_type(self, content_type):
+        """
+        Compression of a package member, according to the compression
+        policy of the package.
+        :param content_type: content type of the member
+        :return: zipfile.ZIP_STORED or zipfile.ZIP_DEFLATED
+        """
+        if isinstance(self._compression, dict):
+            mode = self._compression.get(
+                content_type, self._compression.get('*', 'store'))
+        elif self._compression == 'auto':
+            mode = 'store' if content_type in COMPRESSED_CONTENT_TYPES \
+                else 'deflate'
+        else:
+            mode = self._compression
+
+        return zipfile.ZIP_DEFLATED if mode == 'deflate' \
+            else zipfile.ZIP_STORED
+
     def register_ns_vnf(self, vnf_id):
         """
         Add a vnf to the NS VNF registry.
@@ -806,29 +1500,87 @@ class Packager(object):
 
     def retrieve_external_vnf(self, descriptor_id):
         """
-        Retrieve descriptor from the ervice Platform catalogue.
-        It will loop through available Service Plaforms to retrieve the
-        required descriptor
+        Retrieve descriptor from the Service Platform catalogues.
         :return: descriptor content
         """
-        # first, contact the default platform
-        vnfd = self._access.pull_resource('functions',
-                                          identifier=descriptor_id,
-                                          uuid=False)
-        if vnfd:
-            return vnfd
+        return self.retrieve_external_vnfs([descriptor_id]).get(descriptor_id)
 
-        # if not retrieved, loop through remaining platforms
-        for platform, p_id in self._workspace.service_platforms.items():
-            # ignore default platform
-            if p_id == self._workspace.default_service_platform:
-                continue
-            vnfd = self._access.pull_resource('functions',
-                                              identifier=descriptor_id,
-                                              uuid=False,
-                                              platform_id=p_id)
-            if vnfd:
-                return vnfd
+    @traced()
+    def retrieve_external_vnfs(self, descriptor_ids):
+        """
+        Retrieve descriptors from the Service Platform catalogues.
+        All descriptors are requested concurrently from all available
+        Service Platforms, taking the first successful answer for each
+        descriptor. Requests are bounded by the timeout of their platform
+        and the retrieval by the longest of these timeouts. Pending
+        requests for descriptors already retrieved are cancelled.
+        :param descriptor_ids: list of descriptor ids
+        :return: dictionary of the retrieved descriptors, by id
+        """
+        # the default platform is requested first
+        platforms = sorted(self._access.pull.keys(), key=lambda p_id: (
+            p_id != self._workspace.default_service_platform, p_id))
+        if not platforms:
+            return {}
+
+        timeouts = {p_id: (self._workspace.get_service_platform(p_id) or {})
+                    .get('timeout', SP_REQUEST_TIMEOUT)
+                    for p_id in platforms}
+        deadline = time.monotonic() + max(timeouts.values())
+
+        vnfds = {}
+        requests = {}
+        executor = ThreadPoolExecutor(max_workers=min(
+            MAX_SP_REQUESTS, len(descriptor_ids) * len(platforms)))
+        try:
+            for descriptor_id in descriptor_ids:
+                for p_id in platforms:
+                    job = executor.submit(self.__pull_vnfd__, p_id,
+                                          descriptor_id, timeouts[p_id],
+                                          deadline)
+                    requests[job] = descriptor_id
+
+            for job in as_completed(requests,
+                                    timeout=deadline - time.monotonic()):
+                descriptor_id = requests[job]
+                if descriptor_id in vnfds or not job.result():
+                    continue
+
+                vnfds[descriptor_id] = job.result()
+                for other_job, other_id in requests.items():
+                    if other_id == descriptor_id:
+                        other_job.cancel()
+
+                if len(vnfds) == len(set(descriptor_ids)):
+                    break
+        except TimeoutError:
+            log.debug("Timed out retrieving VNFs from Service Platforms")
+        finally:
+            # Requests in flight are not waited for, as they are not
+            # needed, but they end by the deadline
+            for job in requests:
+                job.cancel()
+            executor.shutdown(wait=False)
+
+        return vnfds
+
+    def __pull_vnfd__(self, p_id, descriptor_id, timeout, deadline):
+        timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            return
+
+        try:
+            vnfd = self._access.pull[p_id].get_vnf_by_id(descriptor_id,
+                                                         timeout=timeout)
+        except (RequestException, yaml.YAMLError) as e:
+            log.debug("Failed to retrieve VNF id='{}' from Service Platform "
+                      "'{}': {}".format(descriptor_id, p_id, e))
+            return
+
+        if isinstance(vnfd, dict) and 'name' in vnfd:
+            log.debug("Retrieved VNF id='{}' from Service Platform '{}'"
+                      .format(descriptor_id, p_id))
+            return vnfd
 
     def _add_package_resolver(self, name, username='username',
                               password='password'):
@@ -877,6 +1629,272 @@ class Packager(object):
         self._sealed = False
 
 
+class BatchPackager(object):
+    """
+    Packages several projects of a workspace in a single process. The
+    son-access client, the validators (and their schema library) and the
+    URL checker are created once and shared by all packages.
+    """
+
+    def __init__(self, workspace, dst_path=None, **options):
+        """
+        :param workspace: SONATA workspace object
+        :param dst_path: default location to write the packages
+        :param options: Packager options applied to all packages,
+                        e.g. stream, jobs or compression
+        """
+        coloredlogs.install(level=workspace.log_level)
+        self._workspace = workspace
+        self._dst_path = dst_path
+        self._options = options
+        self._access = AccessClient(workspace,
+                                    log_level=workspace.log_level)
+        self._validator = create_validator(workspace)
+        self._schema_validator = SchemaValidator(workspace)
+        self._url_checker = URLChecker.from_workspace(workspace)
+
+    @property
+    def workspace(self):
+        return self._workspace
+
+    def package(self, project, name=None, dst_path=None):
+        """
+        Package a project.
+        :param project: SONATA project object
+        :param name: package name. If not provided, it is derived from the
+                     vendor, name and version of the project
+        :param dst_path: location to write the package
+        :return: the package filename. None if packaging failed.
+        """
+        # Descriptors stored by previous validations must not be reused
+        self._validator.reset()
+
+        pck = Packager(self._workspace, project=project,
+                       dst_path=dst_path if dst_path else self._dst_path,
+                       access=self._access, validator=self._validator,
+                       schema_validator=self._schema_validator,
+                       url_checker=self._url_checker, configure_logs=False,
+                       **self._options)
+
+        # The workdir is removed once packaged, as the exit handlers are
+        # not run by the worker processes of package_projects
+        try:
+            if not pck.package_descriptor:
+                log.error("Failed to package project '{}'"
+                          .format(project.project_root))
+                return
+
+            return pck.generate_package(name)
+        finally:
+            pck.remove_workdir()
+
+    def package_projects(self, prj_roots, processes=1):
+        """
+        Package several projects, in this process or distributed by a pool
+        of processes, each with its own shared objects.
+        :param prj_roots: list of project directories
+        :param processes: number of processes
+        :return: list of package filenames, in the order of the projects.
+                 None for the projects that failed to be packaged.
+        """
+        if processes <= 1:
+            return [self.__package_project__(prj_root)
+                    for prj_root in prj_roots]
+
+        with ProcessPoolExecutor(
+                max_workers=processes, initializer=__init_batch_process__,
+                initargs=(self._workspace.ws_root, self._dst_path,
+                          self._options, trace.is_enabled())) as executor:
+            results = list(executor.map(__package_batch_project__,
+                                        prj_roots))
+
+        # The spans of the workers are exported with those of this process
+        for _, spans in results:
+            trace.merge(spans)
+        return [filename for filename, _ in results]
+
+    def __package_project__(self, prj_root):
+        project = Project.__create_from_descriptor__(self._workspace,
+                                                     prj_root)
+        if not project:
+            return
+
+        return self.package(project)
+
+
+# Batch packager of a worker process of BatchPackager.package_projects
+_batch = None
+
+
+def __init_batch_process__(ws_root, dst_path, options, tracing):
+    global _batch
+
+    # Spans inherited from the parent process are not reported again
+    trace.reset()
+    if tracing:
+        trace.enable()
+
+    workspace = Workspace.__create_from_descriptor__(ws_root)
+    _batch = BatchPackager(workspace, dst_path=dst_path, **options)
+
+
+def __package_batch_project__(prj_root):
+    filename = _batch.__package_project__(prj_root)
+    spans = trace.spans()
+    trace.reset()
+    return filename, spans
+
+
+def create_validator(workspace):
+    """
+    Create a validator configured to validate the syntax of descriptors,
+    as required by the Packager.
+    :param workspace: SONATA workspace object
+    :return: validator
+    """
+    validator = Validator(workspace=workspace)
+    validator.configure(syntax=True, integrity=False, topology=False)
+    return validator
+
+
+def dump_descriptor_file(src_descriptor):
+    """
+    Parse a descriptor file and provide its digested content, as it is
+    written by 'Packager.copy_descriptor_file'.
+    :param src_descriptor: descriptor filename
+    :return: descriptor content as bytes
+    """
+    return dump_descriptor(load_descriptor(src_descriptor))
+
+
+def descriptor_needs_rewrite(src_descriptor):
+    """
+    Check if a descriptor file must be re-emitted to be packaged, i.e. if
+    it is not encoded in plain UTF-8: it starts with a byte order mark
+    (UTF-8 with BOM, UTF-16 or UTF-32).
+    :param src_descriptor: descriptor filename
+    :return: True if the descriptor must be re-emitted
+    """
+    with open(src_descriptor, 'rb') as _file:
+        head = _file.read(4)
+
+    return head.startswith((codecs.BOM_UTF8, codecs.BOM_UTF16_LE,
+                            codecs.BOM_UTF16_BE, codecs.BOM_UTF32_BE))
+
+
+def copy_normalize_eol(src_descriptor, dst, cs=MIN_CHUNK_SIZE):
+    """
+    Copy a descriptor file chunk by chunk, converting its line endings
+    (CRLF or CR) to LF.
+    :param src_descriptor: descriptor filename
+    :param dst: writable binary file object
+    :param cs: chunk size
+    :return: the md5 hash of the written content
+    """
+    h = hashlib.md5()
+    carry = b''
+    with open(src_descriptor, 'rb') as src:
+        for chunk in iter(lambda: src.read(cs), b''):
+            chunk = carry + chunk
+
+            # A CR at the end of the chunk may be followed by a LF
+            carry = b'\r' if chunk.endswith(b'\r') else b''
+            if carry:
+                chunk = chunk[:-1]
+
+            chunk = chunk.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+            h.update(chunk)
+            dst.write(chunk)
+
+    if carry:
+        h.update(b'\n')
+        dst.write(b'\n')
+
+    return h.hexdigest()
+
+
+def dump_descriptor(descriptor):
+    """
+    Serialize a descriptor. The descriptor is added to the descriptor
+    cache, so that the serialized content is not parsed again, e.g. when
+    the package is validated.
+    :param descriptor: descriptor content
+    :return: serialized descriptor as bytes
+    """
+    data = yaml.dump(descriptor, default_flow_style=False).encode()
+    cache_descriptor(data, descriptor)
+    return data
+
+
+def estimate_package_size(entries, stream=False):
+    """
+    Estimate the size of a package file from the planned members. The
+    size of deflated members is not known in advance: their uncompressed
+    size is taken, hence the estimate is an upper bound.
+    :param entries: planned members, with their 'name' and 'size'
+    :param stream: True if the package is written in stream mode, with
+                   data descriptors
+    :return: estimated size in bytes
+    """
+    size = END_RECORD.size
+    for entry in entries:
+        zip64 = entry['size'] > ZIP64_LIMIT
+        size += LOCAL_HEADER.size + CENTRAL_HEADER.size + \
+            2 * len(entry['name'].encode('utf-8')) + entry['size']
+        if zip64:
+            size += 20 + 28
+        if stream:
+            size += 24 if zip64 else 16
+    return size
+
+
+def format_size(size):
+    """
+    Human readable size.
+    """
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            break
+        size /= 1024
+    return "{:.1f} {}".format(size, unit) if unit != 'B' \
+        else "{} B".format(size)
+
+
+def format_plan(plan):
+    """
+    Format a package plan as a table of its members, followed by a
+    summary.
+    :param plan: plan provided by Packager.plan()
+    :return: text of the plan
+    """
+    lines = ["{:>10}  {:<7}  {:<8}  {}".format('size', 'digest',
+                                               'compress', 'member')]
+    for entry in plan['entries']:
+        lines.append("{:>10}  {:<7}  {:<8}  {}".format(
+            format_size(entry['size']), entry['digest'],
+            entry['compression'], entry['name']))
+
+    for url in plan['artifact_dependencies']:
+        lines.append("{:>10}  {:<7}  {:<8}  {}".format('-', 'remote', '-',
+                                                       url))
+
+    hashed = [e for e in plan['entries'] if e['digest'] == 'hash']
+    lines.append("")
+    lines.append("Members: {}, {}".format(len(plan['entries']),
+                                          format_size(plan['size'])))
+    lines.append("To hash: {} files, {}".format(
+        len(hashed), format_size(plan['hash_size'])))
+    lines.append("Artifact dependencies: {}".format(
+        len(plan['artifact_dependencies'])))
+    lines.append("Estimated package size: {}{}".format(
+        "up to " if any(e['compression'] == 'deflate'
+                        for e in plan['entries']) else "",
+        format_size(plan['estimated_size'])))
+    lines.append("Estimated build time: {:.2f} s ({} mode)".format(
+        plan['estimated_time'], 'stream' if plan['stream'] else 'workdir'))
+    return '\n'.join(lines)
+
+
 def get_vnf_id(vnfd):
     return get_vnf_id_full(vnfd['vendor'], vnfd['name'], vnfd['version'])
 
@@ -902,6 +1920,35 @@ def __validate_directory__(paths):
     return True
 
 
+def __generate_package__(pck, name, output=None, plan=False):
+    """
+    Generate the package file, or write the package to the given output.
+    :param pck: Packager
+    :param name: package name
+    :param output: output filename. '-' for the standard output
+    :param plan: only print the plan of the package
+    """
+    if plan:
+        package_plan = pck.plan()
+        if not package_plan:
+            exit(1)
+        print(format_plan(package_plan))
+        return
+
+    if not output:
+        pck.generate_package(name)
+        return
+
+    if output == '-':
+        written = pck.write_package_to(sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    else:
+        with open(output, 'wb') as _file:
+            written = pck.write_package_to(_file)
+    if not written:
+        exit(1)
+
+
 def main():
     import argparse
 
@@ -926,6 +1973,22 @@ def main():
              .format(os.getcwd()),
         required=False)
 
+    exclusive_parser.add_argument(
+        "--projects",
+        dest="projects",
+        nargs='+',
+        help="Create a package for each of the projects at the specified "
+             "locations, in a single run. Packages are named after their "
+             "projects",
+        required=False)
+
+    exclusive_parser.add_argument(
+        "--apply-delta",
+        dest="apply_delta",
+        help="Reconstruct the full package from the specified delta package "
+             "and its base package, given by '--base'",
+        required=False)
+
     exclusive_parser.add_argument(
         "--custom",
         dest="custom",
@@ -962,7 +2025,125 @@ def main():
         help="create the package with the specific name",
         required=False)
 
+    parser.add_argument(
+        "-o", "--output",
+        help="Write the package to the specified file, instead of a file "
+             "named after the package in the destination. '-' writes it to "
+             "the standard output, e.g. to be piped into 'son-access push "
+             "-'. Implies '--stream'",
+        required=False)
+
+    parser.add_argument(
+        "--plan",
+        help="Report what would be packaged: the members of the package, "
+             "their sizes, which digests are cached or must be computed, "
+             "the artifact dependencies, and estimates of the package size "
+             "and of the build time. Nothing is copied, hashed or written",
+        required=False,
+        action="store_true")
+
+    parser.add_argument(
+        "--stream",
+        help="Write artifacts directly from their sources into the package "
+             "file, without creating a temporary working directory",
+        required=False,
+        action="store_true")
+
+    parser.add_argument(
+        "-j", "--jobs",
+        help="Number of VNFs to package concurrently (default: 1)",
+        type=int,
+        default=1,
+        required=False)
+
+    parser.add_argument(
+        "--compression",
+        help="Compression of the package members: 'store' all (default), "
+             "'deflate' all, or 'auto' to deflate all but already "
+             "compressed images (qcow2 and docker)",
+        choices=['store', 'deflate', 'auto'],
+        default='store',
+        required=False)
+
+    parser.add_argument(
+        "--preserve-descriptors",
+        help="Copy the descriptors verbatim into the package, instead of "
+             "re-emitting their parsed content. Only descriptors that are "
+             "not plain UTF-8 are re-emitted",
+        required=False,
+        action="store_true")
+
+    parser.add_argument(
+        "--normalize-eol",
+        help="Convert the line endings of the preserved descriptors to LF. "
+             "Implies '--preserve-descriptors'",
+        required=False,
+        action="store_true")
+
+    parser.add_argument(
+        "--processes",
+        help="Only applicable to '--projects'. Number of processes packaging "
+             "projects in parallel (default: 1)",
+        type=int,
+        default=1,
+        required=False)
+
+    parser.add_argument(
+        "--base",
+        help="Previous version of the package. A delta package, including "
+             "only the members not found in it, is also generated",
+        required=False)
+
+    parser.add_argument(
+        "--incremental",
+        help="Only repackage the service and functions that changed since "
+             "the previous build of the project, reusing the remaining "
+             "artifacts. Implies '--stream'",
+        required=False,
+        action="store_true")
+
+    add_trace_argument(parser)
+    add_profile_argument(parser)
+
     args = parser.parse_args()
+    trace_to(args.trace)
+    profile_to(args.profile_out, args.profile_mode)
+
+    if args.base and not zipfile.is_zipfile(args.base):
+        log.error("The base package '{}' is missing or is not a valid "
+                  "package file".format(args.base))
+        exit(1)
+
+    if args.apply_delta:
+        if not args.base:
+            log.error("To apply a delta package, its base package must be "
+                      "specified with the '--base' argument.")
+            exit(1)
+        if not zipfile.is_zipfile(args.apply_delta):
+            log.error("The delta package '{}' is missing or is not a valid "
+                      "package file".format(args.apply_delta))
+            exit(1)
+
+        name = args.name if args.name else \
+            os.path.basename(args.apply_delta).replace('.delta.son', '')
+        if not name.endswith('.son'):
+            name += '.son'
+        dst_path = args.destination if args.destination else '.'
+        os.makedirs(dst_path, exist_ok=True)
+        if not apply_delta(args.apply_delta, args.base,
+                           os.path.join(dst_path, name)):
+            exit(1)
+        return
+
+    if args.output and (args.projects or args.base):
+        log.error("The '--output' argument can not be combined with "
+                  "'--projects' or '--base'.")
+        exit(1)
+
+    if args.plan and args.projects:
+        log.error("The '--plan' argument can not be combined with "
+                  "'--projects'.")
+        exit(1)
 
     if args.workspace:
         ws_root = args.workspace
@@ -985,8 +2166,43 @@ def main():
 
         project = Project.__create_from_descriptor__(workspace, prj_root)
 
-        pck = Packager(workspace, project=project, dst_path=args.destination)
-        pck.generate_package(args.name)
+        pck = Packager(workspace, project=project, dst_path=args.destination,
+                       stream=args.stream or bool(args.output),
+                       incremental=args.incremental,
+                       jobs=args.jobs,
+                       preserve_descriptors=args.preserve_descriptors or
+                       args.normalize_eol,
+                       normalize_eol=args.normalize_eol,
+                       compression=args.compression,
+                       delta_base=args.base, plan=args.plan)
+        __generate_package__(pck, args.name, args.output, args.plan)
+
+    elif args.projects:
+
+        # Validate given arguments
+        path_ids = dict()
+        path_ids[ws_root] = Workspace.__descriptor_name__
+        for prj_root in args.projects:
+            path_ids[prj_root] = Project.__descriptor_name__
+        if not __validate_directory__(paths=path_ids):
+            return
+
+        batch = BatchPackager(workspace, dst_path=args.destination,
+                              stream=args.stream,
+                              incremental=args.incremental, jobs=args.jobs,
+                              preserve_descriptors=args.preserve_descriptors or
+                              args.normalize_eol,
+                              normalize_eol=args.normalize_eol,
+                              compression=args.compression)
+        packages = batch.package_projects(args.projects,
+                                          processes=args.processes)
+
+        failed = [prj_root for prj_root, package
+                  in zip(args.projects, packages) if not package]
+        if failed:
+            log.error("Failed to package {} of {} projects: {}"
+                      .format(len(failed), len(packages), ', '.join(failed)))
+            exit(1)
 
     elif args.custom:
 
@@ -996,5 +2212,12 @@ def main():
             exit(1)
 
         pck = Packager(workspace, services=args.service,
-                       functions=args.function, dst_path=args.destination)
-        pck.generate_package(args.name)
+                       functions=args.function, dst_path=args.destination,
+                       stream=args.stream or bool(args.output),
+                       jobs=args.jobs,
+                       preserve_descriptors=args.preserve_descriptors or
+                       args.normalize_eol,
+                       normalize_eol=args.normalize_eol,
+                       compression=args.compression,
+                       delta_base=args.base, plan=args.plan)
+        __generate_package__(pck, args.name, args.output, args.plan)
@@ -0,0 +1,133 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import queue
+
+# Size of the chunks passed from the writer to the reader of a pipe
+CHUNK_SIZE = 1 << 20
+
+# Maximum number of chunks buffered by a pipe, before its writer blocks
+MAX_CHUNKS = 8
+
+# Interval at which a blocked writer checks that the reader is still there
+POLL_INTERVAL = 0.1
+
+
+class PackagePipe(object):
+    """
+    Bounded pipe between a thread writing a package, e.g. through a
+    ZipWriter, and a thread reading it as an iterable of chunks, e.g. an
+    upload. The pipe is not seekable, so packages are written with data
+    descriptors. The writer blocks while the reader is behind, and gets
+    a BrokenPipeError once the reader cancelled the pipe.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, max_chunks=MAX_CHUNKS):
+        """
+        :param chunk_size: size of the chunks read from the pipe
+        :param max_chunks: number of chunks buffered by the pipe
+        """
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(max_chunks)
+        self._buffer = bytearray()
+        self._cancelled = False
+        self._closed = False
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            self.__put__(bytes(self._buffer[:self._chunk_size]))
+            del self._buffer[:self._chunk_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """
+        Mark the end of the written data.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._buffer:
+            self.__put__(bytes(self._buffer))
+            self._buffer = bytearray()
+        self.__put__(None)
+
+    def abort(self, error):
+        """
+        Terminate the pipe on the writer side. The reader gets the error
+        instead of the remaining data.
+        :param error: exception raised by the reader
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.__put__(error)
+        except BrokenPipeError:
+            pass
+
+    def cancel(self):
+        """
+        Terminate the pipe on the reader side. The writer gets a
+        BrokenPipeError on its next write.
+        """
+        self._cancelled = True
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self.cancel()
+
+    def __put__(self, item):
+        while True:
+            if self._cancelled:
+                raise BrokenPipeError("Package pipe reader is gone")
+            try:
+                self._queue.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
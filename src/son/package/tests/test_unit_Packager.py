@@ -24,15 +24,71 @@
 # acknowledge the contributions of their colleagues of the SONATA
 # partner consortium (www.sonata-nfv.eu).
 
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
 import unittest
+import zipfile
+import yaml
+from http.server import HTTPServer, BaseHTTPRequestHandler
 from unittest.mock import patch
 from unittest.mock import Mock
 from unittest import mock
-from son.package.package import Packager
+from son.package.package import Packager, BatchPackager, copy_normalize_eol
+from son.package.md5 import generate_hash
+from son.package.buildmanifest import BuildManifest
+from son.package.zipwriter import ZipWriter
+from son.access.pull import Pull
+from son.access.push import Push
 from son.workspace.workspace import Workspace
 from son.workspace.workspace import Project
 
 
+class GatekeeperHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the catalogue API of a Service Platform gatekeeper,
+    serving the VNFDs of its server, after the delay of its server.
+    """
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        vnf_id = self.path.split('?', 1)[-1]
+        if vnf_id in self.server.vnfds:
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(yaml.dump(self.server.vnfds[vnf_id]).encode())
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the package upload API of a Service Platform gatekeeper,
+    keeping the headers and the chunks of the uploads of its server.
+    """
+    def do_POST(self):
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().strip(), 16)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+            if not size:
+                break
+        self.server.uploads.append((self.headers, chunks))
+        self.send_response(201)
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
 class UnitCreatePackageTests(unittest.TestCase):
 
     @patch('son.package.package.generate_hash')
@@ -112,3 +168,504 @@ class UnitCreatePackageTests(unittest.TestCase):
         prj_config['name'] = 'sonata - project - sample'
 
         self.assertTrue(packager.package_gds(prj_config))
+
+    def test_write_package_stream(self):
+        """
+        Ensures that, in stream mode, the package members are written
+        from their sources and their md5 hashes are set in the manifest.
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        project = Project(workspace, 'prj/path')
+        packager = Packager(workspace=workspace,
+                            project=project,
+                            generate_pd=False,
+                            dst_path="dst/path",
+                            stream=True)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image = os.path.join(tmp_dir, 'vdu.img')
+            with open(image, 'wb') as _file:
+                _file.write(b'image content')
+
+            pce = {'content-type': 'application/sonata.raw_files',
+                   'name': '/raw_files/vnf/vdu.img',
+                   'md5': None}
+            packager._package_descriptor = {'package_content': [pce]}
+            packager._package_members.append(
+                ('raw_files/vnf/vdu.img', image, pce))
+            packager._package_members.append(
+                ('function_descriptors/vnfd.yml', b'name: vnf\n', None))
+
+            buf = io.BytesIO()
+            with ZipWriter(buf) as pck:
+                packager.write_package_stream(pck)
+
+        self.assertEqual(pce['md5'], hashlib.md5(b'image content').hexdigest())
+        with zipfile.ZipFile(buf, 'r') as pck:
+            self.assertEqual(pck.namelist(),
+                             ['raw_files/vnf/vdu.img',
+                              'function_descriptors/vnfd.yml',
+                              'META-INF/MANIFEST.MF'])
+            self.assertEqual(pck.read('raw_files/vnf/vdu.img'),
+                             b'image content')
+            manifest = yaml.load(pck.read('META-INF/MANIFEST.MF'))
+            self.assertEqual(manifest['package_content'][0]['md5'],
+                             pce['md5'])
+
+    def test_upload_package(self):
+        """
+        Ensures that, in stream mode, the package is uploaded in a chunked
+        multipart request while it is written.
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        project = Project(workspace, 'prj/path')
+        packager = Packager(workspace=workspace,
+                            project=project,
+                            generate_pd=False,
+                            dst_path="dst/path",
+                            stream=True,
+                            schema_validator=Mock())
+
+        server = HTTPServer(('127.0.0.1', 0), UploadHandler)
+        server.uploads = []
+        threading.Thread(target=server.serve_forever).start()
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                image = os.path.join(tmp_dir, 'vdu.img')
+                with open(image, 'wb') as _file:
+                    _file.write(os.urandom(3 << 20))
+
+                pce = {'content-type': 'application/sonata.raw_files',
+                       'name': '/raw_files/vnf/vdu.img'}
+                packager._package_descriptor = {'package_content': [pce]}
+                packager._package_members.append(
+                    ('raw_files/vnf/vdu.img', image, pce))
+
+                push = Push('http://127.0.0.1:{}'.format(server.server_port))
+                self.assertTrue(packager.upload_package(push, 'pkg')
+                                .startswith('Upload succeeded (201)'))
+                with open(image, 'rb') as _file:
+                    content = _file.read()
+        finally:
+            server.shutdown()
+
+        self.assertEqual(len(server.uploads), 1)
+        headers, chunks = server.uploads[0]
+        self.assertEqual(headers['Transfer-Encoding'], 'chunked')
+        self.assertGreater(len(chunks), 3)
+        boundary = headers['Content-Type'].split('boundary=')[1].encode()
+
+        body = b''.join(chunks)
+        part_headers, data = body.split(b'\r\n\r\n', 1)
+        self.assertIn(b'name="package"; filename="pkg.son"', part_headers)
+        self.assertTrue(data.endswith(b'\r\n--' + boundary + b'--\r\n'))
+        data = data[:-len(boundary) - 8]
+        with zipfile.ZipFile(io.BytesIO(data), 'r') as pck:
+            self.assertEqual(pck.namelist(),
+                             ['raw_files/vnf/vdu.img', 'META-INF/MANIFEST.MF'])
+            self.assertEqual(pck.read('raw_files/vnf/vdu.img'), content)
+
+    def test_plan(self):
+        """
+        Ensures that the plan of a package reports its members, without
+        hashing them, and estimates the size of the package file.
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        project = Project(workspace, 'prj/path')
+        packager = Packager(workspace=workspace,
+                            project=project,
+                            generate_pd=False,
+                            dst_path="dst/path",
+                            plan=True)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            images = []
+            for name in ('a.img', 'b.img'):
+                images.append(os.path.join(tmp_dir, name))
+                with open(images[-1], 'wb') as _file:
+                    _file.write(os.urandom(1000))
+            generate_hash(images[0])
+
+            pces = [{'content-type': 'application/sonata.raw_files',
+                     'name': '/raw_files/vnf/' + os.path.basename(image),
+                     'md5': None} for image in images]
+            packager._package_descriptor = {'package_content': pces}
+            for image, pce in zip(images, pces):
+                packager._package_members.append((pce['name'][1:], image,
+                                                  pce))
+            packager._package_members.append(
+                ('function_descriptors/vnfd.yml', b'name: vnf\n', None))
+
+            with patch('son.package.md5.__generate_hashes__') as m_hash:
+                plan = packager.plan()
+            self.assertFalse(m_hash.called)
+
+            buf = io.BytesIO()
+            with ZipWriter(buf) as pck:
+                packager.write_package_stream(pck)
+
+        self.assertFalse(plan['stream'])
+        self.assertEqual([(e['name'], e['size'], e['digest'])
+                          for e in plan['entries']],
+                         [('raw_files/vnf/a.img', 1000, 'cached'),
+                          ('raw_files/vnf/b.img', 1000, 'hash'),
+                          ('function_descriptors/vnfd.yml', 10, 'inline'),
+                          ('META-INF/MANIFEST.MF',
+                           plan['entries'][3]['size'], 'inline')])
+        self.assertEqual(plan['hash_size'], 1000)
+        self.assertEqual(plan['estimated_size'], len(buf.getvalue()))
+
+    def test_incremental_vnfd_entry(self):
+        """
+        Ensures that, in incremental mode, an unchanged VNF is reused from
+        the previous build and a changed VNF is packaged again.
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        workspace.descriptor_extension = 'yml'
+        project = Project(workspace, 'prj/path')
+
+        def new_packager(manifest):
+            packager = Packager(workspace=workspace,
+                                project=project,
+                                generate_pd=False,
+                                stream=True)
+            packager._build_manifest = BuildManifest(manifest)
+            packager._validator = Mock()
+            packager._validator.validate_function.return_value = True
+            packager.register_ns_vnf('eu.vendor.vnf.0.1')
+            return packager
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manifest = os.path.join(tmp_dir, 'build.json')
+            vnf_path = os.path.join(tmp_dir, 'vnf')
+            os.makedirs(vnf_path)
+            vnfd = {'vendor': 'eu.vendor', 'name': 'vnf', 'version': '0.1',
+                    'virtual_deployment_units': [
+                        {'id': 'vdu01', 'vm_image': 'vdu.img',
+                         'vm_image_format': 'raw'}]}
+            with open(os.path.join(vnf_path, 'vnfd.yml'), 'w') as _file:
+                _file.write(yaml.dump(vnfd))
+            with open(os.path.join(vnf_path, 'vdu.img'), 'wb') as _file:
+                _file.write(b'image content')
+
+            # First build packages the VNF
+            packager = new_packager(manifest)
+            pce = packager.generate_vnfd_entry(vnf_path, 'vnf')
+            self.assertTrue(packager._validator.validate_function.called)
+            packager._package_descriptor = {'package_content': pce}
+            package = os.path.join(tmp_dir, 'package.son')
+            with open(package, 'wb') as _file, ZipWriter(_file) as pck:
+                packager.write_package_stream(pck)
+            packager._build_manifest.package = package
+            packager._build_manifest.save()
+
+            # Unchanged VNF is reused from the previous build
+            packager = new_packager(manifest)
+            self.assertEqual(packager.generate_vnfd_entry(vnf_path, 'vnf'),
+                             pce)
+            self.assertFalse(packager._validator.validate_function.called)
+            self.assertEqual(packager.get_unpackaged_ns_vnfs(), [])
+            with zipfile.ZipFile(package, 'r') as pck:
+                self.assertEqual(
+                    packager._package_members[0],
+                    ('function_descriptors/vnfd.yml',
+                     pck.read('function_descriptors/vnfd.yml'), None))
+
+            # Unchanged image is copied from the previous package
+            members = {arcname: source for arcname, source, _
+                       in packager._package_members}
+            self.assertEqual(members['raw_files/vnf/vdu.img'].filename,
+                             os.path.join(vnf_path, 'vdu.img'))
+            packager._package_descriptor = {'package_content': pce}
+            rebuilt = os.path.join(tmp_dir, 'rebuilt.son')
+            with open(rebuilt, 'wb') as _file, ZipWriter(_file) as pck:
+                with patch.object(ZipWriter, 'write',
+                                  wraps=pck.write) as m_write:
+                    packager.write_package_stream(pck)
+            self.assertNotIn('raw_files/vnf/vdu.img',
+                             [c[0][0] for c in m_write.call_args_list])
+            with zipfile.ZipFile(rebuilt, 'r') as pck:
+                self.assertEqual(pck.read('raw_files/vnf/vdu.img'),
+                                 b'image content')
+
+            # Changed VNF is packaged again
+            with open(os.path.join(vnf_path, 'vdu.img'), 'ab') as _file:
+                _file.write(b' changed')
+            packager = new_packager(manifest)
+            packager.generate_vnfd_entry(vnf_path, 'vnf')
+            self.assertTrue(packager._validator.validate_function.called)
+
+    def test_generate_vnfd_entries_concurrently(self):
+        """
+        Ensures that VNFs packaged concurrently are merged in the order of
+        their folders and checked in the NS VNF registry.
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        workspace.descriptor_extension = 'yml'
+        project = Project(workspace, 'prj/path')
+        packager = Packager(workspace=workspace,
+                            project=project,
+                            generate_pd=False,
+                            stream=True,
+                            jobs=4)
+        packager._validator = Mock()
+        packager._validator.validate_function.return_value = True
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ['vnf3', 'vnf1', 'vnf2', 'vnf0']:
+                os.makedirs(os.path.join(tmp_dir, name))
+                vnfd = {'vendor': 'eu.vendor', 'name': name, 'version': '0.1'}
+                with open(os.path.join(tmp_dir, name, 'vnfd.yml'), 'w') \
+                        as _file:
+                    _file.write(yaml.dump(vnfd))
+                if name != 'vnf2':
+                    packager.register_ns_vnf(
+                        'eu.vendor.{}.0.1'.format(name))
+
+            pcs = packager.generate_project_source_vnfds(tmp_dir)
+
+        self.assertEqual(len(pcs), 3)
+        self.assertEqual([m[1] for m in packager._package_members],
+                         [yaml.dump({'name': name, 'vendor': 'eu.vendor',
+                                     'version': '0.1'},
+                                    default_flow_style=False).encode()
+                          for name in ['vnf0', 'vnf1', 'vnf3']])
+        self.assertEqual(packager.get_unpackaged_ns_vnfs(), [])
+
+    def test_copy_normalize_eol(self):
+        """
+        Ensures that line endings are normalized, also when CRLF is split
+        between chunks.
+        """
+        content = b'name: vnf\r\nvendor: eu\rversion: 0.1\r\n\r\n'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src = os.path.join(tmp_dir, 'vnfd.yml')
+            with open(src, 'wb') as _file:
+                _file.write(content)
+
+            for cs in [1, 2, 3, 1024]:
+                dst = io.BytesIO()
+                md5 = copy_normalize_eol(src, dst, cs=cs)
+                self.assertEqual(dst.getvalue(),
+                                 b'name: vnf\nvendor: eu\nversion: 0.1\n\n')
+                self.assertEqual(md5,
+                                 hashlib.md5(dst.getvalue()).hexdigest())
+
+    def test_package_descriptor_file_preserve(self):
+        """
+        Ensures that preserved descriptors are packaged verbatim, unless
+        they must be re-emitted.
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        packager = Packager(workspace=workspace,
+                            generate_pd=False,
+                            stream=True,
+                            preserve_descriptors=True)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            plain = os.path.join(tmp_dir, 'plain.yml')
+            with open(plain, 'wb') as _file:
+                _file.write(b'version: "0.1"\nname: vnf\n')
+            bom = os.path.join(tmp_dir, 'bom.yml')
+            with open(bom, 'wb') as _file:
+                _file.write(b'\xef\xbb\xbfname: vnf\n')
+
+            md5 = packager.package_descriptor_file(plain, 'd/plain.yml')
+            self.assertEqual(packager._package_members[-1],
+                             ('d/plain.yml', plain, None))
+            self.assertEqual(md5, hashlib.md5(
+                b'version: "0.1"\nname: vnf\n').hexdigest())
+
+            packager.package_descriptor_file(bom, 'd/bom.yml')
+            self.assertEqual(packager._package_members[-1],
+                             ('d/bom.yml', b'name: vnf\n', None))
+
+    def test_compression_policy(self):
+        """
+        Ensures that package members are compressed according to the
+        compression policy of their content type.
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        packager = Packager(workspace=workspace,
+                            generate_pd=False,
+                            stream=True,
+                            jobs=2,
+                            compression='auto')
+
+        pcs = [{'content-type': 'application/sonata.function_descriptor',
+                'name': '/function_descriptors/vnfd.yml'},
+               {'content-type': 'application/sonata.qcow2_files',
+                'name': '/qcow2_files/vnf/vdu.qcow2'},
+               {'content-type': 'application/sonata.raw_files',
+                'name': '/raw_files/vnf/vdu.img'}]
+        packager._package_descriptor = {'package_content': pcs}
+        for pce in pcs:
+            packager._package_members.append(
+                (pce['name'][1:], b'content ' * 1000, pce))
+
+        buf = io.BytesIO()
+        with ZipWriter(buf, workers=2) as pck:
+            packager.write_package_stream(pck)
+
+        with zipfile.ZipFile(buf, 'r') as pck:
+            self.assertEqual(
+                [(i.filename, i.compress_type) for i in pck.infolist()],
+                [('function_descriptors/vnfd.yml', zipfile.ZIP_DEFLATED),
+                 ('qcow2_files/vnf/vdu.qcow2', zipfile.ZIP_STORED),
+                 ('raw_files/vnf/vdu.img', zipfile.ZIP_DEFLATED),
+                 ('META-INF/MANIFEST.MF', zipfile.ZIP_DEFLATED)])
+            self.assertIsNone(pck.testzip())
+
+        packager._compression = {'application/sonata.raw_files': 'deflate'}
+        self.assertEqual(packager.compress_type(
+            'application/sonata.raw_files'), zipfile.ZIP_DEFLATED)
+        self.assertEqual(packager.compress_type(
+            'application/sonata.function_descriptor'), zipfile.ZIP_STORED)
+
+    def test_generate_package_stream_failure(self):
+        """
+        Ensures that no partial package is left behind when writing a
+        package stream fails.
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            packager = Packager(workspace=workspace,
+                                dst_path=tmp_dir,
+                                generate_pd=False,
+                                stream=True)
+            packager._package_descriptor = {'package_content': []}
+
+            with patch.object(Packager, 'write_package_stream',
+                              side_effect=OSError('No space left')):
+                with self.assertRaises(OSError):
+                    packager.generate_package('pkg')
+            self.assertEqual(os.listdir(tmp_dir), [])
+
+    @patch('son.package.package.Packager')
+    def test_batch_packager(self, m_packager):
+        """
+        Ensures that the packages of a batch share the same validators and
+        son-access client and that the packages of failed projects are
+        reported.
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        batch = BatchPackager(workspace, dst_path='out', stream=True)
+        batch._validator = Mock()
+
+        m_packager.return_value.generate_package.side_effect = \
+            lambda name: name + '.son'
+        packages = [batch.package(Project(workspace, 'prj/' + name), name)
+                    for name in ('a', 'b')]
+        self.assertEqual(packages, ['a.son', 'b.son'])
+        self.assertEqual(batch._validator.reset.call_count, 2)
+
+        calls = m_packager.call_args_list
+        self.assertEqual(len(calls), 2)
+        for arg in ('access', 'validator', 'schema_validator',
+                    'url_checker'):
+            self.assertIs(calls[0][1][arg], calls[1][1][arg])
+        self.assertIs(calls[0][1]['validator'], batch._validator)
+        self.assertEqual(calls[0][1]['dst_path'], 'out')
+        self.assertTrue(calls[0][1]['stream'])
+        self.assertFalse(calls[0][1]['configure_logs'])
+
+        m_packager.return_value.package_descriptor = None
+        self.assertIsNone(batch.package(Project(workspace, 'prj/c')))
+
+    def test_retrieve_external_vnfs(self):
+        """
+        Ensures that external VNFDs are requested concurrently from all
+        Service Platforms, taking the first successful answer for each VNF,
+        and stored in the workspace catalogue.
+        """
+        vnfds = {'eu.vendor.' + name + '.0.1':
+                 {'vendor': 'eu.vendor', 'name': name, 'version': '0.1'}
+                 for name in ('vnf-a', 'vnf-b', 'vnf-c')}
+        servers = []
+        for delay, served in ((0, ['eu.vendor.vnf-a.0.1']),
+                              (0, ['eu.vendor.vnf-b.0.1']),
+                              (2, ['eu.vendor.vnf-b.0.1',
+                                   'eu.vendor.vnf-c.0.1'])):
+            server = HTTPServer(('127.0.0.1', 0), GatekeeperHandler)
+            server.delay = delay
+            server.vnfds = {vnf_id: vnfds[vnf_id] for vnf_id in served}
+            threading.Thread(target=server.serve_forever).start()
+            servers.append(server)
+
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                workspace = Workspace(tmp_dir, ws_name="ws_test",
+                                      log_level='debug')
+                workspace.descriptor_extension = 'yml'
+                access = Mock()
+                access.pull = {}
+                for i, server in enumerate(servers):
+                    p_id = 'sp{}'.format(i)
+                    workspace.service_platforms[p_id] = {'timeout': 1}
+                    access.pull[p_id] = Pull('http://127.0.0.1:{}'.format(
+                        server.server_port))
+
+                packager = Packager(workspace=workspace, generate_pd=False,
+                                    access=access)
+
+                # vnf-c is only served by a platform that times out
+                start = time.time()
+                self.assertFalse(packager.load_external_vnfds(
+                    ['eu.vendor.vnf-a.0.1', 'eu.vendor.vnf-b.0.1',
+                     'eu.vendor.vnf-c.0.1']))
+                self.assertLess(time.time() - start, 2)
+
+                catalogue = os.path.join(tmp_dir, workspace.dirs[
+                    Workspace.CONFIG_STR_CATALOGUE_VNF_DIR])
+                self.assertEqual(sorted(os.listdir(catalogue)),
+                                 ['eu.vendor.vnf-a.0.1',
+                                  'eu.vendor.vnf-b.0.1'])
+                with open(os.path.join(catalogue, 'eu.vendor.vnf-b.0.1',
+                                       'vnf-b.yml')) as _file:
+                    self.assertEqual(yaml.load(_file),
+                                     vnfds['eu.vendor.vnf-b.0.1'])
+
+                # VNFs in the workspace catalogue are not requested again.
+                # The platform may still be answering the previous requests.
+                servers[2].delay = 0
+                workspace.service_platforms['sp2']['timeout'] = 5
+                self.assertTrue(packager.load_external_vnfds(
+                    ['eu.vendor.vnf-a.0.1', 'eu.vendor.vnf-c.0.1']))
+        finally:
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+
+    @patch('son.package.package.MAX_SP_REQUESTS', 1)
+    def test_retrieve_external_vnfs_deadline(self):
+        """
+        Ensures that the requests to Service Platforms are bounded by the
+        deadline of the retrieval, even if they start late, so that none
+        of them outlives it.
+        """
+        workspace = Workspace("ws/root", ws_name="ws_test", log_level='debug')
+        timeouts = []
+
+        def get_vnf_by_id(descriptor_id, timeout):
+            timeouts.append(timeout)
+            time.sleep(0.4)
+
+        access = Mock()
+        access.pull = {}
+        for p_id, timeout in (('sp0', 1), ('sp1', 0.5)):
+            workspace.service_platforms[p_id] = {'timeout': timeout}
+            access.pull[p_id] = Mock(get_vnf_by_id=get_vnf_by_id)
+
+        packager = Packager(workspace=workspace, generate_pd=False,
+                            access=access)
+        start = time.time()
+        self.assertEqual(packager.retrieve_external_vnfs(
+            ['eu.vendor.vnf-a.0.1', 'eu.vendor.vnf-b.0.1']), {})
+        self.assertLess(time.time() - start, 1.3)
+
+        # Requests are serialized: each one has less time left and the
+        # fourth one is never sent
+        time.sleep(0.5)
+        self.assertEqual(len(timeouts), 3)
+        for i, timeout in enumerate(timeouts):
+            self.assertLessEqual(timeout, 1 - 0.4 * i)
@@ -0,0 +1,141 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from son.package.blobstore import BlobStore
+
+
+class UnitBlobStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._store = BlobStore(os.path.join(self._tmp_dir.name, 'blobs'))
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def write_file(self, name, content):
+        filename = os.path.join(self._tmp_dir.name, name)
+        with open(filename, 'wb') as _file:
+            _file.write(content)
+        return filename
+
+    def test_add(self):
+        """
+        Ensures that files are stored by the md5 of their content and that
+        identical contents are only stored once.
+        """
+        digest = self._store.add(self.write_file('a.img', b'image'))
+        self.assertEqual(digest, hashlib.md5(b'image').hexdigest())
+        self.assertEqual(self._store.add(self.write_file('b.img', b'image')),
+                         digest)
+
+        blobs = [f for base, dirs, files in os.walk(self._store.root)
+                 for f in files]
+        self.assertEqual(len(blobs), 1)
+        with open(self._store.get(digest), 'rb') as _file:
+            self.assertEqual(_file.read(), b'image')
+        self.assertIsNone(self._store.get(hashlib.md5(b'other').hexdigest()))
+
+    def test_link(self):
+        """
+        Ensures that stored blobs are linked to their destination.
+        """
+        digest = self._store.add(self.write_file('a.img', b'image'))
+        dst = os.path.join(self._tmp_dir.name, 'dst.img')
+        self._store.link(digest, dst)
+
+        self.assertTrue(os.path.samefile(dst, self._store.get(digest)))
+        self.assertRaises(FileNotFoundError, self._store.link,
+                          hashlib.md5(b'other').hexdigest(), dst + '2')
+
+    def test_link_twice(self):
+        """
+        Ensures that linking a blob to an existing destination, linked to
+        the same or to another blob, or copied as a last resort, keeps the
+        content of the blobs and of the destination.
+        """
+        digest = self._store.add(self.write_file('a.img', b'image'))
+        other = self._store.add(self.write_file('b.img', b'other image'))
+        dst = os.path.join(self._tmp_dir.name, 'dst.img')
+        self._store.link(other, dst)
+        self._store.link(digest, dst)
+        self._store.link(digest, dst)
+        with patch('son.package.blobstore.os.link', side_effect=OSError):
+            self._store.link(digest, dst)
+
+        for filename, content in ((dst, b'image'),
+                                  (self._store.get(digest), b'image'),
+                                  (self._store.get(other), b'other image')):
+            with open(filename, 'rb') as _file:
+                self.assertEqual(_file.read(), content)
+
+    def test_corrupt_blob(self):
+        """
+        Ensures that a blob whose size does not match the stored file is
+        replaced.
+        """
+        filename = self.write_file('a.img', b'image')
+        digest = self._store.add(filename)
+        os.chmod(self._store.path(digest), 0o644)
+        with open(self._store.path(digest), 'wb'):
+            pass
+
+        self.assertEqual(self._store.add(filename), digest)
+        with open(self._store.get(digest), 'rb') as _file:
+            self.assertEqual(_file.read(), b'image')
+
+    def test_gc(self):
+        """
+        Ensures that the least recently used blobs are removed when the
+        store exceeds its maximum size.
+        """
+        digests = [self._store.add(self.write_file(str(i), bytes(100 * [i])))
+                   for i in range(3)]
+        # Make the first blob the least recently used one
+        past = time.time() - 60
+        for digest in digests:
+            os.utime(self._store.path(digest), (past, past))
+        self._store.get(digests[1])
+        self._store.get(digests[2])
+
+        self.assertEqual(self._store.gc(max_size=250), 100)
+        self.assertFalse(os.path.exists(self._store.path(digests[0])))
+        self.assertIsNotNone(self._store.get(digests[1]))
+        self.assertIsNotNone(self._store.get(digests[2]))
+        self.assertEqual(self._store.gc(max_size=250), 0)
+
+        # Blobs being stored are not removed
+        tmp = self._store.path(digests[1]) + '.tmp'
+        with open(tmp, 'wb') as _file:
+            _file.write(bytes(1000))
+        self._store.gc(max_size=0)
+        self.assertTrue(os.path.exists(tmp))
@@ -0,0 +1,162 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import os
+import tempfile
+import unittest
+import zipfile
+import yaml
+from unittest.mock import Mock
+from son.package.delta import create_delta, apply_delta, DELTA_SECTION
+from son.package.package import Packager
+from son.package.zipwriter import ZipWriter
+from son.workspace.workspace import Workspace
+from son.workspace.project import Project
+
+
+def write_package(filename, version, members):
+    """
+    Write a package with the given members, as a dict of contents by name.
+    """
+    pd = {'vendor': 'eu.vendor', 'name': 'pkg', 'version': version,
+          'package_content': [
+              {'name': '/' + name,
+               'content-type': 'application/sonata.raw_files',
+               'md5': hashlib.md5(content).hexdigest()}
+              for name, content in sorted(members.items())]}
+    with zipfile.ZipFile(filename, 'w') as pck:
+        for name, content in sorted(members.items()):
+            pck.writestr(name, content)
+        pck.writestr('META-INF/MANIFEST.MF',
+                     yaml.dump(pd, default_flow_style=False))
+
+
+class UnitDeltaTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._base = os.path.join(self._tmp_dir.name, 'base.son')
+        self._package = os.path.join(self._tmp_dir.name, 'package.son')
+        self._delta = os.path.join(self._tmp_dir.name, 'package.delta.son')
+        write_package(self._base, '0.1',
+                      {'nsd.yml': b'nsd 0.1',
+                       'raw_files/vnf/vdu.img': b'image' * 1000,
+                       'raw_files/old/vdu.img': b'old image'})
+        write_package(self._package, '0.2',
+                      {'nsd.yml': b'nsd 0.2',
+                       'raw_files/vnf-0.2/vdu.img': b'image' * 1000,
+                       'raw_files/new/vdu.img': b'new image'})
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_create_delta(self):
+        """
+        Ensures that a delta package only includes the members not found
+        in the base package and references the remaining by md5.
+        """
+        self.assertEqual(create_delta(self._package, self._base,
+                                      self._delta),
+                         ['/nsd.yml', '/raw_files/new/vdu.img'])
+
+        with zipfile.ZipFile(self._delta, 'r') as pck:
+            self.assertEqual(sorted(pck.namelist()),
+                             ['META-INF/MANIFEST.MF', 'nsd.yml',
+                              'raw_files/new/vdu.img'])
+            pd = yaml.load(pck.read('META-INF/MANIFEST.MF'))
+
+        self.assertEqual(pd['version'], '0.2')
+        self.assertEqual(pd[DELTA_SECTION]['base_package']['version'], '0.1')
+        self.assertEqual(pd[DELTA_SECTION]['base_content'],
+                         [{'name': '/raw_files/vnf-0.2/vdu.img',
+                           'base_name': '/raw_files/vnf/vdu.img',
+                           'md5': hashlib.md5(b'image' * 1000).hexdigest()}])
+
+    def test_apply_delta(self):
+        """
+        Ensures that the full package is reconstructed from a delta package
+        and its base package.
+        """
+        create_delta(self._package, self._base, self._delta)
+        dst = os.path.join(self._tmp_dir.name, 'reconstructed.son')
+        self.assertTrue(apply_delta(self._delta, self._base, dst))
+
+        with zipfile.ZipFile(self._package, 'r') as pck, \
+                zipfile.ZipFile(dst, 'r') as rec_pck:
+            self.assertEqual(sorted(pck.namelist()),
+                             sorted(rec_pck.namelist()))
+            for name in pck.namelist():
+                self.assertEqual(pck.read(name), rec_pck.read(name))
+
+    def test_apply_delta_wrong_base(self):
+        """
+        Ensures that a delta package is not applied to a package other
+        than its base package.
+        """
+        create_delta(self._package, self._base, self._delta)
+        dst = os.path.join(self._tmp_dir.name, 'reconstructed.son')
+        self.assertIsNone(apply_delta(self._delta, self._package, dst))
+        self.assertFalse(os.path.exists(dst))
+
+    def test_apply_delta_non_canonical_nsd(self):
+        """
+        Ensures that the package of a service descriptor which is not
+        packaged verbatim, e.g. with comments, is reconstructed from
+        a delta package.
+        """
+        prj_root = os.path.join(self._tmp_dir.name, 'prj')
+        os.makedirs(os.path.join(prj_root, 'sources', 'nsd'))
+        with open(os.path.join(prj_root, 'sources', 'nsd', 'nsd.yml'),
+                  'w') as _file:
+            _file.write('# service descriptor\n'
+                        'vendor: eu.vendor\nname: ns\nversion: "0.1"\n')
+
+        workspace = Workspace("ws/root", ws_name="ws_test",
+                              log_level='debug')
+        workspace.descriptor_extension = 'yml'
+        packager = Packager(workspace=workspace,
+                            project=Project(workspace, prj_root),
+                            generate_pd=False,
+                            stream=True)
+        packager._validator = Mock()
+        packager._validator.validate_service.return_value = True
+        packager._package_descriptor = \
+            {'package_content': packager.generate_project_nsd()}
+
+        with open(self._package, 'wb') as _file, ZipWriter(_file) as pck:
+            packager.write_package_stream(pck)
+
+        # The service descriptor is unchanged from a base package of itself
+        self.assertEqual(create_delta(self._package, self._package,
+                                      self._delta), [])
+        dst = os.path.join(self._tmp_dir.name, 'reconstructed.son')
+        self.assertTrue(apply_delta(self._delta, self._package, dst))
+        with zipfile.ZipFile(self._package, 'r') as pck, \
+                zipfile.ZipFile(dst, 'r') as rec_pck:
+            self.assertEqual(
+                pck.read('service_descriptors/nsd.yml'),
+                rec_pck.read('service_descriptors/nsd.yml'))
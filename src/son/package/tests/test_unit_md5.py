@@ -0,0 +1,212 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+from son.package import md5
+from son.package.digestcache import DigestCache
+from son.package.md5 import use_digest_cache, generate_hash, \
+    generate_hashes, generate_member_hash, chunk_size, generate_tree_hash, \
+    MIN_CHUNK_SIZE, MAX_CHUNK_SIZE, __generate_hashes__
+
+
+class UnitHashTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._content = os.urandom(300000)
+        self._file = os.path.join(self._tmp_dir.name, 'image.img')
+        with open(self._file, 'wb') as _file:
+            _file.write(self._content)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_generate_hash(self):
+        """
+        Ensures that the md5 hash of a file is correct, whatever the
+        reading method and chunk size.
+        """
+        md5 = hashlib.md5(self._content).hexdigest()
+        self.assertEqual(generate_hash(self._file), md5)
+        self.assertEqual(generate_hash(self._file, cs=128), md5)
+        for use_mmap in (True, False):
+            self.assertEqual(
+                __generate_hashes__(self._file, use_mmap=use_mmap)['md5'],
+                md5)
+
+    def test_generate_hashes(self):
+        """
+        Ensures that several hashes are computed in a single pass.
+        """
+        hashes = generate_hashes(self._file, algorithms=('md5', 'sha256'))
+        self.assertEqual(hashes['md5'],
+                         hashlib.md5(self._content).hexdigest())
+        self.assertEqual(hashes['sha256'],
+                         hashlib.sha256(self._content).hexdigest())
+
+    def test_generate_hash_empty(self):
+        """
+        Ensures that empty files are hashed, even through a memory map.
+        """
+        empty = os.path.join(self._tmp_dir.name, 'empty')
+        open(empty, 'wb').close()
+        self.assertEqual(__generate_hashes__(empty, use_mmap=True)['md5'],
+                         hashlib.md5(b'').hexdigest())
+
+    def test_generate_member_hash(self):
+        """
+        Ensures that the md5 hash of a package member is computed from its
+        uncompressed content, without extracting it.
+        """
+        package = os.path.join(self._tmp_dir.name, 'package.son')
+        with zipfile.ZipFile(package, 'w') as pck:
+            pck.write(self._file, 'stored.img')
+            pck.write(self._file, 'deflated.img', zipfile.ZIP_DEFLATED)
+
+        md5 = hashlib.md5(self._content).hexdigest()
+        with zipfile.ZipFile(package, 'r') as pck:
+            self.assertEqual(generate_member_hash(pck, 'stored.img'), md5)
+            self.assertEqual(generate_member_hash(pck, 'deflated.img',
+                                                  cs=1000), md5)
+
+    def test_chunk_size(self):
+        """
+        Ensures that the chunk size is adapted to the file size.
+        """
+        self.assertEqual(chunk_size(0), MIN_CHUNK_SIZE)
+        self.assertEqual(chunk_size(MIN_CHUNK_SIZE * 3), MIN_CHUNK_SIZE * 4)
+        self.assertEqual(chunk_size(1 << 40), MAX_CHUNK_SIZE)
+
+
+class UnitTreeHashTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._root = os.path.join(self._tmp_dir.name, 'images')
+        os.makedirs(os.path.join(self._root, 'disk', 'parts'))
+        for name in ('a.img', os.path.join('disk', 'b.img'),
+                     os.path.join('disk', 'parts', 'c.img')):
+            with open(os.path.join(self._root, name), 'wb') as _file:
+                _file.write(name.encode())
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_tree_hash_deterministic(self):
+        """
+        Ensures that the digest of a directory only depends on its
+        content and relative paths, not on its location.
+        """
+        digest = generate_hash(self._root)
+        self.assertEqual(digest, generate_tree_hash(self._root, workers=1))
+
+        other = os.path.join(self._tmp_dir.name, 'copy')
+        shutil.copytree(self._root, other)
+        self.assertEqual(digest, generate_hash(other))
+
+        os.rename(os.path.join(other, 'disk', 'b.img'),
+                  os.path.join(other, 'disk', 'd.img'))
+        self.assertNotEqual(digest, generate_hash(other))
+
+    def test_hash_missing_path(self):
+        """
+        Ensures that hashing a path that does not exist is an error.
+        """
+        missing = os.path.join(self._tmp_dir.name, 'missing')
+        self.assertRaises(FileNotFoundError, generate_hash, missing)
+        self.assertRaises(FileNotFoundError, generate_tree_hash, missing)
+
+    @patch('son.package.md5.__generate_hashes__',
+           side_effect=__generate_hashes__)
+    def test_tree_hash_changed_file(self, m_hashes):
+        """
+        Ensures that only changed files are read again when a directory
+        is digested multiple times.
+        """
+        digest = generate_tree_hash(self._root)
+        m_hashes.reset_mock()
+
+        with open(os.path.join(self._root, 'disk', 'b.img'), 'ab') as _file:
+            _file.write(b'changed')
+
+        self.assertNotEqual(digest, generate_tree_hash(self._root))
+        self.assertEqual(m_hashes.call_count, 1)
+
+
+class UnitDigestCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._file = os.path.join(self._tmp_dir.name, 'image.img')
+        with open(self._file, 'wb') as _file:
+            _file.write(b'image content')
+        # make the file old enough to be persisted
+        os.utime(self._file, (1000000000, 1000000000))
+        self._cache = DigestCache(os.path.join(self._tmp_dir.name, 'cache',
+                                               DigestCache.DB_FILENAME))
+        use_digest_cache(self._cache)
+        md5._digest_memo.clear()
+
+    def tearDown(self):
+        use_digest_cache(None)
+        md5._digest_memo.clear()
+        self._cache.close()
+        self._tmp_dir.cleanup()
+
+    def test_digest_cache(self):
+        """
+        Ensures that digests are persisted and that unchanged files are
+        not read again, even by a new process (i.e. empty memo).
+        """
+        digest = generate_hash(self._file)
+        md5._digest_memo.clear()
+
+        with patch('son.package.md5.__generate_hashes__') as m_hashes:
+            self.assertEqual(generate_hash(self._file), digest)
+            self.assertFalse(m_hashes.called)
+
+        # a modified file is hashed again
+        with open(self._file, 'wb') as _file:
+            _file.write(b'other content')
+        os.utime(self._file, (1000000001, 1000000001))
+        self.assertEqual(generate_hash(self._file),
+                         hashlib.md5(b'other content').hexdigest())
+
+    def test_digest_cache_racy(self):
+        """
+        Ensures that recently modified files are not persisted.
+        """
+        os.utime(self._file)
+        generate_hash(self._file)
+        st = os.stat(self._file)
+        self.assertIsNone(self._cache.get(
+            (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)))
@@ -0,0 +1,81 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import threading
+import unittest
+from son.package.pipe import PackagePipe
+
+
+class UnitPackagePipeTests(unittest.TestCase):
+
+    def test_chunks(self):
+        """
+        Ensures that written data is read in chunks of the pipe size.
+        """
+        pipe = PackagePipe(chunk_size=4, max_chunks=2)
+
+        def produce():
+            for i in range(5):
+                pipe.write(b'abc')
+            pipe.close()
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        chunks = list(pipe)
+        producer.join()
+        self.assertEqual(chunks, [b'abca', b'bcab', b'cabc', b'abc'])
+
+    def test_abort(self):
+        """
+        Ensures that the reader gets the error of an aborted pipe.
+        """
+        pipe = PackagePipe(chunk_size=4)
+        pipe.write(b'abcd')
+        pipe.abort(RuntimeError('failed'))
+        chunks = iter(pipe)
+        self.assertEqual(next(chunks), b'abcd')
+        self.assertRaises(RuntimeError, next, chunks)
+
+    def test_cancel(self):
+        """
+        Ensures that a writer blocked on a full pipe is released when the
+        reader cancels it.
+        """
+        pipe = PackagePipe(chunk_size=1, max_chunks=1)
+        errors = []
+
+        def produce():
+            try:
+                pipe.write(b'abc')
+            except BrokenPipeError as e:
+                errors.append(e)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        pipe.cancel()
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(len(errors), 1)
@@ -0,0 +1,129 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from son.package.urlcheck import URLChecker, response_md5
+
+IMAGE_MD5 = hashlib.md5(b'image').hexdigest()
+
+
+class ArtifactHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for a server of remote artifacts.
+    """
+    requests = []
+
+    def do_HEAD(self):
+        ArtifactHandler.requests.append(self.path)
+        if self.path == '/etag.img':
+            self.send_response(200)
+            self.send_header('ETag', '"{}"'.format(IMAGE_MD5))
+        elif self.path == '/content-md5.img':
+            self.send_response(200)
+            self.send_header('Content-MD5', base64.b64encode(
+                hashlib.md5(b'image').digest()).decode())
+        elif self.path == '/weak-etag.img':
+            self.send_response(200)
+            self.send_header('ETag', 'W/"{}"'.format(IMAGE_MD5))
+        else:
+            self.send_response(404)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class UnitURLCheckerTests(unittest.TestCase):
+
+    def setUp(self):
+        ArtifactHandler.requests = []
+        self._server = HTTPServer(('127.0.0.1', 0), ArtifactHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.start()
+        self._url = 'http://127.0.0.1:{}/'.format(self._server.server_port)
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def test_check(self):
+        """
+        Ensures that URLs are checked and their md5 obtained from headers.
+        """
+        checker = URLChecker(workers=4)
+        results = checker.check([self._url + 'etag.img',
+                                 self._url + 'content-md5.img',
+                                 self._url + 'weak-etag.img',
+                                 self._url + 'missing.img'])
+
+        self.assertTrue(results[self._url + 'etag.img']['exists'])
+        self.assertIsNone(results[self._url + 'etag.img']['md5'])
+        self.assertEqual(results[self._url + 'content-md5.img']['md5'],
+                         IMAGE_MD5)
+        self.assertTrue(results[self._url + 'weak-etag.img']['exists'])
+        self.assertIsNone(results[self._url + 'weak-etag.img']['md5'])
+        self.assertFalse(results[self._url + 'missing.img']['exists'])
+
+    def test_check_cached(self):
+        """
+        Ensures that successful checks are cached until they expire.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_file = os.path.join(tmp_dir, 'urls.json')
+            urls = [self._url + 'content-md5.img',
+                    self._url + 'missing.img']
+
+            URLChecker(cache_file=cache_file).check(urls)
+            self.assertEqual(len(ArtifactHandler.requests), 2)
+
+            results = URLChecker(cache_file=cache_file).check(urls)
+            self.assertEqual(ArtifactHandler.requests[2:], ['/missing.img'])
+            self.assertEqual(results[urls[0]]['md5'], IMAGE_MD5)
+
+            URLChecker(cache_file=cache_file, ttl=0).check(urls)
+            self.assertEqual(len(ArtifactHandler.requests), 5)
+            self.assertEqual(os.listdir(tmp_dir), ['urls.json'])
+
+    def test_check_unreachable(self):
+        """
+        Ensures that unreachable servers are reported as failed checks.
+        """
+        url = 'http://127.0.0.1:9/image.img'
+        self.assertFalse(URLChecker().check([url])[url]['exists'])
+
+    def test_response_md5(self):
+        self.assertIsNone(response_md5({}))
+        self.assertIsNone(response_md5({'ETag': '"abc"'}))
+        self.assertIsNone(response_md5({'Content-MD5': 'not base64!'}))
+        self.assertIsNone(response_md5({'ETag': IMAGE_MD5}))
+        self.assertIsNone(response_md5({'ETag': '"{}"'.format(IMAGE_MD5)}))
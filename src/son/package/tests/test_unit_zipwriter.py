@@ -0,0 +1,136 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from son.package import zipwriter
+from son.package.zipwriter import ZipWriter
+
+
+class UnseekableFile(io.RawIOBase):
+    """
+    Writable file object that does not support seeking, e.g. a pipe.
+    """
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+class UnitZipWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        # Use small blocks to deflate members in several blocks
+        self._block_size = zipwriter.BLOCK_SIZE
+        zipwriter.BLOCK_SIZE = 4096
+
+    def tearDown(self):
+        zipwriter.BLOCK_SIZE = self._block_size
+
+    def write_and_check(self, fileobj, get_value):
+        members = {'text.yml': b'name: vnf\n' * 5000,
+                   'random.img': os.urandom(50000),
+                   'empty': b'',
+                   'dir/é.yml': b'x: 1\n'}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src = os.path.join(tmp_dir, 'random.img')
+            with open(src, 'wb') as _file:
+                _file.write(members['random.img'])
+
+            with ZipWriter(fileobj, workers=3) as pck:
+                for name, content in sorted(members.items()):
+                    source = src if name == 'random.img' else content
+                    for compress_type in (zipfile.ZIP_STORED,
+                                          zipfile.ZIP_DEFLATED):
+                        md5 = pck.write(name + str(compress_type), source,
+                                        compress_type)
+                        self.assertEqual(md5,
+                                         hashlib.md5(content).hexdigest())
+
+        with zipfile.ZipFile(io.BytesIO(get_value()), 'r') as pck:
+            self.assertIsNone(pck.testzip())
+            self.assertEqual(len(pck.infolist()), 2 * len(members))
+            for name, content in members.items():
+                for compress_type in (zipfile.ZIP_STORED,
+                                      zipfile.ZIP_DEFLATED):
+                    info = pck.getinfo(name + str(compress_type))
+                    self.assertEqual(info.compress_type, compress_type)
+                    self.assertEqual(pck.read(info), content)
+
+            # Deflated text is compressed across blocks
+            self.assertLess(pck.getinfo('text.yml8').compress_size, 1000)
+
+    def test_write_seekable(self):
+        """
+        Ensures that a valid zip file is written to a seekable file.
+        """
+        buf = io.BytesIO()
+        self.write_and_check(buf, buf.getvalue)
+
+    def test_write_unseekable(self):
+        """
+        Ensures that a valid zip file is written to an unseekable file,
+        using data descriptors.
+        """
+        fileobj = UnseekableFile()
+        self.write_and_check(fileobj, fileobj.buffer.getvalue)
+
+    def test_copy(self):
+        """
+        Ensures that members copied from another zip file keep their
+        compressed data and are read back as the original members.
+        """
+        members = {'text.yml': b'name: vnf\n' * 5000,
+                   'random.img': os.urandom(50000)}
+        src = io.BytesIO()
+        with zipfile.ZipFile(src, 'w') as pck:
+            pck.writestr('text.yml', members['text.yml'],
+                         zipfile.ZIP_DEFLATED)
+            pck.writestr('random.img', members['random.img'])
+
+        fileobj = UnseekableFile()
+        with zipfile.ZipFile(src, 'r') as src_pck, ZipWriter(fileobj) as pck:
+            pck.write('first.yml', b'x: 1\n')
+            for info in src_pck.infolist():
+                pck.copy('copy/' + info.filename, src, info)
+
+        with zipfile.ZipFile(io.BytesIO(fileobj.buffer.getvalue()),
+                             'r') as pck:
+            self.assertIsNone(pck.testzip())
+            for name, content in members.items():
+                info = pck.getinfo('copy/' + name)
+                self.assertEqual(pck.read(info), content)
+            self.assertEqual(pck.getinfo('copy/text.yml').compress_type,
+                             zipfile.ZIP_DEFLATED)
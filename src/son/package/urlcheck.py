@@ -0,0 +1,197 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import base64
+import binascii
+import json
+import logging
+import os
+import threading
+import time
+import tempfile
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+# Filename of the URL check cache, inside the workspace cache directory
+CACHE_FILENAME = 'urls.json'
+
+# Time (in seconds) during which a successful check is reused
+DEFAULT_TTL = 3600
+
+# Maximum number of concurrent checks
+DEFAULT_WORKERS = 8
+
+# Timeout (in seconds) of each check
+DEFAULT_TIMEOUT = 1
+
+class URLChecker(object):
+    """
+    Verifies the existence of remote artifacts, e.g. vm_images referenced
+    by URL. URLs are checked concurrently, with HEAD requests issued
+    through a pooled session, and successful checks are cached on disk.
+    Where the server provides it, the md5 hash of the artifact is obtained
+    from the Content-MD5 header.
+    """
+
+    def __init__(self, cache_file=None, ttl=DEFAULT_TTL,
+                 workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT):
+        """
+        :param cache_file: filename of the cache. None to disable caching
+        :param ttl: time (in seconds) during which a check is reused
+        :param workers: maximum number of concurrent checks
+        :param timeout: timeout (in seconds) of each check
+        """
+        self._cache_file = cache_file
+        self._ttl = ttl
+        self._workers = workers
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    @staticmethod
+    def from_workspace(workspace, **kwargs):
+        """
+        Provides a URL checker caching its checks in the workspace cache.
+        :param workspace: SONATA workspace object
+        :return: URL checker
+        """
+        cache_file = None
+        if workspace.cache_dir:
+            cache_file = os.path.join(workspace.cache_dir, CACHE_FILENAME)
+        return URLChecker(cache_file=cache_file, **kwargs)
+
+    def check(self, urls):
+        """
+        Check a list of URLs.
+        :param urls: list of URLs
+        :return: dictionary of check results, indexed by URL. Each result
+                 holds if the URL 'exists' and the 'md5' of the artifact,
+                 or None if not provided by the server.
+        """
+        urls = sorted(set(urls))
+        if not urls:
+            return {}
+
+        cache = self._load_cache()
+        now = time.time()
+        results = {url: cache[url] for url in urls
+                   if url in cache and now - cache[url]['time'] < self._ttl}
+
+        pending = [url for url in urls if url not in results]
+        if pending:
+            log.debug("Checking {} artifact URLs".format(len(pending)))
+            with ThreadPoolExecutor(
+                    max_workers=min(self._workers, len(pending))) as executor:
+                for url, result in zip(pending,
+                                       executor.map(self._check_url,
+                                                    pending)):
+                    results[url] = result
+
+                    # Only successful checks are cached
+                    if result['exists']:
+                        cache[url] = result
+
+            self._save_cache(cache)
+
+        return results
+
+    def _check_url(self, url):
+        """
+        Check a single URL with a HEAD request.
+        :param url: URL to check
+        :return: check result
+        """
+        result = {'exists': False, 'md5': None, 'time': time.time()}
+        try:
+            response = self._session.head(url, timeout=self._timeout,
+                                          allow_redirects=True)
+        except requests.RequestException as e:
+            log.debug("Failed to check URL '{}': {}".format(url, e))
+            return result
+
+        if response.status_code >= 400:
+            log.debug("Failed to check URL '{}': HTTP {}"
+                      .format(url, response.status_code))
+            return result
+
+        result['exists'] = True
+        result['md5'] = response_md5(response.headers)
+        return result
+
+    def _load_cache(self):
+        if not self._cache_file or not os.path.isfile(self._cache_file):
+            return {}
+
+        try:
+            with self._lock, open(self._cache_file, 'r') as _file:
+                return json.load(_file)
+        except ValueError:
+            log.warning("Ignoring invalid URL cache '{}'"
+                        .format(self._cache_file))
+            return {}
+
+    def _save_cache(self, cache):
+        if not self._cache_file:
+            return
+
+        # The cache is replaced atomically, so that concurrent checkers
+        # never read a partial file
+        cache_dir = os.path.dirname(os.path.abspath(self._cache_file))
+        with self._lock:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as _file:
+                    json.dump(cache, _file, sort_keys=True)
+                os.replace(tmp, self._cache_file)
+            except BaseException:
+                os.remove(tmp)
+                raise
+
+
+def response_md5(headers):
+    """
+    Obtain the md5 hash of an artifact from the headers of its response.
+    The Content-MD5 header holds the base64 encoded digest. ETags are not
+    used, even if they look like a hex digest: e.g. multipart uploads to
+    object stores or CDNs provide ETags that are not the md5 of the content.
+    :param headers: response headers
+    :return: md5 hex digest. None if not provided.
+    """
+    content_md5 = headers.get('Content-MD5')
+    if content_md5:
+        try:
+            digest = base64.b64decode(content_md5, validate=True)
+            if len(digest) == 16:
+                return binascii.hexlify(digest).decode()
+        except (binascii.Error, ValueError):
+            pass
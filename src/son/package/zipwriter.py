@@ -0,0 +1,367 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import io
+import os
+import stat
+import struct
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Size of the blocks deflated by each worker
+BLOCK_SIZE = 1 << 20
+
+# Size of the deflate window, primed with the end of the previous block
+WINDOW_SIZE = 1 << 15
+
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_MAX = 0xFFFFFFFF
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<4sBBHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<4sHHHHIIH')
+END_RECORD64 = struct.Struct('<4sQHHIIQQQQ')
+END_LOCATOR64 = struct.Struct('<4sIQI')
+
+
+class ZipWriter(object):
+    """
+    Writes zip files, deflating each member in blocks compressed
+    concurrently by a pool of workers (in the manner of pigz), while the
+    members are written in the given order. Every block is deflated with
+    the end of the previous one as dictionary, so that the compression
+    ratio is close to a single-threaded deflate. The output file does not
+    need to be seekable: if it is not, the sizes and CRC of each member
+    follow its data in a data descriptor.
+    """
+
+    def __init__(self, fileobj, workers=1,
+                 compresslevel=zlib.Z_DEFAULT_COMPRESSION):
+        """
+        :param fileobj: writable binary file object
+        :param workers: number of threads deflating blocks
+        :param compresslevel: deflate compression level
+        """
+        self._fp = fileobj
+        self._workers = max(1, workers)
+        self._level = compresslevel
+        self._executor = None
+        self._members = []
+        try:
+            self._seekable = fileobj.seekable()
+            self._pos = fileobj.tell() if self._seekable else 0
+        except (AttributeError, OSError):
+            self._seekable = False
+            self._pos = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, arcname, source, compress_type=zipfile.ZIP_STORED):
+        """
+        Add a member to the zip file.
+        :param arcname: name of the member
+        :param source: source filename or content bytes
+        :param compress_type: zipfile.ZIP_STORED or zipfile.ZIP_DEFLATED
+        :return: the md5 hash of the member content
+        """
+        if isinstance(source, bytes):
+            size = len(source)
+            mtime = time.time()
+            mode = stat.S_IFREG | 0o600
+            src = io.BytesIO(source)
+        else:
+            st = os.stat(source)
+            size = st.st_size
+            mtime = st.st_mtime
+            mode = st.st_mode
+            src = open(source, 'rb')
+
+        # Deflate may slightly expand incompressible data
+        zip64 = size > ZIP64_LIMIT or \
+            (compress_type == zipfile.ZIP_DEFLATED and
+             size * 1.05 > ZIP64_LIMIT)
+
+        member = {'name': arcname, 'method': compress_type, 'zip64': zip64,
+                  'flags': 0, 'offset': self._pos, 'crc': 0,
+                  'compress_size': 0, 'file_size': 0,
+                  'date_time': dos_date_time(mtime),
+                  'external_attr': (mode & 0xFFFF) << 16}
+        try:
+            arcname.encode('ascii')
+        except UnicodeEncodeError:
+            member['flags'] |= FLAG_UTF8
+        if not self._seekable:
+            member['flags'] |= FLAG_DATA_DESCRIPTOR
+
+        self._write(self.__local_header__(member))
+        data_offset = self._pos
+
+        with src:
+            if compress_type == zipfile.ZIP_DEFLATED:
+                md5 = self.__write_deflated__(member, src)
+            else:
+                md5 = self.__write_stored__(member, src)
+
+        if self._seekable:
+            # Rewrite the local header with the sizes and CRC
+            self._fp.seek(member['offset'])
+            self._fp.write(self.__local_header__(member))
+            self._fp.seek(data_offset + member['compress_size'])
+        else:
+            fmt = '<4sIQQ' if zip64 else '<4sIII'
+            self._write(struct.pack(fmt, b'PK\x07\x08', member['crc'],
+                                    member['compress_size'],
+                                    member['file_size']))
+
+        self._members.append(member)
+        return md5
+
+    def copy(self, arcname, src, info):
+        """
+        Add a member copied from another zip file, as it is compressed in
+        that file, without being read again from its source or compressed
+        again. Its sizes and CRC are known, so no data descriptor follows.
+        :param arcname: name of the member
+        :param src: readable and seekable binary file object of the zip file
+        :param info: zipfile.ZipInfo of the member in the zip file
+        """
+        src.seek(info.header_offset)
+        header = LOCAL_HEADER.unpack(src.read(LOCAL_HEADER.size))
+        if header[0] != b'PK\x03\x04':
+            raise zipfile.BadZipFile("Bad local header of member '{}'"
+                                     .format(info.filename))
+        src.seek(header[9] + header[10], io.SEEK_CUR)
+
+        year, month, day, hour, minute, second = info.date_time
+        member = {'name': arcname, 'method': info.compress_type,
+                  'zip64': info.file_size > ZIP64_LIMIT or
+                  info.compress_size > ZIP64_LIMIT,
+                  'flags': 0, 'offset': self._pos, 'crc': info.CRC,
+                  'compress_size': info.compress_size,
+                  'file_size': info.file_size,
+                  'date_time': ((year - 1980) << 9 | month << 5 | day,
+                                hour << 11 | minute << 5 | second // 2),
+                  'external_attr': info.external_attr}
+        try:
+            arcname.encode('ascii')
+        except UnicodeEncodeError:
+            member['flags'] |= FLAG_UTF8
+
+        self._write(self.__local_header__(member))
+        remaining = info.compress_size
+        while remaining:
+            chunk = src.read(min(BLOCK_SIZE, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile("Truncated member '{}'"
+                                         .format(info.filename))
+            self._write(chunk)
+            remaining -= len(chunk)
+
+        self._members.append(member)
+
+    def close(self):
+        """
+        Write the central directory. The file object is not closed.
+        """
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+        if self._members is None:
+            return
+
+        cd_offset = self._pos
+        for member in self._members:
+            self._write(self.__central_header__(member))
+        cd_size = self._pos - cd_offset
+
+        count = len(self._members)
+        if count > ZIP_FILECOUNT_LIMIT or cd_offset > ZIP_MAX or \
+                cd_size > ZIP_MAX:
+            end64_offset = self._pos
+            self._write(END_RECORD64.pack(b'PK\x06\x06', 44, 45, 45, 0, 0,
+                                          count, count, cd_size, cd_offset))
+            self._write(END_LOCATOR64.pack(b'PK\x06\x07', 0, end64_offset,
+                                           1))
+            count = min(count, ZIP_FILECOUNT_LIMIT)
+            cd_offset = min(cd_offset, ZIP_MAX)
+            cd_size = min(cd_size, ZIP_MAX)
+
+        self._write(END_RECORD.pack(b'PK\x05\x06', 0, 0, count, count,
+                                    cd_size, cd_offset, 0))
+        self._fp.flush()
+        self._members = None
+
+    def _write(self, data):
+        self._fp.write(data)
+        self._pos += len(data)
+
+    def __write_stored__(self, member, src):
+        md5 = hashlib.md5()
+        crc = 0
+        for chunk in iter(lambda: src.read(BLOCK_SIZE), b''):
+            md5.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+            self._write(chunk)
+            member['file_size'] += len(chunk)
+
+        member['crc'] = crc
+        member['compress_size'] = member['file_size']
+        return md5.hexdigest()
+
+    def __write_deflated__(self, member, src):
+        if not self._executor:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers)
+
+        md5 = hashlib.md5()
+        crc = 0
+        pending = deque()
+        previous = b''
+        block = src.read(BLOCK_SIZE)
+        while True:
+            following = src.read(BLOCK_SIZE)
+            last = not following
+
+            md5.update(block)
+            crc = zlib.crc32(block, crc)
+            member['file_size'] += len(block)
+            pending.append(self._executor.submit(
+                deflate_block, block, previous[-WINDOW_SIZE:], last,
+                self._level))
+
+            # Write the deflated blocks in order, keeping the workers busy
+            while pending and (last or len(pending) > 2 * self._workers):
+                data = pending.popleft().result()
+                self._write(data)
+                member['compress_size'] += len(data)
+
+            if last:
+                break
+            previous, block = block, following
+
+        member['crc'] = crc
+        return md5.hexdigest()
+
+    @staticmethod
+    def __zip64_extra__(member, fields):
+        return struct.pack('<HH' + 'Q' * len(fields), 1, 8 * len(fields),
+                           *fields)
+
+    def __local_header__(self, member):
+        name = member['name'].encode(
+            'utf-8' if member['flags'] & FLAG_UTF8 else 'ascii')
+        crc, csize, fsize = member['crc'], member['compress_size'], \
+            member['file_size']
+        extra = b''
+        if member['zip64']:
+            extra = self.__zip64_extra__(member, [fsize, csize])
+            csize = fsize = ZIP_MAX
+        if member['flags'] & FLAG_DATA_DESCRIPTOR:
+            crc = 0
+            csize = fsize = ZIP_MAX if member['zip64'] else 0
+
+        return LOCAL_HEADER.pack(b'PK\x03\x04',
+                                 45 if member['zip64'] else 20,
+                                 member['flags'], member['method'],
+                                 member['date_time'][1],
+                                 member['date_time'][0],
+                                 crc, csize, fsize, len(name),
+                                 len(extra)) + name + extra
+
+    def __central_header__(self, member):
+        name = member['name'].encode(
+            'utf-8' if member['flags'] & FLAG_UTF8 else 'ascii')
+        csize, fsize, offset = member['compress_size'], \
+            member['file_size'], member['offset']
+
+        fields = []
+        if fsize > ZIP_MAX:
+            fields.append(fsize)
+            fsize = ZIP_MAX
+        if csize > ZIP_MAX:
+            fields.append(csize)
+            csize = ZIP_MAX
+        if offset > ZIP_MAX:
+            fields.append(offset)
+            offset = ZIP_MAX
+        extra = self.__zip64_extra__(member, fields) if fields else b''
+        version = 45 if fields or member['zip64'] else 20
+
+        return CENTRAL_HEADER.pack(b'PK\x01\x02', version, 3, version,
+                                   member['flags'], member['method'],
+                                   member['date_time'][1],
+                                   member['date_time'][0],
+                                   member['crc'], csize, fsize, len(name),
+                                   len(extra), 0, 0, 0,
+                                   member['external_attr'],
+                                   offset) + name + extra
+
+
+def deflate_block(block, dictionary, last, level):
+    """
+    Deflate a block of a member. The blocks of a member are deflated
+    independently into raw deflate streams that, concatenated, form the
+    deflate stream of the member: all blocks but the last are ended with
+    a sync flush, instead of a final block.
+    :param block: block data
+    :param dictionary: data preceding the block, to prime the window
+    :param last: True if it is the last block of the member
+    :param level: compression level
+    :return: deflated block
+    """
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS,
+                                      zlib.DEF_MEM_LEVEL,
+                                      zlib.Z_DEFAULT_STRATEGY, dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    return compressor.compress(block) + \
+        compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def dos_date_time(timestamp):
+    """
+    Convert a timestamp to the MS-DOS date and time of zip files.
+    :param timestamp: seconds since the epoch
+    :return: tuple of (date, time)
+    """
+    t = time.localtime(timestamp)
+    if t.tm_year < 1980:
+        return (1 << 5) | 1, 0
+    return ((t.tm_year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday,
+            t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2)
@@ -37,6 +37,10 @@ from son.profile.experiment import ServiceExperiment, FunctionExperiment
 from son.profile.sonpkg import extract_son_package, SonataServicePackage
 from son.profile.helper import read_yaml
 from son.monitor.profiler import Emu_Profiler
+from son.workspace.workspace import Workspace
+from son.package.package import BatchPackager
+from son.util.trace import add_trace_argument, trace_to
+from son.util.profiler import add_profile_argument, profile_to
 
 LOG = logging.getLogger(__name__)
 
@@ -201,8 +205,14 @@ class ProfileManager(object):
         :param services: list of service objects.
         :return:
         """
+        # share the workspace, validators and schemas among all packages
+        workspace = Workspace.__create_from_descriptor__(Workspace.DEFAULT_WORKSPACE_DIR)
+        if workspace is None:
+            LOG.error("Couldn't initialize workspace: %r. Abort." % Workspace.DEFAULT_WORKSPACE_DIR)
+            exit(1)
+        batch = BatchPackager(workspace)
         for s in self.generated_services:
-            son_pkg_path = s.pack(self.son_pkg_output_dir)
+            son_pkg_path = s.pack(self.son_pkg_output_dir, batch=batch)
             # reset loglevel (ugly, but workspace and packaging tool overwrite it)
             coloredlogs.install(level="DEBUG" if self.args.verbose else "INFO")
             LOG.debug(
@@ -314,6 +324,9 @@ def parse_args(manual_args=None):
         dest="no_display",
         action="store_true")
 
+    add_trace_argument(parser)
+    add_profile_argument(parser)
+
     if manual_args is not None:
         return parser.parse_args(manual_args)
     return parser.parse_args()
@@ -325,5 +338,7 @@ def main():
     :return: None
     """
     args = parse_args()
+    trace_to(args.trace)
+    profile_to(args.profile_out, args.profile_mode)
     p = ProfileManager(args)
     p.run()
@@ -125,17 +125,19 @@ class SonataServicePackage(object):
             write_yaml(os.path.join(d, "%s.yml" % vnfd.get("name")), vnfd)
         # LOG.debug("Written service %r to %r" % (self, slef.pkg_service_path))
 
-    def pack(self, output_path):
+    def pack(self, output_path, batch=None):
         """
         Use son-package to pack the given packet.
         :param output_path: resulting packages are placed in output_path
+        :param batch: BatchPackager shared by the packages of a run (optional)
         :return: package path
         """
         start_time = time.time()
         pkg_destination_path = os.path.join(output_path, self.pkg_name())
         # obtain workspace
         # TODO have workspace dir as command line argument
-        workspace = Workspace.__create_from_descriptor__(Workspace.DEFAULT_WORKSPACE_DIR)
+        workspace = batch.workspace if batch else \
+            Workspace.__create_from_descriptor__(Workspace.DEFAULT_WORKSPACE_DIR)
         if workspace is None:
             LOG.error("Couldn't initialize workspace: %r. Abort." % Workspace.DEFAULT_WORKSPACE_DIR)
             exit(1)
@@ -145,8 +147,12 @@ class SonataServicePackage(object):
             LOG.error("Packager couldn't load service project: %r. Abort." % self.pkg_service_path)
             exit(1)
         # initialize and run packager
-        pck = Packager(workspace, project, dst_path=pkg_destination_path)
-        pck.generate_package(os.path.join(output_path, self.pkg_name()))
+        if batch:
+            batch.package(project, name=os.path.join(output_path, self.pkg_name()),
+                          dst_path=pkg_destination_path)
+        else:
+            pck = Packager(workspace, project, dst_path=pkg_destination_path)
+            pck.generate_package(os.path.join(output_path, self.pkg_name()))
         self.pkg_package_path = os.path.join(output_path, self.pkg_name()) + ".son"
         self.pkg_file_size = os.path.getsize(self.pkg_package_path)
         self.pack_time = time.time() - start_time
@@ -0,0 +1,277 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import urllib.request
+import yaml
+from contextlib import contextmanager
+from urllib.error import HTTPError, URLError
+
+log = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class SchemaCache(object):
+    """
+    Persistent cache of remote schemas, shared by the processes using the
+    same cache directory. Each schema is stored along with the ETag and
+    Last-Modified headers of its last download, and revalidated with a
+    conditional request at most once per TTL. The content of a schema is
+    stored by digest, so that the versions of a schema (and the schemas
+    of different remote masters) are kept side by side.
+
+    Directory layout:
+        index.json      URL -> digest, versions, ETag, Last-Modified and
+                        time of the last check of each schema
+        index.lock      lock of the updates of the index
+        <digest>.yml    content of a schema version, as downloaded
+    """
+
+    INDEX_FILENAME = 'index.json'
+    LOCK_FILENAME = 'index.lock'
+
+    # Time, in seconds, a cached schema is used without revalidation
+    DEFAULT_TTL = 3600
+
+    # Timeout, in seconds, of the requests to remote schemas
+    DEFAULT_TIMEOUT = 10
+
+    # Number of versions kept for each schema
+    MAX_VERSIONS = 5
+
+    def __init__(self, directory, ttl=DEFAULT_TTL, timeout=DEFAULT_TIMEOUT):
+        """
+        :param directory: directory of the cache, created if needed
+        :param ttl: time, in seconds, a cached schema is used without
+                    revalidation
+        :param timeout: timeout, in seconds, of the requests
+        """
+        self._directory = directory
+        self._ttl = ttl
+        self._timeout = timeout
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def load(self, url, reload=False):
+        """
+        Load a remote schema. The cached schema is provided if it was
+        checked less than TTL ago, otherwise it is revalidated and
+        downloaded only if it changed. If the remote schema is not
+        reachable, the cached schema is provided, however old.
+        :param url: URL of the schema
+        :param reload: revalidate the cached schema, even within its TTL
+        :return: the loaded schema as a dictionary
+        :raise URLError: if the schema is neither reachable nor cached
+        """
+        entry = self._read_index().get(url)
+        schema = self._read_version(entry['digest']) if entry else None
+
+        if schema is not None and not reload and \
+                time.time() - entry['checked'] < self._ttl:
+            log.debug("Using cached schema '{}'".format(url))
+            return schema
+
+        request = urllib.request.Request(url)
+        if schema is not None:
+            if entry.get('etag'):
+                request.add_header('If-None-Match', entry['etag'])
+            if entry.get('last_modified'):
+                request.add_header('If-Modified-Since',
+                                   entry['last_modified'])
+        try:
+            response = urllib.request.urlopen(request, timeout=self._timeout)
+            charset = response.headers.get_content_charset() or 'utf-8'
+            content = response.read().decode(charset)
+            headers = response.headers
+
+        except HTTPError as e:
+            if e.code == 304 and schema is not None:
+                log.debug("Cached schema '{}' is up to date".format(url))
+                self._update_entry(url, checked=time.time())
+                return schema
+            if schema is None:
+                raise
+            log.warning("Could not revalidate schema '{}': {}. Using the "
+                        "cached schema".format(url, e))
+            return schema
+
+        except (URLError, OSError) as e:
+            if schema is None:
+                raise URLError(e)
+            log.warning("Could not revalidate schema '{}': {}. Using the "
+                        "cached schema".format(url, e))
+            return schema
+
+        schema = yaml.safe_load(content)
+        assert isinstance(schema, dict), \
+            "Remote schema '{}' is not a dictionary".format(url)
+
+        digest = hashlib.md5(content.encode('utf-8')).hexdigest()
+        self._write_version(digest, content)
+        self._update_entry(url, digest=digest, checked=time.time(),
+                           etag=headers.get('ETag'),
+                           last_modified=headers.get('Last-Modified'))
+        log.debug("Downloaded schema '{}' (version {})".format(url, digest))
+        return schema
+
+    def versions(self, url):
+        """
+        Provides the cached versions of a schema.
+        :param url: URL of the schema
+        :return: list of the digests of the versions, the latest first
+        """
+        entry = self._read_index().get(url)
+        return list(entry['versions']) if entry else []
+
+    def version_file(self, url):
+        """
+        Provides the file of the current version of a cached schema.
+        :param url: URL of the schema
+        :return: filename. None if the schema is not cached
+        """
+        entry = self._read_index().get(url)
+        if entry and os.path.isfile(self._version_file(entry['digest'])):
+            return self._version_file(entry['digest'])
+
+    def load_version(self, digest):
+        """
+        Load a cached version of a schema.
+        :param digest: digest of the version
+        :return: the schema as a dictionary. None if not cached
+        """
+        return self._read_version(digest)
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self._directory,
+                                   self.INDEX_FILENAME)) as f:
+                index = json.load(f)
+            return index if isinstance(index, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _update_entry(self, url, **values):
+        """
+        Update the index entry of a schema. The index is re-read, under
+        the index lock, before being replaced, so that entries updated by
+        other processes are preserved.
+        """
+        with self._index_lock():
+            index = self._read_index()
+            entry = index.setdefault(url, {'versions': []})
+            entry.update(values)
+
+            if 'digest' in values:
+                versions = [values['digest']] + [
+                    v for v in entry['versions'] if v != values['digest']]
+                entry['versions'] = versions[:self.MAX_VERSIONS]
+
+                # remove the versions no longer referenced by any schema
+                referenced = set(v for e in index.values()
+                                 for v in e['versions'])
+                for digest in versions[self.MAX_VERSIONS:]:
+                    if digest not in referenced:
+                        self._remove(self._version_file(digest))
+
+            self._write(self.INDEX_FILENAME,
+                        json.dumps(index, indent=2, sort_keys=True))
+
+    @contextmanager
+    def _index_lock(self):
+        """
+        Hold an exclusive lock of the index, shared with the processes
+        using the same cache directory. Without fcntl (e.g. on Windows),
+        or if the lock file can't be created, the index is not locked.
+        """
+        lock_file = None
+        if fcntl:
+            try:
+                os.makedirs(self._directory, exist_ok=True)
+                lock_file = open(os.path.join(self._directory,
+                                              self.LOCK_FILENAME), 'a')
+            except OSError as e:
+                log.debug("Unable to lock the schema cache index: {}"
+                          .format(e))
+        if not lock_file:
+            yield
+            return
+
+        # the lock is released when the lock file is closed
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _version_file(self, digest):
+        return os.path.join(self._directory, '{}.yml'.format(digest))
+
+    def _read_version(self, digest):
+        try:
+            with open(self._version_file(digest)) as f:
+                schema = yaml.safe_load(f)
+            return schema if isinstance(schema, dict) else None
+        except (OSError, yaml.YAMLError):
+            return
+
+    def _write_version(self, digest, content):
+        if not os.path.isfile(self._version_file(digest)):
+            self._write(os.path.basename(self._version_file(digest)),
+                        content)
+
+    def _write(self, filename, content):
+        """
+        Write a file of the cache atomically, so that concurrent
+        processes never read a partial file.
+        """
+        tmp = None
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self._directory, prefix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+            os.replace(tmp, os.path.join(self._directory, filename))
+        except OSError as e:
+            log.debug("Unable to write schema cache file '{}': {}"
+                      .format(filename, e))
+            if tmp:
+                self._remove(tmp)
+
+    @staticmethod
+    def _remove(filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
@@ -0,0 +1,463 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+"""
+Compiler of JSON schemas into specialised Python validation functions.
+
+The checks of a schema are generated as Python source, with the names,
+patterns and constants of the schema inlined, so that a descriptor is
+validated without interpreting the schema on every call. Only draft-04
+schemas using the keywords below are supported; compile_schema raises
+UnsupportedSchemaError otherwise, and jsonschema validators should be
+used instead.
+"""
+
+import itertools
+import logging
+import numbers
+import re
+from urllib.parse import unquote
+from jsonschema import ValidationError
+
+log = logging.getLogger(__name__)
+
+DRAFT4_URIS = ('http://json-schema.org/draft-04/schema#',
+               'http://json-schema.org/draft-04/schema')
+
+# Validation keywords that are compiled. Other keywords are annotations
+# (e.g. 'description', 'default', 'format') ignored by the validation.
+SUPPORTED_KEYWORDS = {
+    '$ref', 'type', 'enum', 'pattern', 'minLength', 'maxLength',
+    'minimum', 'maximum', 'exclusiveMinimum', 'exclusiveMaximum',
+    'items', 'minItems', 'maxItems', 'uniqueItems', 'properties',
+    'patternProperties', 'additionalProperties', 'required',
+    'minProperties', 'maxProperties', 'allOf', 'anyOf', 'oneOf', 'not'}
+
+# Validation keywords of JSON schema drafts that are not compiled
+UNSUPPORTED_KEYWORDS = {
+    'multipleOf', 'additionalItems', 'dependencies', 'const', 'contains',
+    'propertyNames', 'if', 'then', 'else', 'dependentRequired',
+    'dependentSchemas', 'prefixItems', 'unevaluatedItems',
+    'unevaluatedProperties', 'minContains', 'maxContains', '$dynamicRef',
+    '$recursiveRef', 'extends', 'disallow', 'divisibleBy'}
+
+TYPE_CHECKS = {
+    'array': 'isinstance({0}, list)',
+    'boolean': 'isinstance({0}, bool)',
+    'integer': '(isinstance({0}, int) and not isinstance({0}, bool))',
+    'null': '{0} is None',
+    'number': '(isinstance({0}, numbers.Number) '
+              'and not isinstance({0}, bool))',
+    'object': 'isinstance({0}, dict)',
+    'string': 'isinstance({0}, str)',
+}
+
+
+class UnsupportedSchemaError(Exception):
+    pass
+
+
+class CompiledValidator(object):
+    """
+    Validator of a compiled schema, with the same validate() and
+    is_valid() interface as jsonschema validators.
+    """
+
+    def __init__(self, schema, function, source):
+        self.schema = schema
+        self.source = source
+        self._function = function
+
+    def validate(self, instance):
+        """
+        Validate an instance against the schema.
+        :param instance: the instance to validate
+        :raise ValidationError: at the first error found
+        """
+        self._function(instance)
+
+    def is_valid(self, instance):
+        try:
+            self._function(instance)
+            return True
+        except ValidationError:
+            return False
+
+
+def compile_schema(schema, name='schema'):
+    """
+    Compile a schema into a validator.
+    :param schema: the schema, as a dictionary
+    :param name: name of the schema, used in the generated code filename
+    :return: CompiledValidator of the schema
+    :raise UnsupportedSchemaError: if the schema can not be compiled
+    """
+    if not isinstance(schema, dict):
+        raise UnsupportedSchemaError("Schema is not a dictionary")
+    if schema.get('$schema') not in DRAFT4_URIS:
+        raise UnsupportedSchemaError("Unsupported meta-schema '{}'"
+                                     .format(schema.get('$schema')))
+
+    generator = _Generator(schema)
+    source = generator.generate()
+    namespace = dict(generator.constants)
+    namespace.update({'numbers': numbers, '_error': ValidationError,
+                      '_equal': _equal, '_in_enum': _in_enum,
+                      '_unique': _unique, '_valid': _valid})
+    exec(compile(source, '<compiled {}>'.format(name), 'exec'), namespace)
+    log.debug("Compiled schema '{}' into {} lines".format(
+        name, source.count('\n')))
+    return CompiledValidator(schema, namespace[generator.entry], source)
+
+
+class _Generator(object):
+    """
+    Generator of the validation code of a schema. Each schema referenced
+    with '$ref' (and each branch of 'anyOf', 'oneOf' and 'not') is
+    generated as a function, the other subschemas are inlined.
+    """
+
+    def __init__(self, schema):
+        self._root = schema
+        self._names = itertools.count()
+        self._functions = {}
+        self._pending = []
+        self._sources = []
+        self.constants = {}
+        self.entry = self._function(schema, '#')
+
+    def generate(self):
+        while self._pending:
+            name, schema, path = self._pending.pop(0)
+            lines = ['def {}(v):'.format(name)]
+            self._emit(schema, 'v', path, lines, 1)
+            if len(lines) == 1:
+                lines.append('    pass')
+            self._sources.append('\n'.join(lines))
+        return '\n\n\n'.join(self._sources) + '\n'
+
+    def _name(self, prefix):
+        return '{}{}'.format(prefix, next(self._names))
+
+    def _constant(self, value, prefix='c'):
+        name = self._name(prefix)
+        self.constants[name] = value
+        return name
+
+    def _function(self, schema, path, key=None):
+        if key is not None and key in self._functions:
+            return self._functions[key]
+        name = self._name('f')
+        if key is not None:
+            self._functions[key] = name
+        self._pending.append((name, schema, path))
+        return name
+
+    def _resolve(self, ref):
+        if not ref.startswith('#'):
+            raise UnsupportedSchemaError("Unsupported remote reference '{}'"
+                                         .format(ref))
+        schema = self._root
+        for token in unquote(ref[1:]).split('/')[1:]:
+            token = token.replace('~1', '/').replace('~0', '~')
+            try:
+                if isinstance(schema, list):
+                    schema = schema[int(token)]
+                else:
+                    schema = schema[token]
+            except (KeyError, IndexError, ValueError, TypeError):
+                raise UnsupportedSchemaError("Unresolvable reference '{}'"
+                                             .format(ref))
+        return schema
+
+    @staticmethod
+    def _fail(lines, indent, var, message, path, prefix=''):
+        """
+        Add the raise of a validation error, whose message is the
+        representation of a value between a prefix and a message.
+        """
+        lines.append('    ' * indent + 'raise _error({!r} + repr({}) + {!r})'
+                     .format(prefix, var, '{} (at {!r})'.format(
+                         message, path or '/')))
+
+    def _emit(self, schema, var, path, lines, indent):
+        if not isinstance(schema, dict):
+            raise UnsupportedSchemaError("Schema at '{}' is not a dictionary"
+                                         .format(path))
+        unsupported = UNSUPPORTED_KEYWORDS.intersection(schema)
+        if unsupported:
+            raise UnsupportedSchemaError("Unsupported keywords {} at '{}'"
+                                         .format(sorted(unsupported), path))
+        if 'id' in schema and schema is not self._root:
+            raise UnsupportedSchemaError("Unsupported scope 'id' at '{}'"
+                                         .format(path))
+
+        pad = '    ' * indent
+
+        # references override any other keyword of the schema
+        if '$ref' in schema:
+            ref = schema['$ref']
+            function = self._function(self._resolve(ref), ref, key=ref)
+            lines.append(pad + '{}({})'.format(function, var))
+            return
+
+        if 'type' in schema:
+            types = schema['type']
+            if isinstance(types, str):
+                types = [types]
+            if not all(t in TYPE_CHECKS for t in types):
+                raise UnsupportedSchemaError("Unsupported type {!r} at '{}'"
+                                             .format(schema['type'], path))
+            lines.append(pad + 'if not ({}):'.format(' or '.join(
+                TYPE_CHECKS[t].format(var) for t in types)))
+            self._fail(lines, indent + 1, var, ' is not of type {}'.format(
+                ', '.join(repr(t) for t in types)), path)
+
+        if 'enum' in schema:
+            enum = self._constant(list(schema['enum']))
+            lines.append(pad + 'if not _in_enum({}, {}):'.format(var, enum))
+            self._fail(lines, indent + 1, var, ' is not one of {!r}'.format(
+                schema['enum']), path)
+
+        self._emit_string(schema, var, path, lines, indent)
+        self._emit_number(schema, var, path, lines, indent)
+        self._emit_array(schema, var, path, lines, indent)
+        self._emit_object(schema, var, path, lines, indent)
+
+        for subschema in schema.get('allOf', []):
+            self._emit(subschema, var, path, lines, indent)
+
+        if 'anyOf' in schema:
+            functions = [self._function(s, path) for s in schema['anyOf']]
+            lines.append(pad + 'if not ({}):'.format(' or '.join(
+                '_valid({}, {})'.format(f, var) for f in functions)))
+            self._fail(lines, indent + 1, var,
+                       ' is not valid under any of the given schemas', path)
+
+        if 'oneOf' in schema:
+            functions = [self._function(s, path) for s in schema['oneOf']]
+            lines.append(pad + 'if sum(_valid(f, {}) for f in ({},)) != 1:'
+                         .format(var, ', '.join(functions)))
+            self._fail(lines, indent + 1, var,
+                       ' is not valid under exactly one of the given schemas',
+                       path)
+
+        if 'not' in schema:
+            function = self._function(schema['not'], path)
+            lines.append(pad + 'if _valid({}, {}):'.format(function, var))
+            self._fail(lines, indent + 1, var, ' should not be valid under '
+                       '{!r}'.format(schema['not']), path)
+
+    def _emit_string(self, schema, var, path, lines, indent):
+        if not {'pattern', 'minLength', 'maxLength'}.intersection(schema):
+            return
+        lines.append('    ' * indent + 'if isinstance({}, str):'.format(var))
+        pad = '    ' * (indent + 1)
+        if 'pattern' in schema:
+            pattern = self._constant(re.compile(schema['pattern']), 'p')
+            lines.append(pad + 'if not {}.search({}):'.format(pattern, var))
+            self._fail(lines, indent + 2, var, ' does not match {!r}'.format(
+                schema['pattern']), path)
+        if 'minLength' in schema:
+            lines.append(pad + 'if len({}) < {!r}:'.format(
+                var, schema['minLength']))
+            self._fail(lines, indent + 2, var, ' is too short', path)
+        if 'maxLength' in schema:
+            lines.append(pad + 'if len({}) > {!r}:'.format(
+                var, schema['maxLength']))
+            self._fail(lines, indent + 2, var, ' is too long', path)
+
+    def _emit_number(self, schema, var, path, lines, indent):
+        if not {'minimum', 'maximum'}.intersection(schema):
+            return
+        lines.append('    ' * indent + 'if {}:'.format(
+            TYPE_CHECKS['number'].format(var)))
+        pad = '    ' * (indent + 1)
+        for keyword, exclusive, op, xop, word in (
+                ('minimum', 'exclusiveMinimum', '<', '<=', 'less'),
+                ('maximum', 'exclusiveMaximum', '>', '>=', 'greater')):
+            if keyword not in schema:
+                continue
+            if schema.get(exclusive, False) is True:
+                op, word = xop, word + ' than or equal to'
+            else:
+                word += ' than'
+            lines.append(pad + 'if {} {} {!r}:'.format(var, op,
+                                                        schema[keyword]))
+            self._fail(lines, indent + 2, var, ' is {} the {} of {!r}'
+                       .format(word, keyword, schema[keyword]), path)
+
+    def _emit_array(self, schema, var, path, lines, indent):
+        if not {'items', 'minItems', 'maxItems',
+                'uniqueItems'}.intersection(schema):
+            return
+        lines.append('    ' * indent + 'if isinstance({}, list):'.format(var))
+        pad = '    ' * (indent + 1)
+        if 'minItems' in schema:
+            lines.append(pad + 'if len({}) < {!r}:'.format(
+                var, schema['minItems']))
+            self._fail(lines, indent + 2, var, ' is too short', path)
+        if 'maxItems' in schema:
+            lines.append(pad + 'if len({}) > {!r}:'.format(
+                var, schema['maxItems']))
+            self._fail(lines, indent + 2, var, ' is too long', path)
+        if schema.get('uniqueItems') is True:
+            lines.append(pad + 'if not _unique({}):'.format(var))
+            self._fail(lines, indent + 2, var, ' has non-unique elements',
+                       path)
+
+        items = schema.get('items')
+        if isinstance(items, dict):
+            item = self._name('v')
+            body = []
+            self._emit(items, item, path + '/[]', body, indent + 2)
+            if body:
+                lines.append(pad + 'for {} in {}:'.format(item, var))
+                lines.extend(body)
+        elif isinstance(items, list):
+            for index, subschema in enumerate(items):
+                item = self._name('v')
+                body = []
+                self._emit(subschema, item, '{}/{}'.format(path, index),
+                           body, indent + 2)
+                if body:
+                    lines.append(pad + 'if len({}) > {}:'.format(var, index))
+                    lines.append(pad + '    {} = {}[{}]'.format(item, var,
+                                                                 index))
+                    lines.extend(body)
+
+    def _emit_object(self, schema, var, path, lines, indent):
+        if not {'properties', 'patternProperties', 'additionalProperties',
+                'required', 'minProperties',
+                'maxProperties'}.intersection(schema):
+            return
+        lines.append('    ' * indent + 'if isinstance({}, dict):'.format(var))
+        pad = '    ' * (indent + 1)
+        if 'minProperties' in schema:
+            lines.append(pad + 'if len({}) < {!r}:'.format(
+                var, schema['minProperties']))
+            self._fail(lines, indent + 2, var,
+                       ' does not have enough properties', path)
+        if 'maxProperties' in schema:
+            lines.append(pad + 'if len({}) > {!r}:'.format(
+                var, schema['maxProperties']))
+            self._fail(lines, indent + 2, var, ' has too many properties',
+                       path)
+        for name in schema.get('required', []):
+            lines.append(pad + 'if {!r} not in {}:'.format(name, var))
+            self._fail(lines, indent + 2, var, '', path,
+                       prefix='{!r} is a required property of '.format(name))
+
+        properties = schema.get('properties', {})
+        for name, subschema in properties.items():
+            value = self._name('v')
+            body = []
+            self._emit(subschema, value, '{}/{}'.format(path, name), body,
+                       indent + 2)
+            if body:
+                lines.append(pad + 'if {!r} in {}:'.format(name, var))
+                lines.append(pad + '    {} = {}[{!r}]'.format(value, var,
+                                                              name))
+                lines.extend(body)
+
+        patterns = [(self._constant(re.compile(pattern), 'p'), subschema)
+                    for pattern, subschema
+                    in schema.get('patternProperties', {}).items()]
+        key, value = self._name('k'), self._name('v')
+        for pattern, subschema in patterns:
+            body = []
+            self._emit(subschema, value, '{}/*'.format(path), body,
+                       indent + 3)
+            if body:
+                lines.append(pad + 'for {}, {} in {}.items():'.format(
+                    key, value, var))
+                lines.append(pad + '    if {}.search({}):'.format(pattern,
+                                                                  key))
+                lines.extend(body)
+
+        additional = schema.get('additionalProperties', True)
+        if additional is True or additional == {}:
+            return
+        names = self._constant(frozenset(properties), 'n')
+        check = '{} not in {}'.format(key, names) + ''.join(
+            ' and not {}.search({})'.format(pattern, key)
+            for pattern, _ in patterns)
+        if additional is False:
+            lines.append(pad + 'for {} in {}:'.format(key, var))
+            lines.append(pad + '    if {}:'.format(check))
+            self._fail(lines, indent + 3, key, ' is not allowed', path,
+                       prefix='Additional property ')
+        elif isinstance(additional, dict):
+            body = []
+            self._emit(additional, value, '{}/*'.format(path), body,
+                       indent + 3)
+            if body:
+                lines.append(pad + 'for {}, {} in {}.items():'.format(
+                    key, value, var))
+                lines.append(pad + '    if {}:'.format(check))
+                lines.extend(body)
+        else:
+            raise UnsupportedSchemaError("Invalid additionalProperties at "
+                                         "'{}'".format(path))
+
+
+def _equal(one, two):
+    """
+    Equality of JSON values, where booleans differ from numbers.
+    """
+    if one is two:
+        return True
+    if isinstance(one, str) or isinstance(two, str):
+        return one == two
+    if isinstance(one, list) and isinstance(two, list):
+        return len(one) == len(two) and all(
+            _equal(a, b) for a, b in zip(one, two))
+    if isinstance(one, dict) and isinstance(two, dict):
+        return one.keys() == two.keys() and all(
+            _equal(one[k], two[k]) for k in one)
+    if isinstance(one, bool) or isinstance(two, bool):
+        return type(one) is type(two) and one == two
+    return one == two
+
+
+def _in_enum(value, enum):
+    return any(_equal(value, each) for each in enum)
+
+
+def _unique(values):
+    if all(isinstance(v, str) for v in values):
+        return len(set(values)) == len(values)
+    return not any(_equal(values[i], values[j])
+                   for i in range(len(values))
+                   for j in range(i + 1, len(values)))
+
+
+def _valid(function, value):
+    try:
+        function(value)
+        return True
+    except ValidationError:
+        return False
@@ -24,11 +24,19 @@
 # acknowledge the contributions of their colleagues of the SONATA
 # partner consortium (www.sonata-nfv.eu).
 
+import os
 import unittest
+import yaml
 from unittest import mock
-from son.schema.validator import load_local_schema, load_remote_schema
+from son.schema.validator import load_local_schema, load_remote_schema, \
+    SchemaValidator, DescriptorClassifier
+from son.workspace.workspace import Workspace
 from unittest.mock import patch
 
+SCHEMAS_DIR = os.path.join('src', 'son', 'schema', 'tests', 'son-schema')
+
+SAMPLES_DIR = os.path.join('src', 'son', 'workspace', 'samples')
+
 
 class UnitLoadSchemaTests(unittest.TestCase):
 
@@ -85,3 +93,72 @@ class UnitLoadSchemaTests(unittest.TestCase):
         m_yaml.load.return_value = sample_dict
         return_dict = load_remote_schema("url")
         self.assertEqual(sample_dict, return_dict)
+
+
+class UnitDescriptorClassifierTests(unittest.TestCase):
+
+    def setUp(self):
+        workspace = Workspace('.', log_level='debug')
+        workspace.schemas[Workspace.CONFIG_STR_SCHEMAS_LOCAL_MASTER] = \
+            SCHEMAS_DIR
+        workspace.schemas[Workspace.CONFIG_STR_SCHEMAS_REMOTE_MASTER] = \
+            'http://127.0.0.1:9/'
+        self.validator = SchemaValidator(workspace)
+
+    @staticmethod
+    def load_sample(*path):
+        with open(os.path.join(SAMPLES_DIR, *path)) as f:
+            return yaml.safe_load(f)
+
+    def test_discriminating_keys(self):
+        """
+        Ensures that the discriminating keys are derived from the schemas.
+        """
+        keys = self.validator.get_classifier().discriminating_keys
+        self.assertIn('package_content', keys['PD'])
+        self.assertIn('network_functions', keys['NSD'])
+        self.assertIn('virtual_deployment_units', keys['VNFD'])
+        self.assertNotIn('name', keys['NSD'])
+
+    def test_candidates(self):
+        """
+        Ensures that descriptors are validated against the matching
+        schema only.
+        """
+        classifier = self.validator.get_classifier()
+        nsd = self.load_sample('nsd-sample.yml')
+        vnfd = self.load_sample('vnfd-sample.yml')
+        self.assertEqual(classifier.candidates(nsd), ['NSD'])
+        self.assertEqual(classifier.candidates(vnfd), ['VNFD'])
+        self.assertEqual(classifier.candidates({'name': 'x'}), [])
+        self.assertEqual(classifier.candidates('name'), [])
+
+        with patch.object(self.validator, 'get_validator',
+                          wraps=self.validator.get_validator) as m_get:
+            self.assertEqual(self.validator.get_descriptor_type(vnfd),
+                             'VNFD')
+            self.assertEqual(m_get.call_args_list, [mock.call('VNFD')])
+
+            # invalid descriptor of a single candidate type
+            del vnfd['virtual_deployment_units'][0]['id']
+            m_get.reset_mock()
+            self.assertIsNone(self.validator.get_descriptor_type(vnfd))
+            self.assertEqual(m_get.call_args_list, [mock.call('VNFD')])
+
+    def test_candidates_open_schema(self):
+        """
+        Ensures that schemas allowing any property, or combining
+        subschemas, remain candidates.
+        """
+        classifier = DescriptorClassifier({
+            'A': {'type': 'object', 'required': ['a'],
+                  'properties': {'a': {}, 'x': {}},
+                  'additionalProperties': False},
+            'B': {'type': 'object', 'properties': {'b': {}}},
+            'C': {'anyOf': [{'required': ['c']}]}})
+        self.assertEqual(classifier.discriminating_keys,
+                         {'A': {'a', 'x'}, 'B': {'b'}, 'C': set()})
+        self.assertEqual(classifier.candidates({'a': 1}), ['A', 'B', 'C'])
+        self.assertEqual(classifier.candidates({'b': 1, 'x': 1}),
+                         ['B', 'C'])
+        self.assertEqual(classifier.candidates([]), ['C'])
@@ -0,0 +1,164 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import email.message
+import os
+import tempfile
+import threading
+import unittest
+import yaml
+from unittest import mock
+from unittest.mock import patch
+from urllib.error import HTTPError, URLError
+from son.schema.cache import SchemaCache
+from son.schema.validator import SchemaValidator
+from son.workspace.workspace import Workspace
+
+URL = 'http://schemas.example.com/master/nsd-schema.yml'
+
+
+def response(content, etag=None):
+    headers = email.message.Message()
+    headers['Content-Type'] = 'text/plain; charset=utf-8'
+    if etag:
+        headers['ETag'] = etag
+        headers['Last-Modified'] = 'Mon, 02 Jan 2017 10:00:00 GMT'
+    m_response = mock.MagicMock()
+    m_response.headers = headers
+    m_response.read.return_value = content.encode('utf-8')
+    return m_response
+
+
+class UnitSchemaCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self._tmp.name, 'cache')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    @patch('son.schema.cache.urllib.request.urlopen')
+    def test_load_within_ttl(self, m_urlopen):
+        """
+        Ensures that a schema is downloaded once and then shared, through
+        the cache directory, until its TTL expires.
+        """
+        m_urlopen.return_value = response('type: object\n', etag='"v1"')
+        self.assertEqual(SchemaCache(self.cache_dir).load(URL),
+                         {'type': 'object'})
+        self.assertEqual(m_urlopen.call_count, 1)
+
+        # another process
+        self.assertEqual(SchemaCache(self.cache_dir).load(URL),
+                         {'type': 'object'})
+        self.assertEqual(m_urlopen.call_count, 1)
+
+    @patch('son.schema.cache.urllib.request.urlopen')
+    def test_revalidate(self, m_urlopen):
+        """
+        Ensures that an expired schema is revalidated with a conditional
+        request, and that its versions are kept.
+        """
+        cache = SchemaCache(self.cache_dir, ttl=0)
+        m_urlopen.return_value = response('type: object\n', etag='"v1"')
+        cache.load(URL)
+
+        # not modified
+        m_urlopen.side_effect = HTTPError(URL, 304, 'Not Modified', {}, None)
+        self.assertEqual(cache.load(URL), {'type': 'object'})
+        request = m_urlopen.call_args[0][0]
+        self.assertEqual(request.get_header('If-none-match'), '"v1"')
+        self.assertEqual(request.get_header('If-modified-since'),
+                         'Mon, 02 Jan 2017 10:00:00 GMT')
+
+        # modified
+        m_urlopen.side_effect = None
+        m_urlopen.return_value = response('type: array\n', etag='"v2"')
+        self.assertEqual(cache.load(URL), {'type': 'array'})
+        versions = cache.versions(URL)
+        self.assertEqual(len(versions), 2)
+        self.assertEqual(cache.load_version(versions[1]), {'type': 'object'})
+
+    @patch('son.schema.cache.urllib.request.urlopen')
+    def test_unreachable(self, m_urlopen):
+        """
+        Ensures that the cached schema is used when the remote schema is
+        not reachable, however old.
+        """
+        cache = SchemaCache(self.cache_dir, ttl=0)
+        m_urlopen.side_effect = URLError('unreachable')
+        self.assertRaises(URLError, cache.load, URL)
+
+        m_urlopen.side_effect = None
+        m_urlopen.return_value = response('type: object\n')
+        cache.load(URL)
+
+        m_urlopen.side_effect = URLError('unreachable')
+        self.assertEqual(cache.load(URL), {'type': 'object'})
+
+    def test_concurrent_updates(self):
+        """
+        Ensures that the index entries updated concurrently are all
+        preserved, and that the index is replaced atomically.
+        """
+        urls = ['{}?{}'.format(URL, i) for i in range(4)]
+
+        def update(url):
+            cache = SchemaCache(self.cache_dir)
+            for i in range(20):
+                cache._update_entry(url, checked=i)
+
+        threads = [threading.Thread(target=update, args=(url,))
+                   for url in urls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        index = SchemaCache(self.cache_dir)._read_index()
+        self.assertEqual(sorted(index), urls)
+        self.assertEqual(sorted(os.listdir(self.cache_dir)),
+                         [SchemaCache.INDEX_FILENAME,
+                          SchemaCache.LOCK_FILENAME])
+
+    def test_bundled_schema(self):
+        """
+        Ensures that the schemas bundled with son-cli are used when they
+        can neither be loaded remotely nor locally.
+        """
+        workspace = Workspace(self._tmp.name, log_level='debug')
+        workspace.schemas[Workspace.CONFIG_STR_SCHEMAS_LOCAL_MASTER] = \
+            os.path.join(self._tmp.name, 'schemas')
+        workspace.schemas[Workspace.CONFIG_STR_SCHEMAS_REMOTE_MASTER] = \
+            'http://127.0.0.1:9/'
+        validator = SchemaValidator(workspace)
+
+        schema = validator.load_schema(
+            SchemaValidator.SCHEMA_SERVICE_DESCRIPTOR)
+        with open(os.path.join('src', 'son', 'schema', 'bundle',
+                               'nsd-schema.yml')) as f:
+            self.assertEqual(schema, yaml.safe_load(f))
@@ -0,0 +1,193 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import glob
+import os
+import unittest
+import jsonschema
+import yaml
+from jsonschema import ValidationError
+from son.schema.compiler import compile_schema, UnsupportedSchemaError
+from son.schema.validator import get_validator
+
+DRAFT4 = 'http://json-schema.org/draft-04/schema#'
+
+SCHEMAS_DIR = os.path.join('src', 'son', 'schema', 'tests', 'son-schema')
+
+SAMPLES_DIR = os.path.join('src', 'son', 'validate', 'tests', 'samples')
+
+SCHEMA = {
+    '$schema': DRAFT4,
+    'definitions': {
+        'node': {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string', 'pattern': '^[a-z]+$'},
+                'children': {'type': 'array',
+                             'items': {'$ref': '#/definitions/node'}}
+            },
+            'required': ['name'],
+            'additionalProperties': False
+        }
+    },
+    'type': 'object',
+    'properties': {
+        'root': {'$ref': '#/definitions/node'},
+        'kind': {'enum': ['a', 1, True]},
+        'count': {'type': 'integer', 'minimum': 0,
+                  'exclusiveMinimum': True, 'maximum': 10},
+        'tags': {'type': 'array', 'uniqueItems': True, 'minItems': 1,
+                 'maxItems': 3},
+        'pair': {'type': 'array', 'items': [{'type': 'string'},
+                                            {'type': 'number'}]},
+        'port': {'oneOf': [{'type': 'integer'},
+                           {'type': 'string', 'minLength': 1}]},
+        'any': {'anyOf': [{'type': 'null'}, {'type': 'boolean'}]},
+        'other': {'not': {'type': 'string'}},
+        'labels': {'type': 'object',
+                   'patternProperties': {'^x-': {'type': 'string'}},
+                   'additionalProperties': {'type': 'integer'},
+                   'maxProperties': 2}
+    },
+    'required': ['root']
+}
+
+INSTANCES = [
+    {'root': {'name': 'a'}},
+    {'root': {'name': 'a', 'children': [{'name': 'b'}, {'name': 'c'}]}},
+    {'root': {'name': 'a', 'children': [{'name': 'B'}]}},
+    {'root': {'name': 'a', 'children': [{'name': 'b', 'extra': 1}]}},
+    {'root': {'name': 'a', 'children': [{}]}},
+    {'root': 'a'},
+    {},
+    [],
+    {'root': {'name': 'a'}, 'kind': 'a'},
+    {'root': {'name': 'a'}, 'kind': 1.0},
+    {'root': {'name': 'a'}, 'kind': 1},
+    {'root': {'name': 'a'}, 'kind': 0},
+    {'root': {'name': 'a'}, 'kind': False},
+    {'root': {'name': 'a'}, 'count': 0},
+    {'root': {'name': 'a'}, 'count': 10},
+    {'root': {'name': 'a'}, 'count': 11},
+    {'root': {'name': 'a'}, 'count': 1.0},
+    {'root': {'name': 'a'}, 'count': True},
+    {'root': {'name': 'a'}, 'tags': []},
+    {'root': {'name': 'a'}, 'tags': ['a', 'b']},
+    {'root': {'name': 'a'}, 'tags': ['a', 'a']},
+    {'root': {'name': 'a'}, 'tags': [1, True]},
+    {'root': {'name': 'a'}, 'tags': [{'a': 1}, {'a': 1}]},
+    {'root': {'name': 'a'}, 'tags': [1, 2, 3, 4]},
+    {'root': {'name': 'a'}, 'pair': ['a', 1]},
+    {'root': {'name': 'a'}, 'pair': ['a']},
+    {'root': {'name': 'a'}, 'pair': [1, 'a']},
+    {'root': {'name': 'a'}, 'pair': ['a', 1, None]},
+    {'root': {'name': 'a'}, 'port': 80},
+    {'root': {'name': 'a'}, 'port': '80'},
+    {'root': {'name': 'a'}, 'port': ''},
+    {'root': {'name': 'a'}, 'port': 8.0},
+    {'root': {'name': 'a'}, 'any': None},
+    {'root': {'name': 'a'}, 'any': 0},
+    {'root': {'name': 'a'}, 'other': 1},
+    {'root': {'name': 'a'}, 'other': 'a'},
+    {'root': {'name': 'a'}, 'labels': {'x-a': 'a', 'b': 1}},
+    {'root': {'name': 'a'}, 'labels': {'x-a': 1}},
+    {'root': {'name': 'a'}, 'labels': {'b': 'b'}},
+    {'root': {'name': 'a'}, 'labels': {'a': 1, 'b': 2, 'c': 3}},
+]
+
+
+class UnitCompilerTests(unittest.TestCase):
+
+    def assertSameValidation(self, schema, instances):
+        compiled = compile_schema(schema)
+        reference = jsonschema.Draft4Validator(schema)
+        for instance in instances:
+            self.assertEqual(compiled.is_valid(instance),
+                             reference.is_valid(instance),
+                             msg="instance {!r}".format(instance))
+
+    def test_compile_schema(self):
+        """
+        Ensures that a compiled schema validates instances as jsonschema
+        does.
+        """
+        self.assertSameValidation(SCHEMA, INSTANCES)
+
+        compiled = compile_schema(SCHEMA)
+        with self.assertRaises(ValidationError) as cm:
+            compiled.validate({'root': {'name': 'a'}, 'count': 'one'})
+        self.assertIn("'one' is not of type 'integer'", cm.exception.message)
+        self.assertIn('/count', cm.exception.message)
+
+    def test_compile_sonata_schemas(self):
+        """
+        Ensures that the SONATA schemas are compiled and validate the
+        sample descriptors as jsonschema does.
+        """
+        descriptors = []
+        for filename in glob.glob(os.path.join(SAMPLES_DIR, '**', '*.yml'),
+                                  recursive=True):
+            with open(filename) as f:
+                descriptor = yaml.safe_load(f)
+            if isinstance(descriptor, dict):
+                descriptors.append(descriptor)
+                invalid = dict(descriptor)
+                invalid.pop('name', None)
+                descriptors.append(invalid)
+
+        for filename in ('pd-schema.yml', 'nsd-schema.yml',
+                         'vnfd-schema.yml'):
+            with open(os.path.join(SCHEMAS_DIR, filename)) as f:
+                schema = yaml.safe_load(f)
+            self.assertSameValidation(schema, descriptors)
+
+    def test_unsupported_schema(self):
+        """
+        Ensures that schemas that can not be compiled are rejected, and
+        validated by jsonschema instead.
+        """
+        for schema in ({'type': 'integer'},
+                       {'$schema': DRAFT4, 'multipleOf': 2},
+                       {'$schema': DRAFT4, '$ref': 'http://host/schema#'}):
+            self.assertRaises(UnsupportedSchemaError, compile_schema, schema)
+
+        schema = {'$schema': DRAFT4, 'type': 'integer', 'multipleOf': 2}
+        validator = get_validator(schema, compiled=True)
+        self.assertIsInstance(validator, jsonschema.Draft4Validator)
+        self.assertFalse(validator.is_valid(3))
+
+    def test_get_validator_shared(self):
+        """
+        Ensures that the validator of a schema is built once.
+        """
+        schema = dict(SCHEMA)
+        self.assertIs(get_validator(schema), get_validator(schema))
+        self.assertIs(get_validator(schema, compiled=True),
+                      get_validator(schema, compiled=True))
+        self.assertIsNot(get_validator(schema),
+                         get_validator(dict(SCHEMA)))
+        self.assertRaises(jsonschema.SchemaError, get_validator,
+                          {'$schema': DRAFT4, 'type': 'unknown'})
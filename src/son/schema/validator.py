@@ -26,6 +26,8 @@
 
 import logging
 import coloredlogs
+import hashlib
+import json
 import validators
 import os
 import yaml
@@ -35,9 +37,31 @@ from urllib.request import URLError
 from jsonschema import SchemaError
 from jsonschema import ValidationError
 from son.workspace.workspace import Workspace
+from son.util.trace import traced
+from son.schema.cache import SchemaCache
+from son.schema.compiler import compile_schema, UnsupportedSchemaError
 
 log = logging.getLogger(__name__)
 
+# Schemas loaded by any SchemaValidator of this process, indexed by their
+# URL or by the (path, mtime, size) of their local file
+_loaded_schemas = {}
+
+# Validators of the loaded schemas, shared by all SchemaValidators of this
+# process, indexed by the id of the schema object and the compilation mode
+_schema_validators = {}
+
+# Copy of the SONATA schemas distributed with son-cli, used when the schemas
+# can neither be loaded from the remote master, nor from the local master
+BUNDLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'bundle')
+
+# Directory of the remote schema cache, in the local master directory
+CACHE_DIR_NAME = 'cache'
+
+# Environment variable enabling the compilation of schemas into Python code
+SCHEMA_COMPILE_ENV = 'SON_SCHEMA_COMPILE'
+
 
 class SchemaValidator(object):
 
@@ -46,7 +70,16 @@ class SchemaValidator(object):
     SCHEMA_SERVICE_DESCRIPTOR = 'NSD'
     SCHEMA_FUNCTION_DESCRIPTOR = 'VNFD'
 
-    def __init__(self, workspace):
+    TEMPLATES = (SCHEMA_PACKAGE_DESCRIPTOR, SCHEMA_SERVICE_DESCRIPTOR,
+                 SCHEMA_FUNCTION_DESCRIPTOR)
+
+    def __init__(self, workspace, compiled=None):
+        """
+        :param workspace: SONATA workspace object
+        :param compiled: compile schemas into Python validation code.
+                         If None, enabled by the SON_SCHEMA_COMPILE
+                         environment variable
+        """
         # Assign parameters
         coloredlogs.install(level=workspace.log_level)
         self._workspace = workspace
@@ -56,7 +89,16 @@ class SchemaValidator(object):
         self._schemas_remote_master = \
             workspace.schemas[Workspace.CONFIG_STR_SCHEMAS_REMOTE_MASTER]
 
+        self._schema_cache = SchemaCache(
+            os.path.join(self._schemas_local_master, CACHE_DIR_NAME),
+            ttl=workspace.schemas.get(
+                Workspace.CONFIG_STR_SCHEMAS_CACHE_TTL,
+                SchemaCache.DEFAULT_TTL))
+
         self._schemas = {}
+        if compiled is None:
+            compiled = bool(os.environ.get(SCHEMA_COMPILE_ENV))
+        self._compiled = compiled
 
         # Configure location for schemas
         self.config_schema_locations()
@@ -64,25 +106,34 @@ class SchemaValidator(object):
         # Keep a library of loaded schemas to avoid re-loading
         self._schemas_library = dict()
 
+        # Digests of the loaded schemas, as tuples of (schema, digest)
+        self._schema_digests = dict()
+
+        # Descriptor classifier, along with the schemas it was derived from
+        self._classifier = None
+
     def config_schema_locations(self):
         self._schemas = {
             self.SCHEMA_PACKAGE_DESCRIPTOR: {
                 'local': os.path.join(self._schemas_local_master,
                                       'pd-schema.yml'),
                 'remote': self._schemas_remote_master +
-                'package-descriptor/pd-schema.yml'
+                'package-descriptor/pd-schema.yml',
+                'bundle': os.path.join(BUNDLE_DIR, 'pd-schema.yml')
             },
             self.SCHEMA_SERVICE_DESCRIPTOR: {
                 'local': os.path.join(self._schemas_local_master,
                                       'nsd-schema.yml'),
                 'remote': self._schemas_remote_master +
-                'service-descriptor/nsd-schema.yml'
+                'service-descriptor/nsd-schema.yml',
+                'bundle': os.path.join(BUNDLE_DIR, 'nsd-schema.yml')
             },
             self.SCHEMA_FUNCTION_DESCRIPTOR: {
                 'local': os.path.join(self._schemas_local_master,
                                       'vnfd-schema.yml'),
                 'remote': self._schemas_remote_master +
-                'function-descriptor/vnfd-schema.yml'
+                'function-descriptor/vnfd-schema.yml',
+                'bundle': os.path.join(BUNDLE_DIR, 'vnfd-schema.yml')
             }
         }
 
@@ -106,6 +157,7 @@ class SchemaValidator(object):
         """
         return self._schemas[descriptor]['local']
 
+    @traced()
     def load_schema(self, template, reload=False):
         """
         Load schema from a local file or a remote URL.
@@ -132,14 +184,22 @@ class SchemaValidator(object):
                 log.debug("Loading schema '{}' from remote location '{}'"
                           .format(template, schema_addr))
 
-                # Load schema from remote source
-                self._schemas_library[template] = \
-                    load_remote_schema(schema_addr)
-
-                # Update the corresponding local schema file
-                write_local_schema(self._schemas_local_master,
-                                   self._schemas[template]['local'],
-                                   self._schemas_library[template])
+                # Load schema from remote source through the schema cache,
+                # once per process
+                if schema_addr not in _loaded_schemas or reload:
+                    _loaded_schemas[schema_addr] = \
+                        self._schema_cache.load(schema_addr, reload=reload)
+                self._schemas_library[template] = _loaded_schemas[schema_addr]
+
+                # Update the corresponding local schema file, if outdated
+                local_file = self._schemas[template]['local']
+                cached_file = self._schema_cache.version_file(schema_addr)
+                if not os.path.isfile(local_file) or cached_file and \
+                        os.path.getmtime(cached_file) > \
+                        os.path.getmtime(local_file):
+                    write_local_schema(self._schemas_local_master,
+                                       local_file,
+                                       self._schemas_library[template])
 
                 return self._schemas_library[template]
 
@@ -150,27 +210,67 @@ class SchemaValidator(object):
         else:
             log.warning("Invalid schema URL '{}'".format(schema_addr))
 
-        # Load Offline Schema
-        schema_addr = self._schemas[template]['local']
-        if os.path.isfile(schema_addr):
+        # Load Offline Schema, or the schema bundled with son-cli
+        for location in ('local', 'bundle'):
+            schema_addr = self._schemas[template][location]
+            if not os.path.isfile(schema_addr):
+                log.warning("Schema file '{}' not found.".format(schema_addr))
+                continue
             try:
-                log.debug("Loading schema '{}' from local file '{}'"
-                          .format(template, schema_addr))
-
-                self._schemas_library[template] = \
-                    load_local_schema(schema_addr)
-
+                log.debug("Loading schema '{}' from {} file '{}'"
+                          .format(template, location, schema_addr))
+
+                st = os.stat(schema_addr)
+                key = (os.path.abspath(schema_addr), st.st_mtime_ns,
+                       st.st_size)
+                if key not in _loaded_schemas or reload:
+                    _loaded_schemas[key] = load_local_schema(schema_addr)
+                self._schemas_library[template] = _loaded_schemas[key]
+
+                if location == 'bundle':
+                    log.warning("Using the schema '{}' bundled with son-cli"
+                                .format(template))
                 return self._schemas_library[template]
 
             except FileNotFoundError:
-                log.warning("Could not load schema '{}' from local file '{}'"
-                            .format(template, schema_addr))
-
-        else:
-            log.warning("Schema file '{}' not found.".format(schema_addr))
+                log.warning("Could not load schema '{}' from {} file '{}'"
+                            .format(template, location, schema_addr))
 
         log.error("Failed to load schema '{}'".format(template))
 
+    def get_schema_digest(self, template):
+        """
+        Provides the digest of the content of a schema, e.g. to identify
+        the schema version validated against.
+        :param template: schema template id
+        :return: md5 digest of the schema. None if it could not be loaded
+        """
+        schema = self.load_schema(template)
+        if schema is None:
+            return
+
+        cached = self._schema_digests.get(template)
+        if cached and cached[0] is schema:
+            return cached[1]
+
+        digest = hashlib.md5(json.dumps(schema, sort_keys=True, default=str)
+                             .encode('utf-8')).hexdigest()
+        self._schema_digests[template] = (schema, digest)
+        return digest
+
+    def get_validator(self, template):
+        """
+        Provides the validator of a schema template.
+        :param template: schema template id
+        :return: validator of the schema. None if it could not be loaded
+        :raise SchemaError: if the schema is invalid
+        """
+        schema = self.load_schema(template)
+        if schema is None:
+            return
+        return get_validator(schema, compiled=self._compiled, name=template)
+
+    @traced()
     def validate(self, descriptor, schema_id):
         """
         Validate a descriptor against a schema template
@@ -179,7 +279,10 @@ class SchemaValidator(object):
         :return:
         """
         try:
-            jsonschema.validate(descriptor, self.load_schema(schema_id))
+            validator = self.get_validator(schema_id)
+            if not validator:
+                return
+            validator.validate(descriptor)
             return True
 
         except ValidationError as e:
@@ -193,27 +296,37 @@ class SchemaValidator(object):
             log.debug(e)
             return
 
+    def get_classifier(self):
+        """
+        Provides the type classifier of descriptors, derived from the
+        schema templates that could be loaded.
+        :return: DescriptorClassifier object
+        """
+        schemas = {}
+        for template in self.TEMPLATES:
+            schema = self.load_schema(template)
+            if schema is not None:
+                schemas[template] = schema
+
+        key = tuple((t, id(s)) for t, s in schemas.items())
+        if not self._classifier or self._classifier[0] != key:
+            self._classifier = (key, DescriptorClassifier(schemas))
+        return self._classifier[1]
+
+    @traced()
     def get_descriptor_type(self, descriptor):
         """
         This function obtains the type of a descriptor.
-        Its methodology is based on trial-error, since it
-        attempts to validate the descriptor against the
-        available schema templates until a success is achieved
+        The candidate schema templates are selected from the keys of the
+        descriptor (see DescriptorClassifier), and the descriptor is
+        validated against them until a success is achieved
         """
-        # Gather schema templates ids
-        templates = {self.SCHEMA_PACKAGE_DESCRIPTOR,
-                     self.SCHEMA_SERVICE_DESCRIPTOR,
-                     self.SCHEMA_FUNCTION_DESCRIPTOR}
-
-        # Cycle through templates until a success validation is return
-        for schema_id in templates:
+        # Cycle through candidate templates until a success validation
+        for schema_id in self.get_classifier().candidates(descriptor):
             try:
-                jsonschema.validate(descriptor, self.load_schema(schema_id))
-                return schema_id
-
-            except ValidationError:
-
-                continue
+                validator = self.get_validator(schema_id)
+                if validator and validator.is_valid(descriptor):
+                    return schema_id
 
             except SchemaError as error_detail:
                 log.error("Invalid Schema '{}'".format(schema_id))
@@ -221,6 +334,123 @@ class SchemaValidator(object):
                 return
 
 
+class DescriptorClassifier(object):
+    """
+    Classifier of descriptors by type, derived from the top level of the
+    schema templates: the properties required by each schema and, for
+    schemas not allowing additional properties, the properties it
+    allows. A descriptor is a candidate for a schema only if it has all
+    the required properties and no property disallowed by the schema.
+    Candidates are ordered by the number of discriminating keys of the
+    schema found in the descriptor, i.e. the properties only allowed by
+    that schema (e.g. 'package_content', 'network_functions' or
+    'virtual_deployment_units').
+    """
+
+    def __init__(self, schemas):
+        """
+        :param schemas: dictionary of the schemas, by template id
+        """
+        self._templates = []
+        for template, schema in schemas.items():
+            self._templates.append((template,) + schema_top_level(schema))
+
+        self._discriminating_keys = {}
+        for template, _, _, allowed, properties in self._templates:
+            others = set()
+            for other, _, _, _, other_properties in self._templates:
+                if other != template:
+                    others |= other_properties
+            self._discriminating_keys[template] = properties - others
+
+    @property
+    def discriminating_keys(self):
+        """
+        :return: dictionary of the discriminating keys of each template
+        """
+        return self._discriminating_keys
+
+    def candidates(self, descriptor):
+        """
+        Select the schema templates a descriptor may be valid against.
+        :param descriptor: the descriptor, as a dictionary
+        :return: list of template ids, the most likely first
+        """
+        candidates = []
+        is_object = isinstance(descriptor, dict)
+        for template, objects, required, allowed, _ in self._templates:
+            if not is_object:
+                if not objects:
+                    candidates.append((0, template))
+                continue
+            if not required.issubset(descriptor):
+                continue
+            if allowed is not None and not allowed.issuperset(descriptor):
+                continue
+            score = len(self._discriminating_keys[template]
+                        .intersection(descriptor))
+            candidates.append((-score, template))
+
+        # the sort is stable, keeping the order of the templates on a tie
+        return [template for _, template in
+                sorted(candidates, key=lambda c: c[0])]
+
+
+def schema_top_level(schema):
+    """
+    Extract the top level constraints of a schema on the keys of an
+    object. Schemas combining subschemas at the top level are not
+    constrained.
+    :param schema: the schema, as a dictionary
+    :return: tuple of (True if only objects are valid, set of required
+             properties, set of allowed properties or None if any property
+             is allowed, set of the declared properties)
+    """
+    if any(k in schema for k in ('$ref', 'allOf', 'anyOf', 'oneOf', 'not')):
+        return False, set(), None, set()
+
+    properties = set(schema.get('properties', {}))
+    allowed = None
+    if schema.get('additionalProperties', True) is False and \
+            not schema.get('patternProperties'):
+        allowed = properties
+    return (schema.get('type') == 'object', set(schema.get('required', [])),
+            allowed, properties)
+
+
+def get_validator(schema, compiled=False, name='schema'):
+    """
+    Provides a validator of a schema. The schema is checked and its
+    validator built once per schema object, and shared by the callers.
+    :param schema: the schema, as a dictionary
+    :param compiled: compile the schema into Python validation code. If the
+                     schema can not be compiled, a jsonschema validator is
+                     provided instead
+    :param name: name of the schema, for logging
+    :return: validator object, with validate() and is_valid() methods
+    :raise SchemaError: if the schema is invalid
+    """
+    key = (id(schema), compiled)
+    cached = _schema_validators.get(key)
+    if cached and cached[0] is schema:
+        return cached[1]
+
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    validator = None
+    if compiled:
+        try:
+            validator = compile_schema(schema, name)
+        except UnsupportedSchemaError as e:
+            log.debug("Unable to compile schema '{}': {}".format(name, e))
+    if validator is None:
+        validator = cls(schema)
+
+    # the schema is kept referenced, so that its id is not reused
+    _schema_validators[key] = (schema, validator)
+    return validator
+
+
 def write_local_schema(schemas_root, filename, schema):
     """
     Writes a schema to a local file.
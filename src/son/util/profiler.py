@@ -0,0 +1,261 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import atexit
+import collections
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+
+log = logging.getLogger(__name__)
+
+# Environment variables enabling the profiling of a run. SON_PROFILE is
+# the file where the profile is written at exit.
+PROFILE_ENV = 'SON_PROFILE'
+PROFILE_MODE_ENV = 'SON_PROFILE_MODE'
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+# Interval between two samples of the sampling profiler, in seconds
+SAMPLING_INTERVAL = 0.005
+
+# Collapsed stacks are written next to the profile, with this suffix
+FOLDED_SUFFIX = '.folded'
+
+_profilers = {}
+
+
+def frame_label(filename, line, name):
+    """
+    Label of a function in collapsed stacks.
+    """
+    if filename == '~':
+        # built-in functions
+        return name
+    return "{} ({}:{})".format(name, filename, line)
+
+
+class CProfiler(object):
+    """
+    Deterministic profiler, based on cProfile. Only the thread that
+    started it is profiled. The profile is written in the pstats format,
+    and as collapsed stacks derived from its call graph.
+    """
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def stats(self):
+        return pstats.Stats(self._profile)
+
+    def folded(self):
+        """
+        Derive collapsed stacks from the call graph. The time of a
+        function is split among its call paths in proportion to the time
+        of each call edge, as cProfile does not record full stacks.
+        :return: dictionary of the time in microseconds of each stack
+        """
+        stats = self.stats().stats
+        callees = collections.defaultdict(dict)
+        for func, (cc, nc, tt, ct, callers) in stats.items():
+            for caller, edge in callers.items():
+                callees[caller][func] = edge[3]
+
+        stacks = collections.Counter()
+
+        def walk(func, elapsed, path, labels):
+            ct = stats[func][3]
+            ratio = elapsed / ct if ct else 0
+            labels = labels + [frame_label(*func)]
+            own = round(stats[func][2] * ratio * 1e6)
+            if own:
+                stacks[';'.join(labels)] += own
+            for callee, edge_ct in callees[func].items():
+                if callee in path or edge_ct * ratio < 1e-6:
+                    continue
+                walk(callee, edge_ct * ratio, path | {callee}, labels)
+
+        for func, (cc, nc, tt, ct, callers) in stats.items():
+            if not callers:
+                walk(func, ct, {func}, [])
+        return stacks
+
+    def write(self, filename):
+        """
+        :return: list of the written files
+        """
+        self.stats().dump_stats(filename)
+        write_folded(filename + FOLDED_SUFFIX, self.folded())
+        return [filename, filename + FOLDED_SUFFIX]
+
+
+class SamplingProfiler(object):
+    """
+    Statistical profiler, sampling the stacks of all the threads of the
+    process at a fixed interval. Its overhead does not depend on the
+    number of function calls. The profile is written as collapsed stacks
+    with the number of samples of each stack.
+    """
+
+    def __init__(self, interval=SAMPLING_INTERVAL):
+        self._interval = interval
+        self._stacks = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.__sample__,
+                                        name='son-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def folded(self):
+        """
+        :return: dictionary of the number of samples of each stack
+        """
+        return self._stacks
+
+    def write(self, filename):
+        """
+        :return: list of the written files
+        """
+        write_folded(filename + FOLDED_SUFFIX, self.folded())
+        return [filename + FOLDED_SUFFIX]
+
+    def __sample__(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self._interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    code = frame.f_code
+                    labels.append(frame_label(code.co_filename,
+                                              code.co_firstlineno,
+                                              code.co_name))
+                    frame = frame.f_back
+                labels.append(names.get(tid, str(tid)))
+                self._stacks[';'.join(reversed(labels))] += 1
+
+
+def create_profiler(mode='cprofile'):
+    """
+    :param mode: 'cprofile' or 'sampling'
+    :return: profiler, not started
+    """
+    if mode == 'cprofile':
+        return CProfiler()
+    if mode == 'sampling':
+        return SamplingProfiler()
+    raise ValueError("Unknown profiling mode '{}'".format(mode))
+
+
+def write_folded(filename, stacks):
+    """
+    Write collapsed stacks, one per line followed by its weight, as read
+    by flamegraph.pl and speedscope.
+    :param filename: output filename
+    :param stacks: dictionary of the weight of each stack
+    """
+    with open(filename, 'w') as _file:
+        for stack, weight in sorted(stacks.items()):
+            _file.write("{} {}\n".format(stack, weight))
+
+
+def add_profile_argument(parser):
+    """
+    Add the '--profile-out FILE' and '--profile-mode' arguments to the
+    parser of an entry point.
+    :param parser: argparse parser
+    """
+    parser.add_argument(
+        "--profile-out",
+        metavar="FILE",
+        help="Profile the run and write the profile to FILE, in the pstats "
+             "format, and collapsed stacks for flame graphs to "
+             "FILE{}. It may also be enabled with the environment variable "
+             "{}".format(FOLDED_SUFFIX, PROFILE_ENV),
+        required=False)
+
+    parser.add_argument(
+        "--profile-mode",
+        choices=PROFILE_MODES,
+        help="Profiler of '--profile-out': 'cprofile' (default) records "
+             "every call of the main thread, 'sampling' samples the stacks "
+             "of all threads every {:g} ms, with a lower overhead, and only "
+             "writes collapsed stacks".format(SAMPLING_INTERVAL * 1000),
+        required=False)
+
+
+def profile_to(filename, mode=None):
+    """
+    Profile the rest of the run. At exit, the profile is written to a
+    file.
+    :param filename: profile filename. If None, the file given by the
+                     environment variable SON_PROFILE, if any, is used
+    :param mode: 'cprofile' or 'sampling'. If None, the mode given by the
+                 environment variable SON_PROFILE_MODE, or 'cprofile'
+    """
+    if not filename:
+        filename = os.environ.get(PROFILE_ENV)
+    if not filename or filename in _profilers:
+        return
+    if not mode:
+        mode = os.environ.get(PROFILE_MODE_ENV, 'cprofile')
+
+    profiler = create_profiler(mode)
+    _profilers[filename] = profiler
+    atexit.register(__export__, profiler, os.path.abspath(filename))
+    profiler.start()
+
+
+def __export__(profiler, filename):
+    profiler.stop()
+    try:
+        written = profiler.write(filename)
+    except OSError as e:
+        log.error("Unable to write profile '{}': {}".format(filename, e))
+        return
+    print("Profile written to {}"
+          .format(", ".join("'{}'".format(f) for f in written)),
+          file=sys.stderr)
@@ -0,0 +1,104 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import os
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+from son.util.profiler import create_profiler, FOLDED_SUFFIX
+
+
+def inner():
+    return sum(i * i for i in range(20000))
+
+
+def outer():
+    return [inner() for i in range(5)]
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        inner()
+
+
+class UnitProfilerTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_cprofile(self):
+        """
+        Ensures that the cProfile profiler writes pstats and collapsed
+        stacks following the call graph.
+        """
+        profiler = create_profiler('cprofile')
+        profiler.start()
+        outer()
+        profiler.stop()
+
+        filename = os.path.join(self._tmp_dir.name, 'run.prof')
+        self.assertEqual(profiler.write(filename),
+                         [filename, filename + FOLDED_SUFFIX])
+        names = [func[2] for func in pstats.Stats(filename).stats]
+        self.assertIn('outer', names)
+        self.assertIn('inner', names)
+
+        stacks = profiler.folded()
+        self.assertTrue(any(s.startswith('outer (') and ';inner (' in s
+                            for s in stacks))
+        with open(filename + FOLDED_SUFFIX) as f:
+            for line in f:
+                stack, weight = line.rsplit(' ', 1)
+                self.assertGreater(int(weight), 0)
+
+    def test_sampling(self):
+        """
+        Ensures that the sampling profiler samples all the threads.
+        """
+        profiler = create_profiler('sampling')
+        profiler.start()
+        thread = threading.Thread(target=busy, args=(0.2,), name='worker')
+        thread.start()
+        thread.join()
+        profiler.stop()
+
+        stacks = profiler.folded()
+        self.assertTrue(any(s.startswith('worker;') and ';busy (' in s
+                            for s in stacks))
+
+        filename = os.path.join(self._tmp_dir.name, 'run.prof')
+        self.assertEqual(profiler.write(filename),
+                         [filename + FOLDED_SUFFIX])
+        self.assertFalse(os.path.exists(filename))
+
+    def test_unknown_mode(self):
+        self.assertRaises(ValueError, create_profiler, 'other')
@@ -0,0 +1,133 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import os
+import pickle
+import time
+import unittest
+from son.util import trace
+
+
+class UnitTraceTests(unittest.TestCase):
+
+    def setUp(self):
+        trace.reset()
+        trace.enable()
+
+    def tearDown(self):
+        trace.disable()
+        trace.reset()
+
+    def test_nested_spans(self):
+        """
+        Ensures that nested spans are accounted in the self time of their
+        parent and that traced functions open a span named after them.
+        """
+        @trace.traced('test.child')
+        def child():
+            trace.current().set('key', 'value')
+            time.sleep(0.02)
+
+        with trace.span('test.parent', arg=1) as parent:
+            child()
+            child()
+
+        spans = {s.name: s for s in trace.spans()}
+        self.assertEqual(len(trace.spans()), 3)
+        self.assertIs(spans['test.parent'], parent)
+        self.assertEqual(spans['test.child'].depth, 1)
+        self.assertEqual(spans['test.child'].attrs, {'key': 'value'})
+        self.assertEqual(parent.attrs, {'arg': 1})
+        self.assertGreaterEqual(parent.duration, 0.04)
+        self.assertLess(parent.self_time, parent.duration - 0.035)
+
+    def test_disabled(self):
+        """
+        Ensures that no spans are recorded while tracing is disabled.
+        """
+        trace.disable()
+
+        @trace.traced()
+        def func():
+            trace.current().set('key', 'value')
+            return 1
+
+        with trace.span('test.disabled') as s:
+            s.set('key', 'value')
+            self.assertEqual(func(), 1)
+
+        self.assertEqual(trace.spans(), [])
+
+    def test_chrome_trace(self):
+        """
+        Ensures that spans are exported as complete trace events.
+        """
+        with trace.span('test.outer'):
+            with trace.span('test.inner', n=2):
+                pass
+
+        events = trace.chrome_trace()['traceEvents']
+        self.assertEqual([e['name'] for e in events],
+                         ['test.outer', 'test.inner'])
+        for e in events:
+            self.assertEqual(e['ph'], 'X')
+            self.assertEqual(e['cat'], 'test')
+        self.assertEqual(events[1]['args'], {'n': 2})
+        self.assertGreaterEqual(events[1]['ts'], events[0]['ts'])
+        self.assertLessEqual(events[1]['dur'], events[0]['dur'])
+
+    def test_summary(self):
+        """
+        Ensures that the summary aggregates spans by name.
+        """
+        for i in range(3):
+            with trace.span('test.repeated'):
+                pass
+
+        lines = trace.summary().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('test.repeated'))
+        self.assertEqual(lines[1].split()[1], '3')
+
+    def test_merge(self):
+        """
+        Ensures that the spans of another process are exported with
+        their process identifier.
+        """
+        with trace.span('test.worker'):
+            pass
+        spans = pickle.loads(pickle.dumps(trace.spans()))
+        spans[0].pid = os.getpid() + 1
+        trace.reset()
+
+        with trace.span('test.parent'):
+            pass
+        trace.merge(spans)
+
+        events = trace.chrome_trace()['traceEvents']
+        self.assertEqual([(e['name'], e['pid']) for e in events],
+                         [('test.parent', os.getpid()),
+                          ('test.worker', os.getpid() + 1)])
@@ -0,0 +1,317 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import atexit
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Environment variable enabling the tracing of a run. Its value is the
+# file where the trace is written at exit.
+TRACE_ENV = 'SON_TRACE'
+
+# Tracing state. When disabled, span() returns a shared no-op span and
+# traced functions are called directly.
+_enabled = False
+_spans = []
+_local = threading.local()
+_origin = time.perf_counter()
+_exports = set()
+
+
+class Span(object):
+    """
+    Timed section of a run. Spans are nested within the span open in
+    the same thread when they start, and may hold attributes.
+    """
+
+    __slots__ = ('name', 'attrs', 'pid', 'tid', 'depth', 'start', 'end',
+                 'children_time', '_parent')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.start = None
+        self.end = None
+        self.children_time = 0
+        self._parent = None
+        self.depth = 0
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def self_time(self):
+        """
+        Time spent in the span, but not in its nested spans.
+        """
+        return self.duration - self.children_time
+
+    def set(self, key, value):
+        """
+        Set an attribute of the span.
+        """
+        self.attrs[key] = value
+
+    def __enter__(self):
+        stack = __stack__()
+        if stack:
+            self._parent = stack[-1]
+            self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.end = time.perf_counter()
+        __stack__().pop()
+        if self._parent:
+            self._parent.children_time += self.duration
+            self._parent = None
+        _spans.append(self)
+
+
+class NullSpan(object):
+    """
+    Span used while tracing is disabled, doing nothing.
+    """
+
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_null_span = NullSpan()
+
+
+def __stack__():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+def span(name, **attrs):
+    """
+    Open a span, to be used as a context manager:
+
+        with span('load', filename=f) as s:
+            ...
+            s.set('size', size)
+
+    :param name: name of the span
+    :param attrs: attributes of the span
+    :return: span. A no-op span if tracing is disabled.
+    """
+    if not _enabled:
+        return _null_span
+    return Span(name, attrs)
+
+
+def current():
+    """
+    Provides the innermost open span of the calling thread, e.g. to set
+    attributes of the span of a traced function.
+    :return: span. A no-op span if there is none or tracing is disabled.
+    """
+    if not _enabled:
+        return _null_span
+    stack = __stack__()
+    return stack[-1] if stack else _null_span
+
+
+def traced(name=None):
+    """
+    Decorator tracing each call of a function as a span.
+    :param name: name of the spans. The qualified name of the function
+                 if not specified
+    """
+    def decorator(method):
+        span_name = name if name else method.__qualname__
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return method(*args, **kwargs)
+            with Span(span_name, {}):
+                return method(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def spans():
+    """
+    Provides the finished spans, in the order they finished.
+    """
+    return list(_spans)
+
+
+def reset():
+    """
+    Discard the finished spans.
+    """
+    del _spans[:]
+
+
+def merge(finished):
+    """
+    Add finished spans of another process, e.g. of a worker process,
+    to be exported along with the spans of this process.
+    :param finished: list of finished spans
+    """
+    _spans.extend(finished)
+
+
+def chrome_trace(finished=None):
+    """
+    Export spans in the Chrome trace event format, which can be loaded
+    in chrome://tracing or Perfetto.
+    :param finished: spans to export. All finished spans if not specified
+    :return: trace as a dictionary, to be serialized as JSON
+    """
+    events = []
+    for s in finished if finished is not None else _spans:
+        events.append({'name': s.name,
+                       'cat': s.name.split('.')[0],
+                       'ph': 'X',
+                       'ts': round((s.start - _origin) * 1e6, 3),
+                       'dur': round(s.duration * 1e6, 3),
+                       'pid': s.pid,
+                       'tid': s.tid,
+                       'args': s.attrs})
+    events.sort(key=lambda e: (e['pid'], e['tid'], e['ts']))
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_chrome_trace(filename, finished=None):
+    """
+    Write spans to a file in the Chrome trace event format.
+    :param filename: trace filename
+    :param finished: spans to export. All finished spans if not specified
+    """
+    with open(filename, 'w') as _file:
+        json.dump(chrome_trace(finished), _file, default=str)
+
+
+def summary(finished=None):
+    """
+    Summarize spans by name: number of calls, total time, time spent
+    outside nested spans (self) and mean and maximum time of a call.
+    :param finished: spans to summarize. All finished spans if not specified
+    :return: summary table, sorted by total time
+    """
+    rows = {}
+    for s in finished if finished is not None else _spans:
+        row = rows.setdefault(s.name, [0, 0, 0, 0])
+        row[0] += 1
+        row[1] += s.duration
+        row[2] += s.self_time
+        row[3] = max(row[3], s.duration)
+
+    width = max([len(name) for name in rows] + [4])
+    lines = ["{:<{w}} {:>7} {:>10} {:>10} {:>10} {:>10}"
+             .format('span', 'calls', 'total (s)', 'self (s)', 'mean (s)',
+                     'max (s)', w=width)]
+    for name, (calls, total, self_time, longest) in sorted(
+            rows.items(), key=lambda row: -row[1][1]):
+        lines.append("{:<{w}} {:>7} {:>10.4f} {:>10.4f} {:>10.4f} {:>10.4f}"
+                     .format(name, calls, total, self_time, total / calls,
+                             longest, w=width))
+    return '\n'.join(lines)
+
+
+def add_trace_argument(parser):
+    """
+    Add the '--trace FILE' argument to the parser of an entry point.
+    :param parser: argparse parser
+    """
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Trace the run and write the trace to FILE, in the Chrome "
+             "trace event format. A summary is printed at exit. It may also "
+             "be enabled with the environment variable {}".format(TRACE_ENV),
+        required=False)
+
+
+def trace_to(filename):
+    """
+    Enable tracing for the rest of the run. At exit, the trace is written
+    to a file and its summary is printed to stderr.
+    :param filename: trace filename. If None, the file given by the
+                     environment variable SON_TRACE, if any, is used
+    """
+    if not filename:
+        filename = os.environ.get(TRACE_ENV)
+    if not filename or filename in _exports:
+        return
+
+    enable()
+    _exports.add(filename)
+    atexit.register(__export__, os.path.abspath(filename))
+
+
+def __export__(filename):
+    try:
+        write_chrome_trace(filename)
+    except OSError as e:
+        log.error("Unable to write trace '{}': {}".format(filename, e))
+        return
+    print(summary(), file=sys.stderr)
+    print("Trace written to '{}'".format(filename), file=sys.stderr)
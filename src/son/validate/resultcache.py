@@ -0,0 +1,66 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import json
+from son.workspace.sqlitecache import SQLiteCache
+
+
+class ValidationCache(SQLiteCache):
+    """
+    Persistent cache of validation results, stored in a SQLite database.
+    Results are keyed by a digest of everything the validation depends
+    on, e.g. the path and content of the descriptor, the schema and the
+    validation flags, and hold the warnings and errors given by the
+    validation.
+    """
+
+    DB_FILENAME = 'validation.db'
+    TABLE = 'results'
+    COLUMNS = "key TEXT PRIMARY KEY, valid INTEGER, messages TEXT"
+    DESCRIPTION = 'validation cache'
+
+    def get(self, key):
+        """
+        Retrieve the stored result of a validation.
+        :param key: validation key
+        :return: tuple of (True if valid, list of (level, message) given
+                 by the validation). None if not cached.
+        """
+        row = self._fetch("SELECT valid, messages FROM results WHERE key=?",
+                          (key,))
+
+        if not row:
+            return
+        return bool(row[0]), [tuple(m) for m in json.loads(row[1])]
+
+    def put(self, key, valid, messages):
+        """
+        Store the result of a validation, replacing a previous one.
+        :param key: validation key
+        :param valid: True if the validation succeeded
+        :param messages: list of (level, message) given by the validation
+        """
+        self._store((key, int(bool(valid)), json.dumps(messages)))
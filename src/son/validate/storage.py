@@ -80,34 +80,38 @@ class DescriptorStorage(object):
             return
         return self.services[sid]
 
-    def create_package(self, descriptor_file):
+    def create_package(self, descriptor_file, content=None):
         """
         Create and store a package based on the provided descriptor filename.
         If a package is already stored with the same id, it will return the
         stored package.
         :param descriptor_file: package descriptor filename
+        :param content: package descriptor dictionary, if already read,
+                        e.g. from a package member
         :return: created package object or, if id exists, the stored package.
         """
-        if not os.path.isfile(descriptor_file):
+        if content is None and not os.path.isfile(descriptor_file):
             return
-        new_package = Package(descriptor_file)
+        new_package = Package(descriptor_file, content)
         if new_package.id in self._packages:
             return self._packages[new_package.id]
 
         self._packages[new_package.id] = new_package
         return new_package
 
-    def create_service(self, descriptor_file):
+    def create_service(self, descriptor_file, content=None):
         """
         Create and store a service based on the provided descriptor filename.
         If a service is already stored with the same id, it will return the
         stored service.
         :param descriptor_file: service descriptor filename
+        :param content: service descriptor dictionary, if already read,
+                        e.g. from a package member
         :return: created service object or, if id exists, the stored service.
         """
-        if not os.path.isfile(descriptor_file):
+        if content is None and not os.path.isfile(descriptor_file):
             return
-        new_service = Service(descriptor_file)
+        new_service = Service(descriptor_file, content)
         if new_service.id in self._services:
             return self._services[new_service.id]
 
@@ -125,17 +129,19 @@ class DescriptorStorage(object):
             return
         return self.functions[fid]
 
-    def create_function(self, descriptor_file):
+    def create_function(self, descriptor_file, content=None):
         """
         Create and store a function based on the provided descriptor filename.
         If a function is already stored with the same id, it will return the
         stored function.
         :param descriptor_file: function descriptor filename
+        :param content: function descriptor dictionary, if already read,
+                        e.g. from a package member
         :return: created function object or, if id exists, the stored function.
         """
-        if not os.path.isfile(descriptor_file):
+        if content is None and not os.path.isfile(descriptor_file):
             return
-        new_function = Function(descriptor_file)
+        new_function = Function(descriptor_file, content)
         if new_function.id in self._functions.keys():
             return self._functions[new_function.id]
 
@@ -241,7 +247,7 @@ class Link:
 
 
 class Descriptor(Node):
-    def __init__(self, descriptor_file):
+    def __init__(self, descriptor_file, content=None):
         """
         Initialize a generic descriptor object.
         This object inherits the node object.
@@ -250,11 +256,17 @@ class Descriptor(Node):
             - content: descriptor dictionary
             - filename: filename of the descriptor
         :param descriptor_file: filename of the descriptor
+        :param content: descriptor dictionary, if already read, e.g. from a
+                        package member. Otherwise, it is read from the file.
         """
         self._id = None
         self._content = None
         self._filename = None
-        self.filename = descriptor_file
+        if content is None:
+            self.filename = descriptor_file
+        else:
+            self._filename = descriptor_file
+            self.content = content
         super().__init__(self.id)
         self._graph = None
         self._links = {}
@@ -441,12 +453,13 @@ class Descriptor(Node):
 
 class Package(Descriptor):
 
-    def __init__(self, descriptor_file):
+    def __init__(self, descriptor_file, content=None):
         """
         Initialize a package object. This inherits the descriptor object.
         :param descriptor_file: descriptor filename
+        :param content: descriptor dictionary, if already read
         """
-        super().__init__(descriptor_file)
+        super().__init__(descriptor_file, content)
 
     @property
     def entry_service_file(self):
@@ -508,12 +521,13 @@ class Package(Descriptor):
 
 class Service(Descriptor):
 
-    def __init__(self, descriptor_file):
+    def __init__(self, descriptor_file, content=None):
         """
         Initialize a service object. This inherits the descriptor object.
         :param descriptor_file: descriptor filename
+        :param content: descriptor dictionary, if already read
         """
-        super().__init__(descriptor_file)
+        super().__init__(descriptor_file, content)
         self._functions = {}
         self._vnf_id_map = {}
         self._fw_paths = {}
@@ -727,12 +741,13 @@ class Service(Descriptor):
 
 class Function(Descriptor):
 
-    def __init__(self, descriptor_file):
+    def __init__(self, descriptor_file, content=None):
         """
         Initialize a function object. This inherits the descriptor object.
         :param descriptor_file: descriptor filename
+        :param content: descriptor dictionary, if already read
         """
-        super().__init__(descriptor_file)
+        super().__init__(descriptor_file, content)
         self._units = {}
 
     @property
@@ -26,9 +26,15 @@
 
 import unittest
 import os
+import tempfile
+import shutil
+import yaml
+import son.validate.util as util
 import son.validate.validate as val
+from unittest.mock import patch
 from son.validate.util import CountCalls
 from son.validate.validate import Validator
+from son.validate.resultcache import ValidationCache
 from son.workspace.workspace import Workspace, Project
 
 SAMPLES_DIR = os.path.join('src', 'son', 'validate', 'tests', 'samples')
@@ -289,3 +295,289 @@ class UnitValidateTests(unittest.TestCase):
         pass
 
 
+class UnitDescriptorCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        util.clear_descriptor_cache()
+
+    def test_load_descriptor_once(self):
+        """
+        Ensures that a descriptor file is parsed once, also when it is
+        read from a copy with the same content.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data = yaml.dump({'vendor': 'eu.vendor', 'name': 'vnf',
+                              'version': '0.1'}).encode()
+            for name in ['vnfd.yml', 'copy.yml']:
+                with open(os.path.join(tmp_dir, name), 'wb') as _file:
+                    _file.write(data)
+
+            with patch('son.validate.util.yaml.load',
+                       side_effect=yaml.load) as m_load:
+                vnfd = util.read_descriptor_file(
+                    os.path.join(tmp_dir, 'vnfd.yml'))
+                self.assertEqual(util.read_descriptor_file(
+                    os.path.join(tmp_dir, 'vnfd.yml')), vnfd)
+                self.assertEqual(util.read_descriptor_file(
+                    os.path.join(tmp_dir, 'copy.yml')), vnfd)
+                self.assertEqual(m_load.call_count, 1)
+
+                # Modified content is parsed again
+                with open(os.path.join(tmp_dir, 'copy.yml'), 'ab') as _file:
+                    _file.write(b'description: changed\n')
+                self.assertEqual(util.read_descriptor_file(
+                    os.path.join(tmp_dir, 'copy.yml'))['description'],
+                    'changed')
+                self.assertEqual(m_load.call_count, 2)
+
+    def test_cache_descriptor(self):
+        """
+        Ensures that serialized descriptors added to the cache are not
+        parsed.
+        """
+        descriptor = {'vendor': 'eu.vendor', 'name': 'vnf', 'version': '0.1'}
+        data = yaml.dump(descriptor).encode()
+        util.cache_descriptor(data, descriptor)
+        with patch('son.validate.util.yaml.load') as m_load:
+            self.assertEqual(util.load_descriptor_data(data), descriptor)
+            self.assertFalse(m_load.called)
+
+    def test_cached_descriptor_copies(self):
+        """
+        Ensures that modifying a descriptor, once cached or as returned
+        by the cache, doesn't modify the cached descriptor.
+        """
+        descriptor = {'vendor': 'eu.vendor', 'name': 'vnf', 'version': '0.1',
+                      'package_content': [{'name': 'vnfd.yml'}]}
+        data = yaml.dump(descriptor).encode()
+        util.cache_descriptor(data, descriptor)
+        descriptor['package_content'][0]['md5'] = 'md5'
+
+        content = util.load_descriptor_data(data)
+        self.assertNotIn('md5', content['package_content'][0])
+        content['package_content'][0]['md5'] = 'md5'
+        self.assertNotIn('md5', util.load_descriptor_data(
+            data)['package_content'][0])
+
+
+class UnitPackageStructTests(unittest.TestCase):
+
+    def test_list_package_dir(self):
+        """
+        Ensures that the directories of a package are listed from the names
+        of its members.
+        """
+        names = ['META-INF/MANIFEST.MF', 'service_descriptors/',
+                 'function_descriptors/vnf/vnfd.yml',
+                 'function_descriptors/vnfd.yml']
+        self.assertTrue(util.package_dir_exists(names, 'META-INF'))
+        self.assertTrue(util.package_dir_exists(names, 'service_descriptors'))
+        self.assertFalse(util.package_dir_exists(names, 'raw_files'))
+        self.assertEqual(util.list_package_dir(names, 'META-INF'),
+                         {'MANIFEST.MF'})
+        self.assertEqual(util.list_package_dir(names, 'service_descriptors'),
+                         set())
+        self.assertEqual(util.list_package_dir(names, 'function_descriptors'),
+                         {'vnf', 'vnfd.yml'})
+
+    @patch.object(Validator, '_validate_function_syntax', return_value=True)
+    @patch.object(Validator, '_validate_service_syntax', return_value=True)
+    @patch.object(Validator, '_validate_package_syntax', return_value=True)
+    @patch('zipfile.ZipFile.extractall', autospec=True)
+    def test_validate_package_in_memory(self, m_extractall, *m_syntax):
+        """
+        Ensures that the descriptors of a package are validated as read
+        from the package, without extracting them.
+        """
+        pkg_path = os.path.join(SAMPLES_DIR, 'packages',
+                                'sonata-demo-valid.son')
+        validator = Validator(workspace=Workspace('.', log_level='debug'))
+        validator.configure(syntax=True, integrity=True, topology=False)
+        self.assertTrue(validator.validate_package(pkg_path))
+
+        m_extractall.assert_not_called()
+        self.assertEqual(len(validator._storage.functions), 3)
+        for function in validator._storage.functions.values():
+            self.assertTrue(function.filename.startswith(
+                'function_descriptors/'))
+
+
+class UnitValidationCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._cache = ValidationCache(
+            os.path.join(self._tmp.name, ValidationCache.DB_FILENAME))
+        self._workspace = Workspace('.', log_level='debug')
+        val.log.error = CountCalls(val.log.error)
+        val.log.warning = CountCalls(val.log.warning)
+
+    def tearDown(self):
+        self._cache.close()
+        self._tmp.cleanup()
+
+    def create_validator(self):
+        validator = Validator(workspace=self._workspace)
+        validator._result_cache = self._cache
+        validator.configure(syntax=True, integrity=True, topology=False)
+        return validator
+
+    def test_cache_get_put(self):
+        """
+        Ensures that validation results are stored along with their
+        warnings and errors.
+        """
+        self.assertIsNone(self._cache.get('key'))
+        self._cache.put('key', False, [('error', 'bad'), ('warning', 'w')])
+        self.assertEqual(self._cache.get('key'),
+                         (False, [('error', 'bad'), ('warning', 'w')]))
+        self._cache.clear()
+        self.assertIsNone(self._cache.get('key'))
+
+    def test_validate_function_cached(self):
+        """
+        Ensures that the validation of an unchanged function is reused,
+        replaying its warnings, and that changes to the function or to
+        the validation flags are not served from the cache.
+        """
+        function_path = os.path.join(self._tmp.name, 'vnfd.yml')
+        with open(os.path.join(SAMPLES_DIR, 'functions', 'valid',
+                               'firewall-vnfd.yml')) as f:
+            descriptor = yaml.load(f)
+        with open(function_path, 'w') as f:
+            yaml.dump(descriptor, f)
+
+        def validate(path):
+            val.log.warning("function '{}' is suspicious".format(path))
+            return True
+
+        validator = self.create_validator()
+        with patch.object(validator, '_validate_function',
+                          side_effect=validate) as m_validate:
+            self.assertTrue(validator.validate_function(function_path))
+            self.assertEqual(m_validate.call_count, 1)
+
+        # unchanged: replay warnings without validating
+        validator = self.create_validator()
+        with patch.object(validator, '_validate_function',
+                          side_effect=validate) as m_validate:
+            self.assertTrue(validator.validate_function(function_path))
+            self.assertEqual(m_validate.call_count, 0)
+        self.assertEqual(val.log.warning.counter, 1)
+        self.assertEqual(val.log.error.counter, 0)
+
+        # different flags
+        validator.configure(integrity=False)
+        with patch.object(validator, '_validate_function',
+                          side_effect=validate) as m_validate:
+            validator.validate_function(function_path)
+            self.assertEqual(m_validate.call_count, 1)
+
+        # changed descriptor
+        descriptor['version'] = '9.9'
+        with open(function_path, 'w') as f:
+            yaml.dump(descriptor, f)
+        validator = self.create_validator()
+        with patch.object(validator, '_validate_function',
+                          side_effect=validate) as m_validate:
+            validator.validate_function(function_path)
+            self.assertEqual(m_validate.call_count, 1)
+
+    def test_validate_function_cached_path(self):
+        """
+        Ensures that the result of a validation is not reused for an
+        identical descriptor at another path, as its messages refer to
+        the path of the validated descriptor.
+        """
+        paths = [os.path.join(self._tmp.name, name)
+                 for name in ('vnfd-a.yml', 'vnfd-b.yml')]
+        for path in paths:
+            shutil.copyfile(os.path.join(SAMPLES_DIR, 'functions', 'valid',
+                                         'firewall-vnfd.yml'), path)
+
+        def validate(path):
+            val.log.warning("function '{}' is suspicious".format(path))
+            return True
+
+        messages = []
+        val.log.warning.listeners.append(
+            lambda *a, **kw: messages.append(a[0]))
+        for path in paths + paths:
+            validator = self.create_validator()
+            with patch.object(validator, '_validate_function',
+                              side_effect=validate):
+                validator.validate_function(path)
+
+        self.assertEqual(messages,
+                         ["function '{}' is suspicious".format(path)
+                          for path in paths + paths])
+
+
+class UnitValidateFilesTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join('src', 'son', 'workspace', 'samples',
+                               'vnfd-sample.yml')) as f:
+            descriptor = yaml.load(f)
+
+        # functions of a catalogue, the second and fourth being invalid
+        self.files = []
+        for i in range(5):
+            descriptor['name'] = 'vnf-{}'.format(i)
+            content = dict(descriptor)
+            if i in (1, 3):
+                del content['virtual_deployment_units']
+            self.files.append(os.path.join(self._tmp.name,
+                                           'vnfd-{}.yml'.format(i)))
+            with open(self.files[-1], 'w') as f:
+                yaml.dump(content, f)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def validate(self, **configuration):
+        validator = Validator(workspace=Workspace('.', log_level='debug'),
+                              use_cache=False)
+        validator.configure(syntax=True, integrity=False, topology=False,
+                            **configuration)
+        valid = validator.validate_files('function', self.files)
+        return validator, valid
+
+    def test_validate_files_stop(self):
+        """
+        Ensures that the validation of multiple files stops at the first
+        failure, unless configured to keep going.
+        """
+        validator, valid = self.validate()
+        self.assertIsNone(valid)
+        self.assertEqual([r['valid'] for r in validator.results],
+                         [True, False])
+
+        validator, valid = self.validate(keep_going=True)
+        self.assertIsNone(valid)
+        self.assertEqual([r['valid'] for r in validator.results],
+                         [True, False, True, False, True])
+        self.assertEqual([r['filename'] for r in validator.results],
+                         self.files)
+        self.assertGreater(validator.results[1]['errors'], 0)
+        self.assertEqual(validator.results[2]['errors'], 0)
+        self.assertEqual(validator.error_count,
+                         sum(r['errors'] for r in validator.results))
+
+    def test_validate_files_jobs(self):
+        """
+        Ensures that files validated by a pool of processes give the same
+        results and counts as in a single process.
+        """
+        serial, _ = self.validate(keep_going=True)
+        parallel, valid = self.validate(keep_going=True, jobs=2)
+        self.assertIsNone(valid)
+        self.assertEqual(parallel.results, serial.results)
+        self.assertEqual(parallel.error_count, serial.error_count)
+        self.assertEqual(parallel.warning_count, serial.warning_count)
+
+        del self.files[1::2]
+        parallel, valid = self.validate(jobs=2)
+        self.assertTrue(valid)
+        self.assertEqual(len(parallel.results), 3)
@@ -25,11 +25,27 @@
 # partner consortium (www.sonata-nfv.eu).
 
 import os
+import copy
 import yaml
+import hashlib
 import logging
+import threading
+import time
+from collections import OrderedDict
+from son.package.md5 import RACY_INTERVAL
 
 log = logging.getLogger(__name__)
 
+# Maximum number of parsed descriptors kept in memory
+DESCRIPTOR_CACHE_SIZE = 1024
+
+# Process-wide cache of parsed descriptors, indexed by the md5 digest of
+# their serialized content. Descriptor files are mapped to their digest
+# by (path, mtime, size), so that each descriptor is parsed once per run.
+_descriptor_contents = OrderedDict()
+_descriptor_digests = {}
+_descriptor_lock = threading.Lock()
+
 
 def read_descriptor_files(files):
     """
@@ -59,19 +75,111 @@ def read_descriptor_file(file):
     :param file: descriptor filename
     :return: descriptor dictionary
     """
-    with open(file, 'r') as _file:
-        descriptor = yaml.load(_file)
-        if not descriptor:
-            log.error("Couldn't read descriptor file: '{0}'"
-                      .format(file))
-            return
-        if 'vendor' not in descriptor or \
-                'name' not in descriptor or \
-                'version' not in descriptor:
-            log.warning("Invalid SONATA descriptor file: '{0}'. Ignoring."
-                        .format(file))
-            return
-        return descriptor
+    return __check_descriptor__(load_descriptor(file), file)
+
+
+def read_descriptor_data(data, name):
+    """
+    Reads a SONATA descriptor from its serialized content, e.g. a member
+    read from a package.
+    :param data: descriptor content as bytes
+    :param name: name of the descriptor, used in log messages
+    :return: descriptor dictionary
+    """
+    return __check_descriptor__(load_descriptor_data(data), name)
+
+
+def __check_descriptor__(descriptor, file):
+    """
+    Verifies that a parsed descriptor identifies itself.
+    :param descriptor: descriptor content
+    :param file: descriptor filename
+    :return: descriptor dictionary, None if it is invalid
+    """
+    if not descriptor:
+        log.error("Couldn't read descriptor file: '{0}'"
+                  .format(file))
+        return
+    if 'vendor' not in descriptor or \
+            'name' not in descriptor or \
+            'version' not in descriptor:
+        log.warning("Invalid SONATA descriptor file: '{0}'. Ignoring."
+                    .format(file))
+        return
+    return descriptor
+
+
+def load_descriptor(file):
+    """
+    Parses a YAML descriptor file. Parsed descriptors are cached, and a
+    copy of the cached content is returned, which may be modified.
+    :param file: descriptor filename
+    :return: descriptor content
+    """
+    st = os.stat(file)
+    key = (os.path.abspath(file), st.st_mtime_ns, st.st_size)
+    with _descriptor_lock:
+        content = _descriptor_contents.get(_descriptor_digests.get(key))
+    if content is not None:
+        return copy.deepcopy(content)
+
+    with open(file, 'rb') as _file:
+        data = _file.read()
+    content = load_descriptor_data(data)
+
+    # A file modified within the mtime granularity may still change
+    # without changing its key
+    if st.st_mtime < time.time() - RACY_INTERVAL:
+        with _descriptor_lock:
+            _descriptor_digests[key] = hashlib.md5(data).hexdigest()
+    return content
+
+
+def load_descriptor_data(data):
+    """
+    Parses the serialized content of a YAML descriptor. Parsed descriptors
+    are cached, and a copy of the cached content is returned, which may be
+    modified.
+    :param data: descriptor content as bytes
+    :return: descriptor content
+    """
+    digest = hashlib.md5(data).hexdigest()
+    with _descriptor_lock:
+        content = _descriptor_contents.get(digest)
+        if content is not None:
+            _descriptor_contents.move_to_end(digest)
+    if content is not None:
+        return copy.deepcopy(content)
+
+    content = yaml.load(data)
+    cache_descriptor(data, content)
+    return content
+
+
+def cache_descriptor(data, content):
+    """
+    Adds a parsed descriptor to the cache, e.g. after it was serialized,
+    so that its serialized content is not parsed again. A copy is cached,
+    hence the descriptor may still be modified.
+    :param data: descriptor content as bytes
+    :param content: descriptor content
+    """
+    if content is None:
+        return
+    content = copy.deepcopy(content)
+    with _descriptor_lock:
+        _descriptor_contents[hashlib.md5(data).hexdigest()] = content
+        while len(_descriptor_contents) > DESCRIPTOR_CACHE_SIZE:
+            _descriptor_contents.popitem(last=False)
+
+
+def clear_descriptor_cache():
+    """
+    Removes all parsed descriptors from the cache.
+    """
+    with _descriptor_lock:
+        _descriptor_contents.clear()
+        _descriptor_digests.clear()
 
 
 def descriptor_id(descriptor):
@@ -112,6 +220,30 @@ def list_files(path, extension):
     return file_list
 
 
+def package_dir_exists(names, path):
+    """
+    Checks if a directory exists in a package, without extracting it.
+    :param names: archive names of the package members
+    :param path: directory path in the package
+    :return: True if the directory exists
+    """
+    return any(name.startswith(path + '/') for name in names)
+
+
+def list_package_dir(names, path):
+    """
+    Lists the entries of a directory of a package, without extracting it.
+    :param names: archive names of the package members
+    :param path: directory path in the package
+    :return: set of the entry names
+    """
+    entries = set()
+    for name in names:
+        if name.startswith(path + '/') and len(name) > len(path) + 1:
+            entries.add(name[len(path) + 1:].split('/')[0])
+    return entries
+
+
 def strip_root(path):
     """
     Remove leading slash of a path
@@ -122,12 +254,18 @@ def strip_root(path):
 
 
 class CountCalls(object):
-    """Decorator to determine number of calls for a method"""
+    """
+    Decorator to determine number of calls for a method. Listeners are
+    also called with the arguments of each call, e.g. to record them.
+    """
 
     def __init__(self, method):
         self.method = method
         self.counter = 0
+        self.listeners = []
 
     def __call__(self, *args, **kwargs):
         self.counter += 1
+        for listener in self.listeners:
+            listener(*args, **kwargs)
         return self.method(*args, **kwargs)
\ No newline at end of file
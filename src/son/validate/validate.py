@@ -27,32 +27,41 @@
 import os
 import sys
 import inspect
+import hashlib
+import json
 import logging
 import coloredlogs
 import networkx as nx
 import zipfile
-import time
-import shutil
-import atexit
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import closing
-from son.package.md5 import generate_hash
+from son.package.md5 import generate_hash, generate_member_hash, \
+    use_digest_cache
+from son.package.digestcache import DigestCache
 from son.schema.validator import SchemaValidator
+from son.util.trace import traced, add_trace_argument, trace_to
+from son.util.profiler import add_profile_argument, profile_to
 from son.workspace.workspace import Workspace, Project
 from son.validate.storage import DescriptorStorage
+from son.validate.resultcache import ValidationCache
 from son.validate.util import read_descriptor_files, list_files, strip_root, \
-    build_descriptor_id, CountCalls
+    read_descriptor_data, descriptor_id, build_descriptor_id, CountCalls, \
+    package_dir_exists, list_package_dir
 
 log = logging.getLogger(__name__)
 
 
 class Validator(object):
 
-    def __init__(self, workspace=None):
+    def __init__(self, workspace=None, use_cache=True):
         """
         Initialize the Validator.
         A workspace may be provided for an easy parameter configuration,
         such as location and extension of descriptors, verbosity level, etc.
         :param workspace: SONATA workspace object
+        :param use_cache: reuse the results of previous validations of
+                          unchanged services and functions, stored in the
+                          workspace cache
         """
         self._workspace = workspace
         self._syntax = True
@@ -69,6 +78,16 @@ class Validator(object):
         self._dpath = '.'
         self._log_level = self._workspace.log_level
 
+        # validation of multiple files: number of processes, whether to
+        # continue after a failure, and results of the last validation
+        self._jobs = 1
+        self._keep_going = False
+        self._results = []
+
+        # function descriptors (VNFDs) read from the package being
+        # validated, by descriptor id: (member name, content)
+        self._package_functions = None
+
         # configure logs
         coloredlogs.install(level=self._log_level)
 
@@ -78,6 +97,15 @@ class Validator(object):
         # syntax validation
         self._schema_validator = SchemaValidator(self._workspace)
 
+        # consult the workspace digest cache before hashing files
+        digest_cache = DigestCache.from_workspace(self._workspace)
+        if digest_cache:
+            use_digest_cache(digest_cache)
+
+        # results of previous validations
+        self._result_cache = ValidationCache.from_workspace(
+            self._workspace) if use_cache else None
+
         # wrapper to count number of errors and warnings
         log.error = CountCalls(log.error)
         log.warning = CountCalls(log.warning)
@@ -96,8 +124,26 @@ class Validator(object):
         """
         return log.warning.counter
 
+    @property
+    def results(self):
+        """
+        Provides the results of the last validation of multiple files,
+        e.g. the functions of a directory. Each result is a dictionary
+        with the 'filename', whether it is 'valid', and the number of
+        'errors' and 'warnings' given by its validation.
+        """
+        return self._results
+
+    def reset(self):
+        """
+        Discard the descriptors stored by previous validations, e.g. before
+        validating an unrelated project with the same validator.
+        """
+        self._storage = DescriptorStorage()
+
     def configure(self, syntax=None, integrity=None, topology=None,
-                  dpath=None, dext=None, debug=False):
+                  dpath=None, dext=None, debug=False, jobs=None,
+                  keep_going=None):
         """
         Configure parameters for validation. It is recommended to call this
         function before performing a validation.
@@ -107,6 +153,9 @@ class Validator(object):
         :param dpath: directory to search for function descriptors (VNFDs)
         :param dext: extension of descriptor files (default: 'yml')
         :param debug: increase verbosity level of logger
+        :param jobs: number of processes validating multiple files
+        :param keep_going: continue the validation of multiple files after
+                           a failure
         """
         # assign parameters
         if syntax is not None:
@@ -119,7 +168,12 @@ class Validator(object):
             self._dext = dext
         if dpath is not None:
             self._dpath = dpath
+        if jobs is not None:
+            self._jobs = jobs
+        if keep_going is not None:
+            self._keep_going = keep_going
         if debug:
+            self._log_level = 'debug'
             coloredlogs.install(level='debug')
 
     def _assert_configuration(self):
@@ -134,7 +188,7 @@ class Validator(object):
             - 'validate_function'
         """
         # ensure this function is called by specific functions
-        caller = inspect.stack()[1][3]
+        caller = inspect.currentframe().f_back.f_code.co_name
         if caller != 'validate_function' and caller != 'validate_service' and \
            caller != 'validate_project' and caller != 'validate_package':
             log.error("Cannot assert a correct configuration. Validation "
@@ -175,16 +229,23 @@ class Validator(object):
         elif caller == 'validate_function':
             pass
 
+    @traced()
     def validate_package(self, package):
         """
         Validate a SONATA package.
         By default, it performs the following validations: syntax, integrity
         and network topology.
-        :param package: SONATA package filename
+        :param package: SONATA package filename or a directory to search
+                        for packages
         :return: True if all validations were successful, False otherwise
         """
         self._assert_configuration()
 
+        # validate multiple packages
+        if os.path.isdir(package):
+            log.info("Validating packages in path '{0}'".format(package))
+            return self.validate_files('package', list_files(package, '.son'))
+
         log.info("Validating package '{0}'".format(os.path.abspath(package)))
 
         # check if package is packed in the correct format
@@ -192,30 +253,32 @@ class Validator(object):
             log.error("Invalid SONATA package '{}'".format(package))
             return
 
-        package_dir = '.' + str(time.time())
         with closing(zipfile.ZipFile(package, 'r')) as pkg:
-            # extract package contents
-            pkg.extractall(package_dir)
-
-            # set folder for deletion when program exits
-            atexit.register(shutil.rmtree, package_dir)
-
-        # validate package file structure
-        if not self._validate_package_struct(package_dir):
-            return
+            # validate package file structure
+            if not self._validate_package_struct(pkg.namelist()):
+                return
 
-        pd_filename = os.path.join(package_dir, 'META-INF', 'MANIFEST.MF')
-        package = self._storage.create_package(pd_filename)
+            # the package descriptor, as well as the service and function
+            # descriptors, are read from the package, without extracting
+            # them. Other artifacts, e.g. images, are only read to verify
+            # their md5.
+            package = self._read_package_descriptor(
+                pkg, 'META-INF/MANIFEST.MF', self._storage.create_package)
+            if not package:
+                log.error("Failed to read the package descriptor of package"
+                          " '{}'".format(os.path.abspath(pkg.filename)))
+                return
 
-        if self._syntax and not self._validate_package_syntax(package):
-            return
+            if self._syntax and not self._validate_package_syntax(package):
+                return
 
-        if self._integrity and \
-                not self._validate_package_integrity(package, package_dir):
-            return
+            if self._integrity and \
+                    not self._validate_package_integrity(package, pkg):
+                return
 
         return True
 
+    @traced()
     def validate_project(self, project):
         """
         Validate a SONATA project.
@@ -240,6 +303,7 @@ class Validator(object):
 
         return self.validate_service(nsd_file)
 
+    @traced()
     def validate_service(self, nsd_file):
         """
         Validate a SONATA service.
@@ -254,12 +318,29 @@ class Validator(object):
         log.info("... syntax: {0}, integrity: {1}, topology: {2}"
                  .format(self._syntax, self._integrity, self._topology))
 
+        return self._cached_validation(self._service_key(nsd_file),
+                                       self._validate_service, nsd_file)
+
+    def _validate_service(self, nsd_file):
+        """
+        Validate a SONATA service, as configured.
+        :param nsd_file: service descriptor filename
+        :return: True if all validations were successful, None otherwise
+        """
         service = self._storage.create_service(nsd_file)
         if not service:
             log.error("Failed to read the service descriptor of file '{}'"
                       .format(nsd_file))
             return
 
+        return self._validate_service_descriptor(service)
+
+    def _validate_service_descriptor(self, service):
+        """
+        Validate a stored SONATA service, as configured.
+        :param service: service object
+        :return: True if all validations were successful, None otherwise
+        """
         # validate service syntax
         if self._syntax and not self._validate_service_syntax(service):
             return
@@ -272,6 +353,7 @@ class Validator(object):
 
         return True
 
+    @traced()
     def validate_function(self, vnfd_path):
         """
         Validate one or multiple SONATA functions (VNFs).
@@ -287,21 +369,35 @@ class Validator(object):
         if os.path.isdir(vnfd_path):
             log.info("Validating functions in path '{0}'".format(vnfd_path))
 
-            vnfd_files = list_files(vnfd_path, self._dext)
-            for vnfd_file in vnfd_files:
-                if not self.validate_function(vnfd_file):
-                    return
-            return True
+            return self.validate_files('function',
+                                       list_files(vnfd_path, self._dext))
 
         log.info("Validating function '{0}'".format(vnfd_path))
         log.info("... syntax: {0}, integrity: {1}, topology: {2}"
                  .format(self._syntax, self._integrity, self._topology))
 
+        return self._cached_validation(self._function_key(vnfd_path),
+                                       self._validate_function, vnfd_path)
+
+    def _validate_function(self, vnfd_path):
+        """
+        Validate a SONATA function (VNF), as configured.
+        :param vnfd_path: function descriptor (VNFD) filename
+        :return: True if all validations were successful, None otherwise
+        """
         function = self._storage.create_function(vnfd_path)
         if not function:
             log.critical("Couldn't store VNF of file '{0}'".format(vnfd_path))
             return
 
+        return self._validate_function_descriptor(function)
+
+    def _validate_function_descriptor(self, function):
+        """
+        Validate a stored SONATA function (VNF), as configured.
+        :param function: function object
+        :return: True if all validations were successful, None otherwise
+        """
         if self._syntax and not self._validate_function_syntax(function):
             return
 
@@ -313,41 +409,185 @@ class Validator(object):
 
         return True
 
-    def _validate_package_struct(self, package_dir):
+    def validate_files(self, kind, filenames):
+        """
+        Validate multiple functions or packages, independently of each
+        other. They are validated in this process or, if configured with
+        more than one job, distributed by a pool of processes. Unless
+        configured to keep going, the validation stops at the first
+        failure. The results of each file are available in 'results' and
+        the errors and warnings are added to the counts of this validator.
+        :param kind: kind of the files: 'function' or 'package'
+        :param filenames: list of filenames
+        :return: True if all validations were successful, None otherwise
+        """
+        self._results = []
+        if self._jobs <= 1 or len(filenames) <= 1:
+            for filename in filenames:
+                self._results.append(self._validate_file(kind, filename))
+                if not self._results[-1]['valid'] and not self._keep_going:
+                    break
+        else:
+            with ProcessPoolExecutor(
+                    max_workers=self._jobs,
+                    initializer=__init_validation_process__,
+                    initargs=(self._workspace, self._result_cache is not None,
+                              self.__configuration__())) as executor:
+                futures = [executor.submit(__validate_file__, kind, filename)
+                           for filename in filenames]
+                for future in futures:
+                    result = future.result()
+                    self._results.append(result)
+                    log.error.counter += result['errors']
+                    log.warning.counter += result['warnings']
+                    if not result['valid'] and not self._keep_going:
+                        for pending in futures:
+                            pending.cancel()
+                        break
+
+        if all(result['valid'] for result in self._results):
+            return True
+
+    def _validate_file(self, kind, filename):
+        """
+        Validate a function or a package, independently of the previous
+        validations.
+        :return: result dictionary, see 'results'
+        """
+        self.reset()
+        errors, warnings = log.error.counter, log.warning.counter
+        if kind == 'package':
+            valid = self.validate_package(filename)
+        else:
+            valid = self.validate_function(filename)
+        return {'filename': filename, 'valid': bool(valid),
+                'errors': log.error.counter - errors,
+                'warnings': log.warning.counter - warnings}
+
+    def __configuration__(self):
+        return {'syntax': self._syntax, 'integrity': self._integrity,
+                'topology': self._topology, 'dpath': self._dpath,
+                'dext': self._dext, 'debug': self._log_level == 'debug'}
+
+    def _cached_validation(self, key, validate, *args):
+        """
+        Run a validation, unless its result is cached. The warnings and
+        errors given by a validation are recorded along with its result,
+        and given again when the result is reused.
+        :param key: validation key. None if the result must not be cached
+        :param validate: validation method
+        :param args: arguments of the validation method
+        :return: True if the validation was successful, None otherwise
+        """
+        if not self._result_cache or not key:
+            return validate(*args)
+
+        cached = self._result_cache.get(key)
+        if cached:
+            valid, messages = cached
+            log.debug("Reusing the result of a previous validation")
+            for level, message in messages:
+                getattr(log, level)(message)
+            return True if valid else None
+
+        messages = []
+        listeners = [(log.error, lambda *a, **kw: messages.append(
+                         ('error', format_log_message(*a)))),
+                     (log.warning, lambda *a, **kw: messages.append(
+                         ('warning', format_log_message(*a))))]
+        for method, listener in listeners:
+            method.listeners.append(listener)
+        try:
+            valid = validate(*args)
+        finally:
+            for method, listener in listeners:
+                method.listeners.remove(listener)
+
+        self._result_cache.put(key, valid, messages)
+        return True if valid else None
+
+    def _validation_key(self, *components):
+        """
+        Key of a validation result, from the components it depends on, in
+        addition to the validation flags.
+        :return: validation key. None if a component is unknown.
+        """
+        if any(c is None for c in components):
+            return
+        return hashlib.md5(json.dumps(
+            [self._syntax, self._integrity, self._topology] +
+            list(components)).encode('utf-8')).hexdigest()
+
+    def _function_key(self, vnfd_file):
+        """
+        Key of the validation of a function. It depends on the path and
+        content of the function descriptor, as the messages of the
+        validation refer to its path, and on its schema.
+        """
+        if not self._result_cache or not os.path.isfile(vnfd_file):
+            return
+        return self._validation_key(
+            'function', os.path.abspath(vnfd_file), generate_hash(vnfd_file),
+            self._schema_validator.get_schema_digest(
+                SchemaValidator.SCHEMA_FUNCTION_DESCRIPTOR))
+
+    def _service_key(self, nsd_file):
+        """
+        Key of the validation of a service. It depends on the path and
+        content of the service descriptor and on its schema and, to
+        validate its integrity, on the function descriptors that it may
+        reference and their location.
+        """
+        if not self._result_cache or not os.path.isfile(nsd_file):
+            return
+
+        components = ['service', os.path.abspath(nsd_file),
+                      generate_hash(nsd_file),
+                      self._schema_validator.get_schema_digest(
+                          SchemaValidator.SCHEMA_SERVICE_DESCRIPTOR)]
+        if self._integrity:
+            vnfd_files = list_files(self._dpath, self._dext) \
+                if self._dpath and os.path.isdir(self._dpath) else []
+            components += [self._schema_validator.get_schema_digest(
+                SchemaValidator.SCHEMA_FUNCTION_DESCRIPTOR), self._dext,
+                os.path.abspath(self._dpath) if self._dpath else '']
+            components += sorted(
+                [os.path.relpath(f, self._dpath), generate_hash(f)]
+                for f in vnfd_files)
+        return self._validation_key(*components)
+
+    def _validate_package_struct(self, names):
         """
         Validate the file structure of a SONATA package.
-        :param package_dir: directory of extracted package
+        :param names: archive names of the package members
         :return: True if successful, False otherwise
         """
         # validate directory 'META-INF'
-        meta_dir = os.path.join(package_dir, 'META-INF')
-        if not os.path.isdir(meta_dir):
+        if not package_dir_exists(names, 'META-INF'):
             log.error("A directory named 'META-INF' must exist, "
                       "located at the root of the package")
             return
 
-        if len(os.listdir(meta_dir)) > 1:
+        if len(list_package_dir(names, 'META-INF')) > 1:
             log.error("The 'META-INF' directory must only contain the file "
                       "'MANIFEST.MF'")
             return
 
-        if not os.path.exists(os.path.join(meta_dir, 'MANIFEST.MF')):
+        if 'META-INF/MANIFEST.MF' not in names:
             log.error("A file named 'MANIFEST.MF' must exist in directory "
                       "'META-INF'")
             return
 
         # validate directory 'service_descriptors'
-        services_dir = os.path.join(package_dir, 'service_descriptors')
-        if os.path.isdir(services_dir):
-            if len(os.listdir(services_dir)) == 0:
+        if package_dir_exists(names, 'service_descriptors'):
+            if len(list_package_dir(names, 'service_descriptors')) == 0:
                 log.error("The 'service_descriptors' directory must contain at"
                           " least one service descriptor file")
                 return
 
         # validate directory 'function_descriptors'
-        functions_dir = os.path.join(package_dir, 'function_descriptors')
-        if os.path.isdir(functions_dir):
-            if len(os.listdir(functions_dir)) == 0:
+        if package_dir_exists(names, 'function_descriptors'):
+            if len(list_package_dir(names, 'function_descriptors')) == 0:
                 log.error("The 'function_descriptors' directory must contain "
                           "at least one function descriptor file")
                 return
@@ -396,41 +636,91 @@ class Validator(object):
             return
         return True
 
-    def _validate_package_integrity(self, package, root_dir):
+    def _validate_package_integrity(self, package, pkg):
         """
         Validate the integrity of a package.
         It will validate the entry service of the package as well as its
-        referenced functions.
+        referenced functions, read from the package. The md5 hashes of the
+        package members are computed while their content is read from the
+        package, in the order they are stored, so that the package is read
+        sequentially.
         :param package: package object
+        :param pkg: open package ZipFile
         :return: True if syntax is correct, None otherwise
         """
         log.info("Validating integrity of package '{0}'".format(package.id))
 
         # load referenced service descriptor files
+        members = set(pkg.namelist())
         for f in package.descriptors:
-            filename = os.path.join(root_dir, strip_root(f))
             log.debug("Verifying file '{0}'".format(f))
-            if not os.path.isfile(filename):
+            if strip_root(f) not in members:
                 log.error("Referenced descriptor file '{0}' is not "
                           "packaged.".format(f))
                 return
 
-            gen_md5 = generate_hash(filename)
-            manif_md5 = package.md5(strip_root(f))
-            if manif_md5 and gen_md5 != manif_md5:
+        # verify the md5 hashes of all package members
+        manif_md5s = {strip_root(pce['name']): pce.get('md5')
+                      for pce in package.content.get('package_content', [])}
+        for info in sorted(pkg.infolist(), key=lambda i: i.header_offset):
+            manif_md5 = manif_md5s.get(info.filename)
+            if not manif_md5:
+                continue
+
+            gen_md5 = generate_member_hash(pkg, info.filename)
+            if gen_md5 != manif_md5:
                 log.warning("MD5 hash of file '{0}' is not equal to the "
                           "defined in package descriptor:\nGen MD5:\t{1}\n"
                           "MANIF MD5:\t{2}"
-                          .format(f, gen_md5, manif_md5))
+                          .format(info.filename, gen_md5, manif_md5))
 
-        # configure dpath for function referencing
-        self.configure(dpath=os.path.join(root_dir, 'function_descriptors'))
+        # finally, validate the package entry service, referencing the
+        # functions of the package instead of those in dpath
+        service = self._read_package_descriptor(
+            pkg, strip_root(package.entry_service_file),
+            self._storage.create_service)
+        if not service:
+            log.error("Failed to read the service descriptor of file '{}'"
+                      .format(package.entry_service_file))
+            return
 
-        # finally, validate the package entry service file
-        entry_service_file = os.path.join(
-            root_dir, strip_root(package.entry_service_file))
+        self._package_functions = {}
+        for name in sorted(members):
+            if not name.startswith('function_descriptors/') or \
+                    not name.endswith(self._dext):
+                continue
+            content = read_descriptor_data(pkg.read(name), name)
+            if not content:
+                continue
+            did = descriptor_id(content)
+            if did in self._package_functions:
+                log.error("Duplicate descriptor in files: '{0}' <==> '{1}'"
+                          .format(name, self._package_functions[did][0]))
+                continue
+            self._package_functions[did] = (name, content)
+        try:
+            return self._validate_service_descriptor(service)
+        finally:
+            self._package_functions = None
 
-        return self.validate_service(entry_service_file)
+    @staticmethod
+    def _read_package_descriptor(pkg, name, create):
+        """
+        Read a descriptor from a package, without extracting it, and store
+        it as a package, service or function.
+        :param pkg: open package ZipFile
+        :param name: name of the descriptor in the package
+        :param create: storage method that creates the descriptor object
+        :return: created descriptor object, None if it couldn't be read
+        """
+        try:
+            data = pkg.read(name)
+        except KeyError:
+            return
+        content = read_descriptor_data(data, name)
+        if not content:
+            return
+        return create(name, content)
 
     def _validate_service_integrity(self, service):
         """
@@ -480,9 +770,13 @@ class Validator(object):
                                   .format(vnf_id, iface, lid))
                         return
 
-        # validate service function descriptors (VNFDs)
+        # validate service function descriptors (VNFDs). Those read from a
+        # package are not files, hence they are validated as stored.
         for fid, function in service.functions.items():
-            if not self.validate_function(function.filename):
+            if self._package_functions is not None:
+                if not self._validate_function_descriptor(function):
+                    return
+            elif not self.validate_function(function.filename):
                 return
 
         return True
@@ -618,13 +912,20 @@ class Validator(object):
 
         log.debug("Loading functions of the service.")
 
-        # get VNFD file list from provided dpath
-        vnfd_files = list_files(self._dpath, self._dext)
-        log.debug("Found {0} descriptors in dpath='{2}': {1}"
-                  .format(len(vnfd_files), vnfd_files, self._dpath))
+        if self._package_functions is not None:
+            # VNFDs read from the package being validated
+            path_vnfs = self._package_functions
+            dpath = 'function_descriptors'
+        else:
+            # get VNFD file list from provided dpath
+            vnfd_files = list_files(self._dpath, self._dext)
+            log.debug("Found {0} descriptors in dpath='{2}': {1}"
+                      .format(len(vnfd_files), vnfd_files, self._dpath))
 
-        # load all VNFDs
-        path_vnfs = read_descriptor_files(vnfd_files)
+            # load all VNFDs
+            path_vnfs = {fid: (file, None) for fid, file in
+                         read_descriptor_files(vnfd_files).items()}
+            dpath = self._dpath
 
         # check for errors
         if 'network_functions' not in service.content:
@@ -636,7 +937,7 @@ class Validator(object):
         if functions and not path_vnfs:
             log.error("Service references VNFs but none could be found in "
                       "'{0}'. Please specify another '--dpath'"
-                      .format(self._dpath))
+                      .format(dpath))
             return
 
         # store function descriptors referenced in the service
@@ -646,11 +947,11 @@ class Validator(object):
                                       function['vnf_version'])
             if fid not in path_vnfs.keys():
                 log.error("Referenced function descriptor id='{0}' couldn't "
-                          "be found in path '{1}'".format(fid, self._dpath))
+                          "be found in path '{1}'".format(fid, dpath))
                 return
 
             vnf_id = function['vnf_id']
-            new_func = self._storage.create_function(path_vnfs[fid])
+            new_func = self._storage.create_function(*path_vnfs[fid])
             service.associate_function(new_func, vnf_id)
 
         return True
@@ -712,6 +1013,53 @@ class Validator(object):
         return backtrace
 
 
+# Validator of a worker process of Validator.validate_files
+_validator = None
+
+
+def __init_validation_process__(workspace, use_cache, configuration):
+    global _validator
+    _validator = Validator(workspace=workspace, use_cache=use_cache)
+    _validator.configure(**configuration)
+
+
+def __validate_file__(kind, filename):
+    return _validator._validate_file(kind, filename)
+
+
+def format_log_message(msg, *args):
+    """
+    Message of a log record, as it is given by the logger.
+    """
+    msg = str(msg)
+    if args:
+        try:
+            msg = msg % args
+        except (TypeError, ValueError):
+            pass
+    return msg
+
+
+def log_results(validator):
+    """
+    Log the results of the validation of multiple files, per file.
+    :param validator: Validator of the files
+    """
+    results = validator.results
+    if not results:
+        return
+
+    for result in results:
+        if not result['valid'] or result['warnings']:
+            log.info("{0}: {1}, {2} error(s), {3} warning(s)".format(
+                result['filename'],
+                'valid' if result['valid'] else 'invalid',
+                result['errors'], result['warnings']))
+    log.info("Validated {0} file(s): {1} invalid, {2} with warnings".format(
+        len(results), sum(1 for r in results if not r['valid']),
+        sum(1 for r in results if r['warnings'])))
+
+
 def main():
     coloredlogs.install(level='info')
 
@@ -729,6 +1077,7 @@ def main():
         son-validate --service ./nsd_file.yml --path ./vnfds/ --dext yml
         son-validate --function ./vnfd_file.yml
         son-validate --function ./vnfds/ --dext yml
+        son-validate --function ./vnfds/ --dext yml --jobs 8 --keep-going
         """
     )
 
@@ -756,7 +1105,8 @@ def main():
     exclusive_parser.add_argument(
         "--package",
         dest="package_file",
-        help="Validate the specified package descriptor. "
+        help="Validate the specified package descriptor. If a directory is "
+             "specified, it will search for packages with extension '.son'"
     )
     exclusive_parser.add_argument(
         "--service",
@@ -812,16 +1162,44 @@ def main():
         help="sets verbosity level to debug",
         required=False,
         action="store_true")
+    parser.add_argument(
+        "--no-cache",
+        dest="no_cache",
+        help="Validate all services and functions, instead of reusing the "
+             "results of previous validations of unchanged ones, stored in "
+             "the workspace cache",
+        required=False,
+        action="store_true")
+
+    parser.add_argument(
+        "-j", "--jobs",
+        help="Number of processes validating the functions or packages of a "
+             "directory (default: 1)",
+        type=int,
+        default=1,
+        required=False)
+    parser.add_argument(
+        "--keep-going",
+        dest="keep_going",
+        help="Continue the validation of the functions or packages of a "
+             "directory after a failure",
+        required=False,
+        action="store_true")
+
+    add_trace_argument(parser)
+    add_profile_argument(parser)
 
     # parse arguments
     args = parser.parse_args()
+    trace_to(args.trace)
+    profile_to(args.profile_out, args.profile_mode)
 
     # by default, perform all validations
     if not args.syntax and not args.integrity and not args.topology:
         args.syntax = args.integrity = args.topology = True
 
     if args.package_file:
-        if not os.path.isfile(args.package_file):
+        if not os.path.exists(args.package_file):
             log.error("Provided package is not a valid file")
             exit(1)
 
@@ -836,13 +1214,18 @@ def main():
             log.error("Invalid workspace path: '%s'\n" % ws_root)
             exit(1)
 
-        validator = Validator(workspace=workspace)
+        validator = Validator(workspace=workspace,
+                              use_cache=not args.no_cache)
         validator.configure(syntax=args.syntax,
                             integrity=args.integrity,
                             topology=args.topology,
-                            debug=args.debug)
+                            debug=args.debug,
+                            jobs=args.jobs,
+                            keep_going=args.keep_going)
 
-        if not validator.validate_package(args.package_file):
+        valid = validator.validate_package(args.package_file)
+        log_results(validator)
+        if not valid:
             log.critical("Package validation has failed.")
             exit(1)
         if validator.warning_count == 0:
@@ -875,7 +1258,8 @@ def main():
             log.error("Invalid project path: '%s'\n  " % prj_root)
             exit(1)
 
-        validator = Validator(workspace=workspace)
+        validator = Validator(workspace=workspace,
+                              use_cache=not args.no_cache)
         validator.configure(syntax=args.syntax,
                             integrity=args.integrity,
                             topology=args.topology,
@@ -893,7 +1277,7 @@ def main():
                                 validator.warning_count))
 
     elif args.nsd:
-        validator = Validator()
+        validator = Validator(use_cache=not args.no_cache)
         validator.configure(dpath=args.dpath, dext=args.dext,
                             syntax=args.syntax,
                             integrity=args.integrity,
@@ -911,14 +1295,18 @@ def main():
                         .format(args.nsd, validator.warning_count))
 
     elif args.vnfd:
-        validator = Validator()
+        validator = Validator(use_cache=not args.no_cache)
         validator.configure(dext=args.dext,
                             syntax=args.syntax,
                             integrity=args.integrity,
                             topology=args.topology,
-                            debug=args.debug)
+                            debug=args.debug,
+                            jobs=args.jobs,
+                            keep_going=args.keep_going)
 
-        if not validator.validate_function(args.vnfd):
+        valid = validator.validate_function(args.vnfd)
+        log_results(validator)
+        if not valid:
             log.critical("Function validation has failed.")
             exit(1)
         if validator.warning_count == 0:
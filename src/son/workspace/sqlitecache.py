@@ -0,0 +1,125 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import logging
+import os
+import sqlite3
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class SQLiteCache(object):
+    """
+    Persistent cache stored in a table of a SQLite database, typically
+    located in the cache directory of a workspace. The database may be
+    shared by the threads of a process, which are serialized. Subclasses
+    define the file, the table and its columns, and how entries are
+    stored and retrieved.
+    """
+
+    # Filename of the database in the cache directory of a workspace
+    DB_FILENAME = None
+
+    # Name of the table and its column definitions
+    TABLE = None
+    COLUMNS = None
+
+    # Description of the cache in log messages
+    DESCRIPTION = 'cache'
+
+    def __init__(self, filename):
+        """
+        Open (or create) a cache.
+        :param filename: filename of the cache database
+        """
+        self._filename = filename
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self._db = sqlite3.connect(filename, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("CREATE TABLE IF NOT EXISTS {} ({})"
+                         .format(self.TABLE, self.COLUMNS))
+
+    @classmethod
+    def from_workspace(cls, workspace):
+        """
+        Provides the cache of a workspace.
+        :param workspace: SONATA workspace object
+        :return: cache. None if the workspace has no cache location.
+        """
+        if not workspace.cache_dir:
+            return
+        try:
+            return cls(os.path.join(workspace.cache_dir, cls.DB_FILENAME))
+        except (OSError, sqlite3.Error) as e:
+            log.warning("Unable to open the {} of workspace '{}': {}"
+                        .format(cls.DESCRIPTION, workspace.ws_root, e))
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def _fetch(self, query, params):
+        """
+        Run a query, which selects at most one row.
+        :param query: SQL query
+        :param params: parameters of the query
+        :return: the selected row. None if there is none or the cache
+                 could not be read.
+        """
+        try:
+            with self._lock:
+                return self._db.execute(query, params).fetchone()
+        except sqlite3.Error as e:
+            log.debug("Unable to read {} '{}': {}"
+                      .format(self.DESCRIPTION, self._filename, e))
+
+    def _store(self, values):
+        """
+        Insert a row, replacing the row with the same primary key.
+        :param values: tuple of the column values
+        """
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO {} VALUES ({})".format(
+                        self.TABLE, ', '.join('?' * len(values))), values)
+        except sqlite3.Error as e:
+            log.debug("Unable to write {} '{}': {}"
+                      .format(self.DESCRIPTION, self._filename, e))
+
+    def clear(self):
+        """
+        Remove all the entries.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM {}".format(self.TABLE))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
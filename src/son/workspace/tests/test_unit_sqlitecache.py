@@ -0,0 +1,89 @@
+#  Copyright (c) 2015 SONATA-NFV, UBIWHERE
+# ALL RIGHTS RESERVED.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Neither the name of the SONATA-NFV, UBIWHERE
+# nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written
+# permission.
+#
+# This work has been performed in the framework of the SONATA project,
+# funded by the European Commission under Grant number 671517 through
+# the Horizon 2020 and 5G-PPP programmes. The authors would like to
+# acknowledge the contributions of their colleagues of the SONATA
+# partner consortium (www.sonata-nfv.eu).
+
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+from son.workspace.sqlitecache import SQLiteCache
+
+
+class EntryCache(SQLiteCache):
+
+    DB_FILENAME = 'entries.db'
+    TABLE = 'entries'
+    COLUMNS = "name TEXT PRIMARY KEY, value TEXT"
+    DESCRIPTION = 'entry cache'
+
+    def get(self, name):
+        row = self._fetch("SELECT value FROM entries WHERE name=?", (name,))
+        return row[0] if row else None
+
+    def put(self, name, value):
+        self._store((name, value))
+
+
+class UnitSQLiteCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_store_fetch(self):
+        """
+        Ensures that entries are persisted across instances of a cache,
+        replaced by key, and removed when the cache is cleared.
+        """
+        workspace = Mock(cache_dir=os.path.join(self._tmp_dir.name, 'cache'))
+        cache = EntryCache.from_workspace(workspace)
+        self.assertEqual(cache.filename,
+                         os.path.join(workspace.cache_dir, 'entries.db'))
+        cache.put('a', '1')
+        cache.put('a', '2')
+        cache.close()
+
+        cache = EntryCache.from_workspace(workspace)
+        self.assertEqual(cache.get('a'), '2')
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        cache.close()
+
+    def test_no_cache_dir(self):
+        """
+        Ensures that a workspace without a cache location has no cache.
+        """
+        self.assertIsNone(EntryCache.from_workspace(Mock(cache_dir=None)))
+
+    def test_closed(self):
+        """
+        Ensures that a cache which can not be read or written is ignored.
+        """
+        cache = EntryCache(os.path.join(self._tmp_dir.name, 'entries.db'))
+        cache.close()
+        cache.put('a', '1')
+        self.assertIsNone(cache.get('a'))
@@ -32,6 +32,8 @@ from os.path import expanduser
 import yaml
 
 from son.workspace.project import Project
+from son.util.trace import add_trace_argument, trace_to
+from son.util.profiler import add_profile_argument, profile_to
 
 log = logging.getLogger(__name__)
 
@@ -49,10 +51,12 @@ class Workspace:
     CONFIG_STR_CATALOGUE_NS_DIR = "ns_catalogue"
     CONFIG_STR_CATALOGUE_VNF_DIR = "vnf_catalogue"
     CONFIG_STR_CONFIG_DIR = "configuration_dir"
+    CONFIG_STR_CACHE_DIR = "cache_dir"
     CONFIG_STR_PLATFORMS_DIR = "platforms_dir"
     CONFIG_STR_PROJECTS_DIR = "projects_dir"
     CONFIG_STR_SCHEMAS_REMOTE_MASTER = "schemas_remote_master"
     CONFIG_STR_SCHEMAS_LOCAL_MASTER = "schemas_local_master"
+    CONFIG_STR_SCHEMAS_CACHE_TTL = "schemas_cache_ttl"
     CONFIG_STR_DESCRIPTOR_EXTENSION = "default_descriptor_extension"
     CONFIG_STR_SERVICE_PLATFORMS = "service_platforms"
     CONFIG_STR_DEF_SERVICE_PLATFORM = "default_service_platform"
@@ -84,6 +88,7 @@ class Workspace:
         self.dirs[self.CONFIG_STR_CATALOGUES_DIR] = 'catalogues'
         self.dirs[self.CONFIG_STR_CONFIG_DIR] = 'configuration'
         self.dirs[self.CONFIG_STR_PLATFORMS_DIR] = 'platforms'
+        self.dirs[self.CONFIG_STR_CACHE_DIR] = 'cache'
 
         self.schemas[self.CONFIG_STR_SCHEMAS_LOCAL_MASTER] = \
             Workspace.DEFAULT_SCHEMAS_DIR
@@ -91,6 +96,9 @@ class Workspace:
         self.schemas[self.CONFIG_STR_SCHEMAS_REMOTE_MASTER] = \
             "https://raw.githubusercontent.com/sonata-nfv/son-schema/master/"
 
+        # Time, in seconds, remote schemas are used without revalidation
+        self.schemas[self.CONFIG_STR_SCHEMAS_CACHE_TTL] = 3600
+
         # Sub-directories of catalogues
         self.dirs[self.CONFIG_STR_CATALOGUE_NS_DIR] = \
             os.path.join(self.dirs[self.CONFIG_STR_CATALOGUES_DIR],
@@ -152,12 +160,18 @@ class Workspace:
                  self.CONFIG_STR_PLATFORMS_DIR:
                  self.dirs[self.CONFIG_STR_PLATFORMS_DIR],
 
+                 self.CONFIG_STR_CACHE_DIR:
+                 self.dirs[self.CONFIG_STR_CACHE_DIR],
+
                  self.CONFIG_STR_SCHEMAS_LOCAL_MASTER:
                  self.schemas[self.CONFIG_STR_SCHEMAS_LOCAL_MASTER],
 
                  self.CONFIG_STR_SCHEMAS_REMOTE_MASTER:
                  self.schemas[self.CONFIG_STR_SCHEMAS_REMOTE_MASTER],
 
+                 self.CONFIG_STR_SCHEMAS_CACHE_TTL:
+                 self.schemas[self.CONFIG_STR_SCHEMAS_CACHE_TTL],
+
                  self.CONFIG_STR_SERVICE_PLATFORMS:
                  self._service_platforms,
 
@@ -223,12 +237,22 @@ class Workspace:
         ws.dirs[Workspace.CONFIG_STR_PLATFORMS_DIR] = \
             ws_config[Workspace.CONFIG_STR_PLATFORMS_DIR]
 
+        # cache dir is optional in workspaces created by previous versions
+        if Workspace.CONFIG_STR_CACHE_DIR in ws_config:
+            ws.dirs[Workspace.CONFIG_STR_CACHE_DIR] = \
+                ws_config[Workspace.CONFIG_STR_CACHE_DIR]
+
         ws.schemas[Workspace.CONFIG_STR_SCHEMAS_LOCAL_MASTER] = \
             expanduser(ws_config[Workspace.CONFIG_STR_SCHEMAS_LOCAL_MASTER])
 
         ws.schemas[Workspace.CONFIG_STR_SCHEMAS_REMOTE_MASTER] = \
             ws_config[Workspace.CONFIG_STR_SCHEMAS_REMOTE_MASTER]
 
+        # schemas cache TTL is optional in workspaces of previous versions
+        if Workspace.CONFIG_STR_SCHEMAS_CACHE_TTL in ws_config:
+            ws.schemas[Workspace.CONFIG_STR_SCHEMAS_CACHE_TTL] = \
+                ws_config[Workspace.CONFIG_STR_SCHEMAS_CACHE_TTL]
+
         ws.service_platforms = \
             ws_config[Workspace.CONFIG_STR_SERVICE_PLATFORMS]
 
@@ -256,6 +280,18 @@ class Workspace:
     def service_platforms(self, sps):
         self._service_platforms = sps
 
+    @property
+    def cache_dir(self):
+        """
+        Location of the workspace cache, holding data that can be
+        regenerated at any time (e.g. digests of files).
+        It is None if the workspace is not materialized on disk.
+        """
+        if not self.ws_root or not os.path.isfile(
+                os.path.join(self.ws_root, Workspace.__descriptor_name__)):
+            return
+        return os.path.join(self.ws_root, self.dirs[self.CONFIG_STR_CACHE_DIR])
+
     def get_service_platform(self, sp_id):
         if sp_id not in self.service_platforms.keys():
             return
@@ -338,7 +374,12 @@ def main():
         required=False,
         action="store_true")
 
+    add_trace_argument(parser)
+    add_profile_argument(parser)
+
     args = parser.parse_args()
+    trace_to(args.trace)
+    profile_to(args.profile_out, args.profile_mode)
 
     log_level = "INFO"
     if args.debug: